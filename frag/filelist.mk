@@ -0,0 +1,19 @@
+## DO NOT MODIFY ANYTHING IN THIS FILE WITHOUT PERMISSION FROM THE INSTRUCTOR OR TAs
+
+# Path to the repository root
+REPO_ROOT ?= $(shell git rev-parse --show-toplevel)
+
+# The top module and the sources in filelist.json, as FILELIST_TOP and
+# FILELIST_SOURCES (relative to the repository root). They are read
+# from a generated makefile fragment, which make regenerates (and then
+# restarts) only when filelist.json changes, instead of running Python
+# on every invocation. Both simulate.mk and synth.mk include this file.
+ifndef FILELIST_MK
+FILELIST_MK := .filelist.mk
+
+-include $(FILELIST_MK)
+
+$(FILELIST_MK): filelist.json $(REPO_ROOT)/util/get_filelist.py
+	python3 $(REPO_ROOT)/util/get_filelist.py --mk > $@.tmp
+	mv $@.tmp $@
+endif
@@ -8,46 +8,62 @@ REPO_ROOT ?= $(shell git rev-parse --show-toplevel)
 IVERILOG ?= iverilog
 VERILATOR ?= verilator
 
+# Number of tests to run in parallel. Defaults to the number of cores.
+JOBS ?= $(shell nproc)
+
+# Cached Verilator builds, shared by every checkout (see
+# util/utilities.py). Exported so that pytest uses the same directory.
+SIM_BUILD_CACHE ?= $(HOME)/.cache/sim_build
+export SIM_BUILD_CACHE
+
+all: help
+
 # This is a little bit hacky, but sufficient. In order to make sure
 # that students can edit the filelist, that make knows about updates
 # to that filelist *and* the files themselves, and that pytest can
 # read the filelist, we store the listlist in a json file. We then
-# read the json file while checking dependencies.
-SIM_SOURCES = $(shell python3 $(REPO_ROOT)/util/get_filelist.py)
-SIM_SOURCES := $(addprefix $(REPO_ROOT)/,$(SIM_SOURCES))
-SIM_TOP = $(shell python3 $(REPO_ROOT)/util/get_top.py)
-
-all: help
+# read the json file (through the makefile fragment generated from it,
+# see filelist.mk) while checking dependencies.
+include $(REPO_ROOT)/frag/filelist.mk
+SIM_SOURCES := $(addprefix $(REPO_ROOT)/,$(FILELIST_SOURCES))
+SIM_TOP := $(FILELIST_TOP)
 
 # Run both simulators
 test: results.json
 
 results.json: filelist.json $(SIM_SOURCES)
-	pytest -rA
+	python3 $(REPO_ROOT)/util/scheduler.py -j $(JOBS)
 
 # lint runs the Verilator linter on your code.
 lint:
 	$(VERILATOR) --lint-only -top $(SIM_TOP) $(SIM_SOURCES)  -Wall
 
-# Remove all compiler outputs
-sim-clean:
+# Remove all compiler outputs, including the cached Verilator builds
+sim-clean: cache-clean
 	rm -rf run
 	rm -rf build
 	rm -rf lint
 	rm -rf __pycache__
 	rm -rf .pytest_cache
 
+# Remove the cached Verilator builds. The cache is shared by every
+# checkout, so this removes their builds too.
+cache-clean:
+	rm -rf $(SIM_BUILD_CACHE)
+
 # Remove all generated files
 extraclean: clean
 	rm -f results.json
 	rm -f verilator.json
 	rm -f icarus.json
+	rm -f .filelist.mk
 
 sim-help:
 	@echo "  test: Shortcut for results.json"
 	@echo "  results.json: Run all simulation tests"
 	@echo "  lint: Run the Verilator linter on all source files"
-	@echo "  clean: Remove all compiler outputs."
+	@echo "  clean: Remove all compiler outputs, including the build cache."
+	@echo "  cache-clean: Remove the cached Verilator builds (SIM_BUILD_CACHE)."
 	@echo "  extraclean: Remove all generated files (runs clean)"
 
 vars-intro-help:
@@ -57,6 +73,18 @@ vars-intro-help:
 sim-vars-help:
 	@echo "    VERILATOR: Override this variable to set the location of your verilator executable."
 	@echo "    IVERILOG: Override this variable to set the location of your iverilog executable."
+	@echo "    JOBS: Number of tests to run in parallel (default: number of cores)."
+	@echo "    SIM_PROFILE: Set to 1 to profile the Python side of every test (see run/profile.json)."
+	@echo "    SIM_BUILD_CACHE: Directory for cached Verilator builds (default: ~/.cache/sim_build)."
+	@echo "    SIM_BUILD_CACHE_MB: Size cap of the build cache in MB (default: 4096)."
+	@echo "    SIM_SEED: Base seed for the randomized tests (default: 42). Each test derives its own seed from it."
+	@echo "    SIM_INCREMENTAL: Set to 0 to re-run simulations whose sources, parameters and seed haven't changed since they last passed (default: 1)."
+	@echo "    SIM_BATCH: Number of tests to run back to back in one simulation, 0 for all the tests of a parameter set, 1 to run each test on its own (default: 0)."
+	@echo "    WAVES: Set to 1 to dump waveforms (dump.fst) for every test (default: off)."
+	@echo "    TRACE_WINDOW: Only dump waveforms between start:end, in ns (e.g. 1000:2000)."
+	@echo "    TRACE_SCOPES: Only dump these comma-separated instances below the top module."
+	@echo "    WAVES_ON_FAIL: Set to 0 to not re-run failing tests with waveforms (default: 1)."
+	@echo "    TRACE_LOOKBACK_NS: How much of a failing test to trace when it is re-run, in ns (default: 10000)."
 
 clean: sim-clean
 targets-help: sim-help
@@ -64,4 +92,4 @@ vars-help: vars-intro-help sim-vars-help
 
 help: targets-help vars-help 
 
-.PHONY: all test lint sim-clean extraclean sim-help vars-intro-help sim-vars-help clean targets-help vars-help help test results.json
+.PHONY: all test lint sim-clean cache-clean extraclean sim-help vars-intro-help sim-vars-help clean targets-help vars-help help test results.json
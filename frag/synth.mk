@@ -13,10 +13,11 @@ RSVG ?= rsvg-convert
 # that students can edit the filelist, that make knows about updates
 # to that filelist *and* the files themselves, and that pytest can
 # read the filelist, we store the listlist in a json file. We then
-# read the json file while checking dependencies.
-SYNTH_SOURCES = $(shell python3 $(REPO_ROOT)/util/get_filelist.py)
-SYNTH_SOURCES := $(addprefix $(REPO_ROOT)/,$(SYNTH_SOURCES))
-ABSTRACT_TOP = $(shell python3 $(REPO_ROOT)/util/get_top.py)
+# read the json file (through the makefile fragment generated from it,
+# see filelist.mk) while checking dependencies.
+include $(REPO_ROOT)/frag/filelist.mk
+SYNTH_SOURCES := $(addprefix $(REPO_ROOT)/,$(FILELIST_SOURCES))
+ABSTRACT_TOP := $(FILELIST_TOP)
 
 # The ice40 commands will only work if top.sv is provided, i.e. if
 # there is a design for the FPGA.
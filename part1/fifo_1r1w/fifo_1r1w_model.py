@@ -0,0 +1,89 @@
+# Cycle-accurate Python model of fifo_1r1w. Unlike the scoreboard in
+# the testbench (which only checks the order of the elements), it
+# predicts ready_o, valid_o and data_o on every cycle, including the
+# bypass path: firstwrite and trail select the last written element
+# (data_l) instead of the registered RAM read data when the element
+# being read was written too recently to come out of the RAM.
+
+# The testbench runs it in lockstep with the DUT (see ModelRunner):
+# on every rising edge it compares the outputs from before the edge,
+# then calls step() with the inputs sampled on the edge.
+
+class FifoPredictor():
+    """ Cycle-accurate model of fifo_1r1w.
+
+    Values that are unknown in the RTL (RAM words that were never
+    written, the read register before the first read) are None.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_log2_p -- log2 of the number of fifo elements
+    """
+    def __init__(self, width_p, depth_log2_p):
+        self.width_p = width_p
+        self.depth_log2_p = depth_log2_p
+
+        self._mask = (1 << width_p) - 1
+        self._addr_mask = (1 << depth_log2_p) - 1
+        self._ptr_mask = (1 << (depth_log2_p + 1)) - 1
+        self._full_xor = 1 << depth_log2_p
+
+        self.ram = [None] * (1 << depth_log2_p)
+        self.rd_data_l = None
+        self.reset()
+
+    def reset(self):
+        """ Apply reset. Like the RTL, the RAM and its read register
+        keep their contents. """
+        self.wr_ptr = 0
+        self.rd_ptr = 0
+        self.data_l = 0
+        self.trail = False
+        self.firstwrite = False
+
+    @property
+    def ready_o(self):
+        return (self.wr_ptr ^ self.rd_ptr) != self._full_xor
+
+    @property
+    def valid_o(self):
+        return self.wr_ptr != self.rd_ptr
+
+    @property
+    def data_o(self):
+        if(self.firstwrite or self.trail):
+            return self.data_l
+        return self.rd_data_l
+
+    def step(self, valid_i, data_i, ready_i):
+        """ Advance the model by one rising edge of clk_i, given the
+        inputs sampled on that edge.
+
+        Arguments:
+        valid_i -- valid_i
+        data_i -- data_i
+        ready_i -- ready_i
+
+        Returns a tuple of (element was written, element was read).
+        """
+        empty = not self.valid_o
+        wr_en = bool(valid_i) and self.ready_o
+        rd_en = bool(ready_i) and not empty
+
+        mux = (self.rd_ptr + 1) & self._ptr_mask if rd_en else self.rd_ptr
+
+        # The RAM reads before it writes on the same edge.
+        self.rd_data_l = self.ram[mux & self._addr_mask]
+        if(wr_en):
+            self.ram[self.wr_ptr & self._addr_mask] = data_i & self._mask
+
+        self.firstwrite = (wr_en and empty) or (self.firstwrite and rd_en)
+        self.trail = (mux == self.wr_ptr) and rd_en
+
+        if(wr_en):
+            self.wr_ptr = (self.wr_ptr + 1) & self._ptr_mask
+            self.data_l = data_i & self._mask
+        if(rd_en):
+            self.rd_ptr = mux
+
+        return (wr_en, rd_en)
@@ -0,0 +1,416 @@
+# cocotb tests for fifo_1r1w. This module is only imported by the
+# simulator (runner loads tb_<top> by default); the pytest side is in
+# test_fifo_1r1w.py.
+import os
+import sys
+
+# REPO_ROOT is set by runner, so the repository is only searched for
+# (with git) when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import clock_start_sequence, reset_sequence
+from fifo_1r1w_model import FifoPredictor
+from fifo_tb import FifoModel, InputModel, OutputModel, ModelRunner, RandomDataGenerator, RateGenerator, CountingGenerator
+
+import cocotb
+
+from cocotb.triggers import RisingEdge, FallingEdge, with_timeout
+
+def get_predictor(dut):
+    """Cycle-accurate FifoPredictor for the lockstep check in
+    ModelRunner."""
+    return FifoPredictor(int(dut.width_p.value), int(dut.depth_log2_p.value))
+
+@cocotb.test()
+async def reset_test(dut):
+    """Test for Initialization"""
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+@cocotb.test()
+async def single_test(dut):
+    """Test to transmit a single element in at most two cycles."""
+
+    l = 1
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, 1), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    await FallingEdge(dut.clk_i)
+    await FallingEdge(dut.clk_i)
+    await FallingEdge(dut.clk_i)
+
+    im.start()
+    await RisingEdge(dut.valid_i)
+    await RisingEdge(dut.clk_i)
+
+    timeout = False
+    try:
+        await om.wait(3)
+    except:
+        timeout = True
+    assert not timeout, "Error! Maximum latency expected for this fifo is two cycles."
+
+    dut.valid_i.value = 0
+    dut.ready_i.value = 0
+
+@cocotb.test(skip=True)
+async def bypass_test(dut):
+    """Test to transmit a single element in one cycle."""
+
+    l = 1
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, 1), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    await FallingEdge(dut.clk_i)
+    await FallingEdge(dut.clk_i)
+    await FallingEdge(dut.clk_i)
+
+    im.start()
+    await RisingEdge(dut.valid_i)
+    await RisingEdge(dut.clk_i)
+
+    timeout = False
+    try:
+        await om.wait(2)
+    except:
+        timeout = True
+    assert not timeout, "Error! Maximum latency expected with bypass for this fifo is one cycle. " \
+        "For maximum points (and minimum fifo latency), implement the FIFO bypass path."
+
+    dut.valid_i.value = 0
+    dut.ready_i.value = 0
+
+@cocotb.test()
+async def fill_test(dut):
+    """Test if fifo_1r1w fills to depth_p elements"""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    l = depth_p
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, 0), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    await RisingEdge(dut.valid_i)
+    await RisingEdge(dut.clk_i)
+
+    success = False
+    try:
+        await im.wait(depth_p)
+        success = True
+    except:
+        nconsumed = im.nconsumed()
+
+    if(not success):
+        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
+        
+@cocotb.test()
+async def fill_empty_test(dut):
+    """Test if fifo_1r1w fills to depth_p elements"""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    l = depth_p
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, 0), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    await RisingEdge(dut.valid_i)
+    await RisingEdge(dut.clk_i)
+
+    success = False
+    try:
+        await im.wait(depth_p)
+        success = True
+    except:
+        nconsumed = im.nconsumed()
+
+    if(not success):
+        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
+
+    om = OutputModel(dut, RateGenerator(dut, 1), l)
+    om.start()
+
+    await RisingEdge(dut.ready_i)
+    await RisingEdge(dut.clk_i)
+
+    nproduced = 0
+    success = False
+    try:
+        await om.wait(depth_p)
+        success = True
+    except:
+        nproduced = om.nproduced()
+
+    if(not success):
+        assert nproduced != depth_p, f"Error! Could not empty fifo with {depth_p} elements in {depth_p} cycles. Fifo produced {nproduced} elements."
+
+@cocotb.test()
+async def out_fuzz_test(dut):
+    """Transmit 4 * depth_p random data elements at 50% line rate (Output/Consumer is fuzzed)"""
+
+    l = (1 << dut.depth_log2_p.value) * 4
+    rate = .5
+
+    timeout = 2 * l * int(1/rate)
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, CountingGenerator(dut, rate), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, 1), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Wait for the first piece of data to arrive at the output.
+    try:
+        await with_timeout(RisingEdge(dut.valid_o), 20, 'ns')
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for valid_o, but valid_o never went high in 20 clock cycles after reset."
+
+    #await RisingEdge(dut.valid_o)
+    try:
+        await om.wait(timeout + .5)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}. Only transmitted: {om._nout}"
+
+
+@cocotb.test()
+async def in_fuzz_test(dut):
+    """Transmit 4 * depth_p random data elements at 50% line rate (Input/Producer is fuzzed)"""
+
+    l = (1 << dut.depth_log2_p.value) * 4
+    rate = .5
+
+    timeout = 2 * l * int(1/rate)
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, 1), l)
+    im = InputModel(dut, RandomDataGenerator(dut), CountingGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Wait for the first piece of data to arrive at the output.
+    try:
+        await with_timeout(RisingEdge(dut.valid_o), 20, 'ns')
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for valid_o, but valid_o never went high in 20 clock cycles after reset."
+    #await RisingEdge(dut.valid_o)
+
+    try:
+        await om.wait(timeout + .5)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}. Only transmitted: {om._nout}"
+
+@cocotb.test()
+async def inout_fuzz_test(dut):
+    """Transmit 4 * depth_p random data elements at ~25% line rate (Both are fuzzed)"""
+
+    l = (1 << dut.depth_log2_p.value) * 4
+    rate = .5
+
+    timeout = 2 * l * int(1/rate) * int(1/rate) 
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, rate), l)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    # Wait one cycle for reset to start
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Wait for the first piece of data to arrive at the output.
+    try:
+        await with_timeout(RisingEdge(dut.valid_o), 20, 'ns')
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for valid_o, but valid_o never went high in 20 clock cycles after reset."
+
+    #await RisingEdge(dut.valid_o)
+    try:
+        await om.wait(timeout + .5)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}. Only transmitted: {om._nout}"
+        
+@cocotb.test()
+async def full_bw_test(dut):
+    """Transmit 8 * depth_p random data elements at 100% line rate"""
+
+    # This is the InputModel
+    l = (1 << dut.depth_log2_p.value) * 8
+    rate = 1
+
+    timeout = l + 1
+
+    m = ModelRunner(dut, FifoModel(dut), predictor=get_predictor(dut))
+    om = OutputModel(dut, RateGenerator(dut, rate), l, batched=True)
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l, batched=True)
+
+    clk_i = dut.clk_i
+    reset_i = dut.reset_i
+    ready_i = dut.ready_i
+    valid_i = dut.valid_i
+    ready_o = dut.ready_o
+    valid_o = dut.valid_o
+
+    ready_i.value = 0
+    valid_i.value = 0    
+    await clock_start_sequence(clk_i)
+    await reset_sequence(clk_i, reset_i, 10)
+
+    await FallingEdge(dut.clk_i)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # We're doing a throughput test. We only care about the output
+    # throughput.  We can wait for the rising edge of valid_o because
+    # it (should, if the circuit is implemented correctly) occur at,
+    # or just after the clock edge.
+    try:
+        await with_timeout(RisingEdge(dut.valid_o), 20, 'ns')
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for valid_o, but valid_o never went high in 20 clock cycles after reset."
+
+    #await RisingEdge(dut.valid_o)
+    try:
+        await om.wait(timeout + .5)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns"
+        
@@ -1,6 +1,18 @@
 module fifo_1r1w_cdc
  #(parameter [31:0] width_p = 32
   ,parameter [31:0] depth_log2_p = 8
+   // Number of synchronizer flops per pointer crossing. Fewer stages
+   // lower the latency through the fifo (and the full/empty feedback
+   // delay), at the cost of MTBF. Must be at least 1.
+  ,parameter [31:0] sync_stages_p = 2
+   // calmost_full_o is high when cfill_o >= almost_full_p, and
+   // palmost_empty_o when pfill_o <= almost_empty_p.
+  ,parameter [31:0] almost_full_p = (1 << depth_log2_p) - 1
+  ,parameter [31:0] almost_empty_p = 1
+   // First-word fall-through: cut the latency of a write into an empty
+   // fifo down to the synchronizer (see wr_ptr_gray below). Has no
+   // effect when sync_stages_p is 1.
+  ,parameter [0:0] fwft_p = 0
   )
    // To emphasize that the two interfaces are in different clock
    // domains i've annotated the two sides of the fifo with "c" for
@@ -10,12 +22,22 @@ module fifo_1r1w_cdc
   ,input [width_p - 1:0] cdata_i
   ,input [0:0] cvalid_i
   ,output [0:0] cready_o 
+   // Fill level and flag as seen from the c side. Computed from the
+   // synchronized read pointer, so they can only overestimate the
+   // number of elements in the fifo.
+  ,output [depth_log2_p:0] cfill_o
+  ,output [0:0] calmost_full_o
 
   ,input [0:0] pclk_i
   ,input [0:0] preset_i
   ,output [0:0] pvalid_o 
   ,output [width_p - 1:0] pdata_o 
   ,input [0:0] pready_i
+   // Fill level and flag as seen from the p side. Computed from the
+   // synchronized write pointer, so they can only underestimate the
+   // number of elements in the fifo.
+  ,output [depth_log2_p:0] pfill_o
+  ,output [0:0] palmost_empty_o
   );
    
   logic [depth_log2_p:0] wr_ptr, rd_ptr;
@@ -23,52 +45,61 @@ module fifo_1r1w_cdc
   logic wr_en;
   assign wr_en = cvalid_i & cready_o;
 
+  logic [depth_log2_p:0] wr_ptr_next;
+  assign wr_ptr_next = (wr_en) ? (wr_ptr + 1) : wr_ptr;
+
   always_ff @(posedge cclk_i) begin
     if (creset_i) begin
       wr_ptr <= '0;
     end
     else begin
-      if (wr_en) begin
-        wr_ptr <= wr_ptr + 1;
-      end
+      wr_ptr <= wr_ptr_next;
     end
   end
 
-  logic [depth_log2_p:0] wr_ptr_good;
-  always_ff @(posedge cclk_i) begin
-    if (creset_i) begin
-      wr_ptr_good <= '0;
-    end
-    else begin
-      wr_ptr_good <= wr_ptr;
-    end
-  end
+  // The write pointer crosses to the pclk domain from a gray-coded
+  // register, wr_ptr_gray. By default it is retimed: it follows wr_ptr
+  // one cclk cycle later, so a RAM word has been written for at least
+  // a cclk period when its pointer starts to cross. With fwft_p it is
+  // updated on the same edge as wr_ptr, which takes that cycle off the
+  // first-word latency. The RAM word is still at least a pclk period
+  // old when it is read, since the pointer spends a whole pclk cycle
+  // in the second synchronizer stage, so fwft_p needs at least two.
+  localparam [0:0] fwft_lp = fwft_p && (sync_stages_p >= 2);
 
-  logic [depth_log2_p:0] wr_ptr_gray;
+  logic [depth_log2_p:0] wr_ptr_cross;
+  assign wr_ptr_cross = (fwft_lp) ? wr_ptr_next : wr_ptr;
+
+  logic [depth_log2_p:0] wr_ptr_gray_next;
   bin2gray
   #(.width_p(depth_log2_p+1))
   bin2graywr (
-    .bin_i(wr_ptr_good),
-    .gray_o(wr_ptr_gray)
+    .bin_i(wr_ptr_cross),
+    .gray_o(wr_ptr_gray_next)
   );
 
-  logic [depth_log2_p:0] wr_ptr_gray1;
-  always_ff @(posedge pclk_i) begin
-    if (preset_i) begin
-      wr_ptr_gray1 <= '0;
+  logic [depth_log2_p:0] wr_ptr_gray;
+  always_ff @(posedge cclk_i) begin
+    if (creset_i) begin
+      wr_ptr_gray <= '0;
     end
     else begin
-      wr_ptr_gray1 <= wr_ptr_gray;
+      wr_ptr_gray <= wr_ptr_gray_next;
     end
   end
 
-  logic [depth_log2_p:0] wr_ptr_gray2;
+  // wr_ptr_sync[0] is the first synchronizer flop, and
+  // wr_ptr_sync[sync_stages_p-1] the last.
+  logic [sync_stages_p-1:0][depth_log2_p:0] wr_ptr_sync;
   always_ff @(posedge pclk_i) begin
     if (preset_i) begin
-      wr_ptr_gray2 <= '0;
+      wr_ptr_sync <= '0;
     end
     else begin
-      wr_ptr_gray2 <= wr_ptr_gray1;
+      wr_ptr_sync[0] <= wr_ptr_gray;
+      for (int i = 1; i < sync_stages_p; i++) begin
+        wr_ptr_sync[i] <= wr_ptr_sync[i-1];
+      end
     end
   end
 
@@ -76,7 +107,7 @@ module fifo_1r1w_cdc
   gray2bin
   #(.width_p(depth_log2_p+1))
   gray2binywr (
-    .gray_i(wr_ptr_gray2),
+    .gray_i(wr_ptr_sync[sync_stages_p-1]),
     .bin_o(wr_ptr_bin)
   );
 
@@ -102,23 +133,16 @@ module fifo_1r1w_cdc
     .gray_o(rd_ptr_gray)
   );
     
-  logic [depth_log2_p:0] rd_ptr_gray1;
+  logic [sync_stages_p-1:0][depth_log2_p:0] rd_ptr_sync;
   always_ff @(posedge cclk_i) begin
     if (creset_i) begin
-      rd_ptr_gray1 <= '0;
+      rd_ptr_sync <= '0;
     end
     else begin
-      rd_ptr_gray1 <= rd_ptr_gray;
-    end
-  end
-
-  logic [depth_log2_p:0] rd_ptr_gray2;
-  always_ff @(posedge cclk_i) begin
-    if (creset_i) begin
-      rd_ptr_gray2 <= '0;
-    end
-    else begin
-      rd_ptr_gray2 <= rd_ptr_gray1;
+      rd_ptr_sync[0] <= rd_ptr_gray;
+      for (int i = 1; i < sync_stages_p; i++) begin
+        rd_ptr_sync[i] <= rd_ptr_sync[i-1];
+      end
     end
   end
 
@@ -126,7 +150,7 @@ module fifo_1r1w_cdc
   gray2bin
   #(.width_p(depth_log2_p+1))
   gray2binrd (
-    .gray_i(rd_ptr_gray2),
+    .gray_i(rd_ptr_sync[sync_stages_p-1]),
     .bin_o(rd_ptr_bin)
   );
 
@@ -142,6 +166,14 @@ module fifo_1r1w_cdc
 
   assign pvalid_o = ~empty;
 
+  // Both pointers carry one extra wrap bit, so the difference is the
+  // number of elements (0 to depth_p) without any special cases.
+  assign cfill_o = wr_ptr - rd_ptr_bin;
+  assign calmost_full_o = (32'(cfill_o) >= almost_full_p);
+
+  assign pfill_o = wr_ptr_bin - rd_ptr;
+  assign palmost_empty_o = (32'(pfill_o) <= almost_empty_p);
+
   logic [width_p-1:0] rd_data_l;
   logic [depth_log2_p:0] bypass;
   assign bypass = (rd_en) ? (rd_ptr + 1) : rd_ptr;
@@ -0,0 +1,285 @@
+# Cycle-accurate Python model of fifo_1r1w_cdc. It models the same
+# registers as the RTL: wr_ptr and the published write pointer
+# (wr_ptr_good here, wr_ptr_gray in the RTL) in the cclk (producer)
+# domain, rd_ptr and the registered read port
+# of ram_1r1w_sync in the pclk (consumer) domain, and the gray-coded
+# pointer synchronizers between them (wr_ptr_sync and rd_ptr_sync,
+# sync_stages_p flops each).
+
+# There are two ways to use it:
+#
+# 1. step() advances one or both clock domains by one edge, given the
+#    inputs sampled on that edge, like the RTL would. The outputs
+#    (cready, pvalid, pdata) can be compared with the DUT in lockstep.
+#
+# 2. run() simulates a whole stimulus (per-cycle valid and ready
+#    patterns) for two arbitrary clock periods without a simulator,
+#    and returns per-element enqueue/dequeue times, for exploring
+#    depth, latency and clock-ratio tradeoffs, e.g.
+#
+#      m = FifoCdcModel(32, 4)
+#      r = m.run(1000/12, 1000/25, np.ones(100000, bool), np.ones(50000, bool))
+#      print(np.percentile(r["latency_ns"], 99))
+#
+# Both are per-edge reference models, not vectorized simulations: the
+# full and empty flags feed back into the pointers on every edge, so
+# the register updates are a recurrence that NumPy can't evaluate in
+# bulk. run() only uses NumPy for the edge schedule and the results,
+# and steps through the edges in a plain Python loop, at roughly half
+# a million beats per second. That is fast enough for sweeps of
+# thousands of points, but it is not a substitute for the simulator
+# on long soak runs.
+
+import numpy as np
+
+def bin2gray(b):
+    """ Convert binary to gray code (bin2gray.sv).
+
+    Arguments:
+    b -- Binary value (int or numpy array)
+    """
+    return b ^ (b >> 1)
+
+def gray2bin(g, width_p):
+    """ Convert gray code to binary (gray2bin.sv).
+
+    Arguments:
+    g -- Gray-coded value (int or numpy array)
+    width_p -- Width of g
+    """
+    b = g
+    for i in range(1, width_p):
+        b = b ^ (g >> i)
+    return b
+
+class FifoCdcModel():
+    """ Cycle-accurate model of fifo_1r1w_cdc.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_log2_p -- log2 of the number of fifo elements
+    sync_stages -- Number of synchronizer flops per pointer (sync_stages_p)
+    fwft -- First-word fall-through mode (fwft_p)
+    """
+    def __init__(self, width_p, depth_log2_p, sync_stages=2, fwft=False):
+        self.width_p = width_p
+        self.depth_log2_p = depth_log2_p
+        self.sync_stages = sync_stages
+        # Like the RTL, fwft_p has no effect with a single synchronizer
+        # stage.
+        self.fwft = bool(fwft) and sync_stages >= 2
+
+        self._mask = (1 << width_p) - 1
+        self._addr_mask = (1 << depth_log2_p) - 1
+        self._ptr_mask = (1 << (depth_log2_p + 1)) - 1
+
+        # gray2bin is a table lookup, bin2gray a shift and an xor.
+        self._gray2bin = gray2bin(np.arange(1 << (depth_log2_p + 1)), depth_log2_p + 1).tolist()
+
+        self.reset()
+
+    def reset(self):
+        """ Reset both clock domains. """
+        self.wr_ptr = 0
+        self.wr_ptr_good = 0
+        self.rd_ptr = 0
+        # wr_sync[0] is wr_ptr_sync[0], wr_sync[-1] is
+        # wr_ptr_sync[sync_stages_p-1]. Likewise for rd_sync.
+        self.wr_sync = [0] * self.sync_stages
+        self.rd_sync = [0] * self.sync_stages
+        self.ram = [0] * (1 << self.depth_log2_p)
+        self.rd_data = 0
+
+    @property
+    def cready(self):
+        """ cready_o: not full, as seen from the producer's side. """
+        rd_ptr_bin = self._gray2bin[self.rd_sync[-1]]
+        return (self.wr_ptr ^ rd_ptr_bin) != (1 << self.depth_log2_p)
+
+    @property
+    def pvalid(self):
+        """ pvalid_o: not empty, as seen from the consumer's side. """
+        return self._gray2bin[self.wr_sync[-1]] != self.rd_ptr
+
+    @property
+    def cfill(self):
+        """ cfill_o: the fill level as seen from the producer's side. """
+        return (self.wr_ptr - self._gray2bin[self.rd_sync[-1]]) & self._ptr_mask
+
+    @property
+    def pfill(self):
+        """ pfill_o: the fill level as seen from the consumer's side. """
+        return (self._gray2bin[self.wr_sync[-1]] - self.rd_ptr) & self._ptr_mask
+
+    @property
+    def pdata(self):
+        """ pdata_o: the registered RAM read data. """
+        return self.rd_data
+
+    def step(self, cclk=False, pclk=False, cvalid=0, cdata=0, pready=0):
+        """ Advance the model by one rising edge of cclk, pclk or both
+        (when they coincide). Inputs are the values sampled on the
+        edge. Like the RTL, every register update on a shared edge sees
+        the values from before the edge.
+
+        Arguments:
+        cclk -- Rising edge of cclk
+        pclk -- Rising edge of pclk
+        cvalid -- cvalid_i
+        cdata -- cdata_i
+        pready -- pready_i
+
+        Returns a tuple of (element was written, element was read).
+        """
+        wr_en = bool(cclk and cvalid and self.cready)
+        rd_en = bool(pclk and pready and self.pvalid)
+
+        wr_ptr_gray = bin2gray(self.wr_ptr_good)
+        rd_ptr_gray = bin2gray(self.rd_ptr)
+
+        if(pclk):
+            bypass = (self.rd_ptr + 1) if rd_en else self.rd_ptr
+            self.rd_data = self.ram[bypass & self._addr_mask]
+            self.wr_sync = [wr_ptr_gray] + self.wr_sync[:-1]
+            if(rd_en):
+                self.rd_ptr = (self.rd_ptr + 1) & self._ptr_mask
+
+        if(cclk):
+            wr_ptr = self.wr_ptr
+            self.rd_sync = [rd_ptr_gray] + self.rd_sync[:-1]
+            if(wr_en):
+                self.ram[self.wr_ptr & self._addr_mask] = cdata & self._mask
+                self.wr_ptr = (self.wr_ptr + 1) & self._ptr_mask
+            # Retimed by default, in step with wr_ptr in fwft mode.
+            self.wr_ptr_good = self.wr_ptr if self.fwft else wr_ptr
+
+        return (wr_en, rd_en)
+
+    def run(self, pclk_period, cclk_period, valid, ready, data=None, pclk_phase=0, cclk_phase=0):
+        """ Simulate the fifo from reset for a whole stimulus.
+
+        valid[i] is whether the producer has a new element to offer in
+        cclk cycle i. Like the testbench InputModel, an offered element
+        is held until it is accepted. ready[j] is pready_i in pclk cycle
+        j. The run ends when either stimulus runs out.
+
+        The edge schedule is computed with NumPy. The register updates
+        form a recurrence, so they are evaluated one edge at a time, in
+        a Python loop over the merged edges (see the top of this file).
+
+        Arguments:
+        pclk_period -- pclk period in ns
+        cclk_period -- cclk period in ns
+        valid -- Boolean array, one entry per cclk cycle
+        ready -- Boolean array, one entry per pclk cycle
+        data -- Array of element values (default: 0, 1, 2, ...)
+        pclk_phase -- Time of the first pclk edge in ns
+        cclk_phase -- Time of the first cclk edge in ns
+
+        Returns a dictionary of NumPy arrays: enq_ns and deq_ns (times
+        each element was written and read), latency_ns, data (the values
+        read, in order), and the scalars stall_cycles (cclk cycles in
+        which an offered element was refused) and max_occupancy.
+        """
+        self.reset()
+
+        valid = np.asarray(valid, dtype=bool)
+        ready = np.asarray(ready, dtype=bool)
+        if(data is None):
+            data = np.arange(len(valid), dtype=np.int64) & self._mask
+
+        # Edge times in integer ps so that coincident edges compare equal.
+        tc = np.round((cclk_phase + np.arange(len(valid)) * cclk_period) * 1000).astype(np.int64).tolist()
+        tp = np.round((pclk_phase + np.arange(len(ready)) * pclk_period) * 1000).astype(np.int64).tolist()
+        valid = valid.tolist()
+        ready = ready.tolist()
+        data = np.asarray(data).tolist()
+
+        D = self.depth_log2_p
+        full_xor = 1 << D
+        addr_mask = self._addr_mask
+        ptr_mask = self._ptr_mask
+        mask = self._mask
+        g2b = self._gray2bin
+        n = self.sync_stages
+        fwft = self.fwft
+        ram = self.ram
+
+        wr_ptr = wr_ptr_good = rd_ptr = 0
+        rd_data = 0
+
+        # The synchronizers are kept as ring buffers instead of shifting
+        # lists: on every edge, the oldest entry is the output of the
+        # last stage, and is replaced by the new input of the first.
+        wr_sync = [0] * n
+        rd_sync = [0] * n
+        wi = ri = 0
+
+        holding = False
+        nwr = 0
+        stalls = 0
+        occupancy = 0
+        max_occupancy = 0
+        enq = []
+        deq = []
+        out = []
+
+        i = j = 0
+        nc = len(tc)
+        npc = len(tp)
+        while(i < nc and j < npc):
+            t = tc[i]
+            tpj = tp[j]
+            cedge = (t <= tpj)
+            pedge = (tpj <= t)
+            if(not cedge):
+                t = tpj
+
+            # Both domains sample the state from before the edge.
+            if(pedge):
+                rd_ptr_gray = rd_ptr ^ (rd_ptr >> 1)
+                if(ready[j] and g2b[wr_sync[wi]] != rd_ptr):
+                    deq.append(t)
+                    out.append(rd_data)
+                    occupancy -= 1
+                    rd_ptr = (rd_ptr + 1) & ptr_mask
+                rd_data = ram[rd_ptr & addr_mask]
+                wr_sync[wi] = wr_ptr_good ^ (wr_ptr_good >> 1)
+                wi = (wi + 1) % n
+                j += 1
+            else:
+                rd_ptr_gray = rd_ptr ^ (rd_ptr >> 1)
+
+            if(cedge):
+                wr_ptr_good_next = wr_ptr
+                if(holding or valid[i]):
+                    if((wr_ptr ^ g2b[rd_sync[ri]]) != full_xor):
+                        enq.append(t)
+                        ram[wr_ptr & addr_mask] = data[nwr] & mask
+                        nwr += 1
+                        wr_ptr = (wr_ptr + 1) & ptr_mask
+                        holding = False
+                        occupancy += 1
+                        if(occupancy > max_occupancy):
+                            max_occupancy = occupancy
+                    else:
+                        holding = True
+                        stalls += 1
+                wr_ptr_good = wr_ptr if fwft else wr_ptr_good_next
+                rd_sync[ri] = rd_ptr_gray
+                ri = (ri + 1) % n
+                i += 1
+
+        # Leave the model in the final state, in the same form as step().
+        self.wr_ptr, self.wr_ptr_good, self.rd_ptr, self.rd_data = wr_ptr, wr_ptr_good, rd_ptr, rd_data
+        self.wr_sync = [wr_sync[(wi - 1 - k) % n] for k in range(n)]
+        self.rd_sync = [rd_sync[(ri - 1 - k) % n] for k in range(n)]
+
+        enq_ns = np.asarray(enq, dtype=np.float64) / 1000
+        deq_ns = np.asarray(deq, dtype=np.float64) / 1000
+        return {"enq_ns": enq_ns,
+                "deq_ns": deq_ns,
+                "latency_ns": deq_ns - enq_ns[:len(deq_ns)],
+                "data": np.asarray(out, dtype=np.int64),
+                "stall_cycles": stalls,
+                "max_occupancy": max_occupancy}
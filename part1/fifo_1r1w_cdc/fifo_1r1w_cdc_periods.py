@@ -0,0 +1,22 @@
+# Clock periods shared by the two sides of the fifo_1r1w_cdc bench:
+# test_fifo_1r1w_cdc.py names one throughput test per pair, and
+# tb_fifo_1r1w_cdc.py generates them. Keep this free of imports, the
+# simulator imports it with every test.
+
+# (pclk_period, cclk_period) pairs in ns for the throughput sweep. The
+# last two are the 12 MHz/25 MHz pair from top.sv, in both directions.
+# 1000/12 ns is not a whole number of ps: clock_start_sequence rounds
+# every period to whole simulator steps (see get_clock_steps), and the
+# timeouts derived from them are rounded too.
+throughput_periods = [(1, 1)
+                      ,(1, 1.5)
+                      ,(1.5, 1)
+                      ,(1, 2)
+                      ,(2, 1)
+                      ,(1, 3.1)
+                      ,(3.1, 1)
+                      ,(1, 7)
+                      ,(7, 1)
+                      ,(1000/12, 1000/25)
+                      ,(1000/25, 1000/12)
+                      ]
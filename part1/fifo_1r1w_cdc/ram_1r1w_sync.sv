@@ -40,10 +40,13 @@ module ram_1r1w_sync
       $display("%m: depth_p is %d, width_p is %d", depth_p, width_p);
       // wire [bar:0] foo [baz:0];
       // In order to get the memory contents in iverilog you need to run this for loop during initialization:
+      // (Only when tracing is on, otherwise it creates a dump on every run.)
+`ifdef WAVES
       for (int i = 0; i < depth_p; i++) begin
         $dumpvars(0, ram[i]);
         ;
       end
+`endif
    end
 
 endmodule
\ No newline at end of file
@@ -0,0 +1,720 @@
+# cocotb tests for fifo_1r1w_cdc. This module is only imported by the
+# simulator (runner loads tb_<top> by default); the pytest side, with
+# the parameter sweeps and the tables shared with it, is in
+# test_fifo_1r1w_cdc.py, so neither side imports what only the other
+# one needs.
+import os
+import sys
+
+# REPO_ROOT is set by runner, so the repository is only searched for
+# (with git) when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import assert_resolvable, clock_start_sequence, reset_sequence
+from fifo_1r1w_cdc_model import FifoCdcModel
+from fifo_tb import FifoModel, InputModel, OutputModel, ModelRunner, LatencyStats, RandomDataGenerator, RateGenerator, BurstGenerator
+from fifo_1r1w_cdc_periods import throughput_periods
+
+import cocotb
+
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+from cocotb.triggers import Timer, RisingEdge, FallingEdge, with_timeout
+
+import numpy as np
+
+import time
+import json
+import resource
+
+def get_backend():
+    """Stimulus backend: "models" (InputModel/OutputModel, the default)
+    or "axi" (AxiInputModel/AxiOutputModel). It is selected with the
+    +tb_backend plusarg (see test_backend), or else with the TB_BACKEND
+    environment variable."""
+    backend = cocotb.plusargs.get("tb_backend") or os.environ.get("TB_BACKEND", "models")
+    assert backend in ("models", "axi"), f"Unknown backend {backend}"
+    return backend
+
+def get_batched(batched):
+    """Whether to use the batched InputModel/OutputModel coroutines. The
+    +tb_drivers plusarg ("cycle" or "batched", see test_drivers)
+    overrides the choice of the test.
+
+    Arguments:
+    batched -- The test's choice
+    """
+    drivers = cocotb.plusargs.get("tb_drivers")
+    if(drivers is None):
+        return batched
+    assert drivers in ("cycle", "batched"), f"Unknown drivers {drivers}"
+    return drivers == "batched"
+
+async def record_outputs(dut, path):
+    """Write the time (in ps) and value of every element read from the
+    fifo to path, one per line. With the +tb_drivers plusarg,
+    make_models records them, and test_drivers checks that both driver
+    modes read the same elements at the same times.
+
+    Arguments:
+    dut -- fifo_1r1w_cdc
+    path -- Output file
+    """
+    rising = RisingEdge(dut.pclk_i)
+    pvalid_o = dut.pvalid_o
+    pready_i = dut.pready_i
+    with open(path, "w", buffering=1) as fd:
+        while True:
+            await rising
+            valid = pvalid_o.value
+            ready = pready_i.value
+            if(valid.is_resolvable and ready.is_resolvable and valid == 1 and ready == 1):
+                fd.write(f"{get_sim_time('ps')} {dut.pdata_o.value}\n")
+
+def make_models(dut, in_rate, out_rate, l, batched=False):
+    """Create the input and output models for the selected backend (see
+    get_backend). The data is checked by ModelRunner either way.
+
+    Arguments:
+    dut -- fifo_1r1w_cdc
+    in_rate -- Fraction of cclk cycles in which the producer is valid
+    out_rate -- Fraction of pclk cycles in which the consumer is ready
+    l -- Number of elements
+    batched -- Use the batched InputModel/OutputModel coroutines (see
+               get_batched)
+
+    Returns a tuple of (input model, output model).
+    """
+    batched = get_batched(batched)
+    if(cocotb.plusargs.get("tb_drivers") is not None):
+        cocotb.start_soon(record_outputs(dut, "drivers_outputs.txt"))
+    if(get_backend() == "axi"):
+        from fifo_tb.axi import AxiInputModel, AxiOutputModel
+        return (AxiInputModel(dut, in_rate, l), AxiOutputModel(dut, out_rate, l))
+    return (InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, in_rate), l, batched=batched, prefix="c"),
+            OutputModel(dut, RateGenerator(dut, out_rate), l, batched=batched, prefix="p"))
+
+async def reset_test(dut, pclk_period, cclk_period):
+    """Test for Initialization"""
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+async def single_test(dut, pclk_period, cclk_period):
+    """Test to transmit a single element."""
+
+    l = 1
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p")
+    om = OutputModel(dut, RateGenerator(dut, 1), l, prefix="p")
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l, prefix="c")
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Ensure that an initial handshake happens. This will time out if
+    # ready never occurs, or valid.
+    try:
+        await im.rv.handshake(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
+
+    try:
+        await om.rv.is_ready(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
+
+    nproduced = 0
+    try:
+        await om.wait(10 * pclk_period)
+    except:
+        nproduced = om.nproduced()
+
+    assert nproduced != 1, f"Error! Could transmit a single element."
+
+
+async def fill_test(dut, pclk_period, cclk_period):
+    """Test if fifo_1r1w fills to depth_p elements"""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    l = depth_p
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p")
+    om = OutputModel(dut, RateGenerator(dut, 0), l, prefix="p")
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l, prefix="c")
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Ensure that an initial handshake happens. This will time out if
+    # ready never occurs, or valid.
+    try:
+        await im.rv.handshake(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
+
+    success = False
+    try:
+        await im.wait(depth_p)
+        success = True
+    except:
+        nconsumed = im.nconsumed()
+
+    if(not success):
+        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
+
+async def fill_empty_test(dut, pclk_period, cclk_period):
+    """Test if fifo_1r1w fills to depth_p elements, and then empties
+    successfully"""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    l = depth_p
+    rate = 1
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p")
+    om = OutputModel(dut, RateGenerator(dut, 0), l, prefix="p")
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l, prefix="c")
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # Ensure that an initial handshake happens. This will time out if
+    # ready never occurs, or valid.
+    try:
+        await im.rv.handshake(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
+
+    success = False
+    try:
+        await im.wait(depth_p * cclk_period)
+        success = True
+    except:
+        nconsumed = im.nconsumed()
+
+    if(not success):
+        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
+
+    om = OutputModel(dut, RateGenerator(dut, 1), l, prefix="p")
+    om.start()
+
+    try:
+        await om.rv.is_ready(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
+
+    nproduced = 0
+    success = False
+    try:
+        await om.wait(depth_p * pclk_period)
+        success = True
+    except:
+        nproduced = om.nproduced()
+
+    if(not success):
+        assert nproduced != depth_p, f"Error! Could not empty fifo with {depth_p} elements in {depth_p} cycles. Fifo produced {nproduced} elements."
+
+#@cocotb.test()
+async def fuzz_test(dut, pclk_period, cclk_period):
+    """Transmit 4 * depth_p random data elements at 50% line rate"""
+
+    l = (1 << dut.depth_log2_p.value) * 4
+    rate = .5
+
+    timeout = l * int(1/rate) * int(1/rate) * 4 * max(pclk_period, cclk_period)
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p")
+    im, om = make_models(dut, rate, rate, l)
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # We're doing a throughput test. We only care about the output
+    # throughput.  We can wait for the rising edge of valid_o because
+    # it (should, if the circuit is implemented correctly) occur at,
+    # or just after the clock edge.
+    try:
+        await om.rv.is_ready(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}"
+
+#@cocotb.test()
+async def stream_test(dut, pclk_period, cclk_period):
+    """Transmit 4 * depth_p random data elements at 100% line rate, and
+    check the latency and the cycles per beat"""
+
+    # This is the InputModel
+    l = (1 << dut.depth_log2_p.value) * 4
+    rate = 1
+
+    timeout = max(pclk_period, cclk_period) * l * 2
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p", stats=LatencyStats({"pclk": pclk_period, "cclk": cclk_period}))
+    im, om = make_models(dut, rate, rate, l, batched=True)
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    width_p = dut.width_p.value
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    # We're doing a throughput test. We only care about the output
+    # throughput.  We can wait for the rising edge of valid_o because
+    # it (should, if the circuit is implemented correctly) occur at,
+    # or just after the clock edge.
+    try:
+        await om.rv.is_ready(100)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}"
+
+    # Performance check: An element waits at most depth_p pclk cycles
+    # behind the elements ahead of it, plus one cclk cycle in the
+    # write pointer retiming register, sync_stages_p pclk cycles in the
+    # synchronizer, and a few cycles of slack for clock phase and the
+    # RAM read.
+    depth_p = (1 << dut.depth_log2_p.value)
+    m.stats.to_json(f"latency_stream_test_{pclk_period}_{cclk_period}.json")
+    sync_stages_p = int(dut.sync_stages_p.value)
+    fwft = int(dut.fwft_p.value) and (sync_stages_p >= 2)
+    bound = depth_p + (cclk_period / pclk_period) + sync_stages_p + 3
+    m.stats.assert_percentile(99, bound, "pclk")
+
+    # The first element crosses an empty fifo, so it only waits for its
+    # write pointer: one cclk cycle in the retiming register (none with
+    # fwft_p), sync_stages_p pclk cycles in the synchronizer, up to one
+    # pclk cycle of phase, and the pclk edge that reads it.
+    bound = (0 if fwft else (cclk_period / pclk_period)) + sync_stages_p + 2
+    m.stats.assert_percentile(0, bound, "pclk")
+
+    # Cycles per beat on the pclk side. Both sides are always ready, so
+    # the fifo must keep up with the model of the same configuration,
+    # which is one beat per pclk cycle whenever the fifo is deep enough
+    # and the producer is fast enough. Two pclk cycles of slack over
+    # the whole stream cover the clock phases.
+    cpb = 1 / (m.stats.throughput()["mean"] * pclk_period)
+    expected = 1 / (model_throughput(dut, pclk_period, cclk_period, l) * pclk_period)
+    assert cpb <= expected + 2 / (l - 1), f"Error! Stream took {cpb:.3f} pclk cycles per beat, expected at most {expected:.3f}."
+
+def model_throughput(dut, pclk_period, cclk_period, l):
+    """Throughput of the cycle-accurate model (fifo_1r1w_cdc_model.py)
+    for this configuration, in elements per ns, with both sides at 100%
+    line rate."""
+    m = FifoCdcModel(int(dut.width_p.value), int(dut.depth_log2_p.value),
+                     int(dut.sync_stages_p.value), int(dut.fwft_p.value))
+    t = l * max(pclk_period, cclk_period) * 4
+    r = m.run(pclk_period, cclk_period,
+              np.ones(int(t / cclk_period), bool), np.ones(int(t / pclk_period), bool))
+    deq_ns = r["deq_ns"][:l]
+    return (len(deq_ns) - 1) / (deq_ns[-1] - deq_ns[0])
+
+async def throughput_test(dut, pclk_period, cclk_period):
+    """Stream 16 * depth_p elements at 100% line rate and check that the
+    sustained rate is at least THROUGHPUT_FRACTION (default .5) of the
+    theoretical maximum, min(f_pclk, f_cclk). Shallow fifos with deep
+    synchronizers can't cover the pointer round trip, so when the model
+    predicts less than that, the rate must be within 10% of the model
+    instead."""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    l = depth_p * 16
+    rate = 1
+    fraction = float(os.environ.get("THROUGHPUT_FRACTION", .5))
+
+    timeout = max(pclk_period, cclk_period) * l * 4
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p", stats=LatencyStats({"pclk": pclk_period, "cclk": cclk_period}))
+    im, om = make_models(dut, rate, rate, l, batched=True)
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+
+    start = time.perf_counter()
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns"
+    wall_s = time.perf_counter() - start
+
+    # Elements per ns
+    theoretical = 1 / max(pclk_period, cclk_period)
+    predicted = model_throughput(dut, pclk_period, cclk_period, l)
+    fraction = min(fraction, .9 * predicted / theoretical)
+    throughput = m.stats.throughput()
+    measured = throughput["mean"]
+
+    min_window = throughput["min_window"] or measured
+    with open(f"throughput_{pclk_period:.4f}_{cclk_period:.4f}.csv", "w") as fd:
+        fd.write("pclk_period_ns,cclk_period_ns,width_p,depth_log2_p,sync_stages_p,elements,theoretical_per_ns,model_per_ns,measured_per_ns,min_window_per_ns,fraction,p99_latency_pclk,backend,beats_per_wall_s\n")
+        fd.write(f"{pclk_period:.4f},{cclk_period:.4f},{dut.width_p.value},{dut.depth_log2_p.value},{dut.sync_stages_p.value},{l},"
+                 f"{theoretical:.6f},{predicted:.6f},{measured:.6f},{min_window:.6f},{measured / theoretical:.4f},"
+                 f"{m.stats.percentile(99, 'pclk'):.2f},{get_backend()},{l / wall_s:.0f}\n")
+
+    assert measured >= fraction * theoretical, f"Error! Sustained throughput is {measured / theoretical:.2f} of the theoretical maximum ({measured:.4f} vs {theoretical:.4f} elements/ns), expected at least {fraction}."
+
+async def check_fill(clk_i, fill_o, flag_o, flag, occupancy, bound):
+    """On every falling edge of clk_i, check fill_o against the number of
+    elements in the fifo, and flag_o against fill_o.
+
+    Arguments:
+    clk_i -- Clock of the side that fill_o and flag_o belong to
+    fill_o -- cfill_o or pfill_o
+    flag_o -- calmost_full_o or palmost_empty_o
+    flag -- Function from a fill level to the expected flag value
+    occupancy -- Function returning the number of elements in the fifo
+    bound -- ">=" if fill_o may only overestimate the occupancy (cfill_o),
+             "<=" if it may only underestimate it (pfill_o)
+    """
+    while True:
+        await FallingEdge(clk_i)
+        assert_resolvable(fill_o)
+        assert_resolvable(flag_o)
+        fill = int(fill_o.value)
+        n = occupancy()
+        if(bound == ">="):
+            assert fill >= n, f"Error! {fill_o._name} is {fill}, but the fifo holds {n} elements."
+        else:
+            assert fill <= n, f"Error! {fill_o._name} is {fill}, but the fifo only holds {n} elements."
+        assert int(flag_o.value) == flag(fill), f"Error! {flag_o._name} is {flag_o.value} with {fill_o._name} = {fill}."
+
+async def flag_burst(clk_i, flag_o, en_i, ok_o, burst, l, misses, data_i=None, data=None):
+    """Drive en_i high in bursts of (up to) burst handshakes, starting a
+    burst only when flag_o is low, until l handshakes have completed.
+    Every rising edge in a burst where ok_o is low is counted in
+    misses[0].
+
+    Arguments:
+    clk_i -- Clock of the side being driven
+    flag_o -- calmost_full_o or palmost_empty_o
+    en_i -- cvalid_i or pready_i
+    ok_o -- cready_o or pvalid_o
+    burst -- Burst length
+    l -- Number of handshakes
+    misses -- One-element list, incremented for every stalled cycle
+    data_i -- cdata_i, if driving the producer side
+    data -- Data generator for data_i
+    """
+    n = 0
+    en_i.value = 0
+    while n < l:
+        await FallingEdge(clk_i)
+        assert_resolvable(flag_o)
+        if(flag_o.value == 1):
+            continue
+        for _ in range(min(burst, l - n)):
+            en_i.value = 1
+            if(data_i is not None):
+                data_i.value = data.generate()
+            await RisingEdge(clk_i)
+            assert_resolvable(ok_o)
+            while(ok_o.value == 0):
+                misses[0] += 1
+                await RisingEdge(clk_i)
+            n += 1
+            await FallingEdge(clk_i)
+        en_i.value = 0
+
+async def almost_test(dut, pclk_period, cclk_period):
+    """Check the fill levels and the almost full/empty flags.
+
+    The producer only starts a burst when calmost_full_o is low, and the
+    consumer only when palmost_empty_o is low. Since the flags are
+    conservative, a producer burst of depth_p - almost_full_p + 1
+    elements and a consumer burst of almost_empty_p + 1 elements must
+    never stall."""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    almost_full_p = int(dut.almost_full_p.value)
+    almost_empty_p = int(dut.almost_empty_p.value)
+    l = depth_p * 8
+
+    timeout = max(pclk_period, cclk_period) * l * 8
+
+    model = FifoModel(dut, "c", "p")
+    m = ModelRunner(dut, model, "c", "p", stats=LatencyStats({"pclk": pclk_period, "cclk": cclk_period}))
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    cocotb.start_soon(check_fill(cclk_i, dut.cfill_o, dut.calmost_full_o,
+                                 lambda f: f >= almost_full_p, model.occupancy, ">="))
+    cocotb.start_soon(check_fill(pclk_i, dut.pfill_o, dut.palmost_empty_o,
+                                 lambda f: f <= almost_empty_p, model.occupancy, "<="))
+
+    # The consumer stops reading once palmost_empty_o stays high, so the
+    # producer sends enough extra elements to get the last l out.
+    wr_misses = [0]
+    rd_misses = [0]
+    wr = cocotb.start_soon(flag_burst(cclk_i, dut.calmost_full_o, dut.cvalid_i, dut.cready_o,
+                                      depth_p - almost_full_p + 1, l + almost_empty_p + 1, wr_misses,
+                                      dut.cdata_i, RandomDataGenerator(dut)))
+    rd = cocotb.start_soon(flag_burst(pclk_i, dut.palmost_empty_o, dut.pready_i, dut.pvalid_o,
+                                      almost_empty_p + 1, l, rd_misses))
+
+    try:
+        await with_timeout(rd, timeout, 'ns', round_mode="round")
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns"
+    wr.kill()
+
+    assert wr_misses[0] == 0, f"Error! The producer stalled for {wr_misses[0]} cycles in bursts started with calmost_full_o low."
+    assert rd_misses[0] == 0, f"Error! pvalid_o was low for {rd_misses[0]} cycles in bursts started with palmost_empty_o low."
+
+pclk_periods = [1, 5]
+cclk_periods = [1, 3.1]
+tf = TestFactory(test_function=stream_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=throughput_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=throughput_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=almost_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=fuzz_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=fill_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=fill_empty_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=reset_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=single_test)
+tf.add_option(name='pclk_period', optionlist=pclk_periods)
+tf.add_option(name='cclk_period', optionlist=cclk_periods)
+tf.generate_tests()
+
+async def soak_progress(dut, om, l, interval):
+    """Log a progress checkpoint every interval ns of simulation time
+    until the output model has produced l elements."""
+    start = time.time()
+    while om.nproduced() < l:
+        await Timer(interval, 'ns', round_mode="round")
+        n = om.nproduced()
+        elapsed = time.time() - start
+        # ru_maxrss is in KB on Linux
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10
+        dut._log.info(f"Soak checkpoint: {n}/{l} elements ({100 * n / l:.1f}%) at {get_sim_time(units='ns')}ns, "
+                      f"{n / elapsed:.0f} elements/s, max RSS {rss} MB")
+
+# Only run when requested by name (see test_soak), never as part of
+# test_all.
+@cocotb.test(skip=True)
+async def soak_test(dut):
+    """Transmit SOAK_BEATS random data elements at 50% line rate on
+    both sides, with the clock periods in SOAK_PCLK_PERIOD and
+    SOAK_CCLK_PERIOD (ns). Progress is logged every SOAK_CHECKPOINT_NS
+    of simulation time."""
+
+    l = int(os.environ.get("SOAK_BEATS", 1 << 20))
+    pclk_period = float(os.environ.get("SOAK_PCLK_PERIOD", 1))
+    cclk_period = float(os.environ.get("SOAK_CCLK_PERIOD", 3.1))
+    interval = int(os.environ.get("SOAK_CHECKPOINT_NS", 1000000))
+    rate = .5
+
+    timeout = l * int(1/rate) * int(1/rate) * 4 * max(pclk_period, cclk_period)
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p")
+    om = OutputModel(dut, RateGenerator(dut, rate), l, batched=get_batched(True), prefix="p")
+    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l, batched=get_batched(True), prefix="c")
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    m.start()
+    om.start()
+    im.start()
+    cocotb.start_soon(soak_progress(dut, om, l, interval))
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns. Only transmitted: {om.nproduced()}"
+
+async def count_stalls(clk_i, valid, ready, counter):
+    """Count the rising edges of clk_i where valid is high and ready is
+    low, i.e. the cycles in which the producer is back-pressured."""
+    while True:
+        await RisingEdge(clk_i)
+        if(valid.value.is_resolvable and ready.value.is_resolvable
+           and valid.value == 1 and ready.value == 0):
+            counter[0] += 1
+
+# Only run when requested by name (see util/fifo_depth.py), never as
+# part of test_all.
+@cocotb.test(skip=True)
+async def depth_probe_test(dut):
+    """Drive DEPTH_PROBE_BURSTS bursts of DEPTH_PROBE_BURST elements,
+    separated by DEPTH_PROBE_IDLE idle cclk cycles, into the fifo while
+    the consumer accepts at DEPTH_PROBE_READ_RATE, and record the
+    number of cycles the producer was back-pressured in
+    depth_probe.json."""
+
+    burst = int(os.environ.get("DEPTH_PROBE_BURST", 16))
+    idle = int(os.environ.get("DEPTH_PROBE_IDLE", 16))
+    bursts = int(os.environ.get("DEPTH_PROBE_BURSTS", 8))
+    read_rate = float(os.environ.get("DEPTH_PROBE_READ_RATE", 1))
+    pclk_period = float(os.environ.get("DEPTH_PROBE_PCLK_PERIOD", 1))
+    cclk_period = float(os.environ.get("DEPTH_PROBE_CCLK_PERIOD", 1))
+
+    l = burst * bursts
+    timeout = (l * max(pclk_period, cclk_period) / read_rate) + (burst + idle) * bursts * cclk_period * 2
+
+    m = ModelRunner(dut, FifoModel(dut, "c", "p"), "c", "p", stats=LatencyStats({"pclk": pclk_period, "cclk": cclk_period}))
+    om = OutputModel(dut, RateGenerator(dut, read_rate), l, batched=get_batched(True), prefix="p")
+    im = InputModel(dut, RandomDataGenerator(dut), BurstGenerator(dut, burst, idle), l, batched=get_batched(True), prefix="c")
+
+    pclk_i = dut.pclk_i
+    preset_i = dut.preset_i
+    cclk_i = dut.cclk_i
+    creset_i = dut.creset_i
+
+    await clock_start_sequence(pclk_i, period=pclk_period)
+    await clock_start_sequence(cclk_i, period=cclk_period)
+    await reset_sequence(pclk_i, preset_i, 10)
+    await reset_sequence(cclk_i, creset_i, 10)
+
+    stalls = [0]
+    m.start()
+    om.start()
+    im.start()
+    cocotb.start_soon(count_stalls(cclk_i, dut.cvalid_i, dut.cready_o, stalls))
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns"
+
+    with open("depth_probe.json", "w") as fd:
+        json.dump({"stall_cycles": stalls[0],
+                   "elements": l,
+                   "p99_latency_pclk": m.stats.percentile(99, "pclk")}, fd, indent=2)
@@ -1,36 +1,29 @@
-import git
+# pytest side of the fifo_1r1w_cdc testbench: the parameter sweeps
+# that launch the simulations, and the checks of the Python model. The
+# cocotb tests that run in the simulator are in tb_fifo_1r1w_cdc.py.
+# pytest imports this module at collection time, so it imports as
+# little as possible; cocotb, NumPy and the models are only imported
+# by the simulator, or inside the tests that need them.
 import os
 import sys
-import git
-
-# I don't like this, but it's convenient.
-_REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+import json
+
+# I don't like this, but it's convenient. The root comes from REPO_ROOT
+# when it is set (by conftest.py, and by runner in the simulator), so
+# the repository is only searched for when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
 assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
 sys.path.append(os.path.join(_REPO_ROOT, "util"))
-from utilities import runner, lint, assert_resolvable, clock_start_sequence, reset_sequence
+from utilities import runner, batch_runner, lint, get_param_string, get_import_time
+from fifo_1r1w_cdc_periods import throughput_periods
 tbpath = os.path.dirname(os.path.realpath(__file__))
 
 import pytest
 
-import cocotb
-
-from cocotb.clock import Clock
-from cocotb.regression import TestFactory
-from cocotb.utils import get_sim_time
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, with_timeout
-from cocotb.types import LogicArray, Range
-
-from cocotb_test.simulator import run
-
-from cocotbext.axi import AxiLiteBus, AxiLiteMaster, AxiStreamSink, AxiStreamMonitor, AxiStreamBus
-
 from pytest_utils.decorators import max_score, visibility, tags
-   
-import random
-random.seed(42)
-
-import queue
-from itertools import product
 
 timescale = "1ps/1ps"
 tests = ['reset_test_001'
@@ -57,8 +50,17 @@ tests = ['reset_test_001'
          ,'stream_test_002'
          ,'stream_test_003'
          ,'stream_test_004'
+         ,'almost_test_001'
+         ,'almost_test_002'
+         ,'almost_test_003'
+         ,'almost_test_004'
          ]
 
+throughput_tests = [f"throughput_test_{i:03d}" for i in range(1, len(throughput_periods) + 1)]
+
+# Every test is reported on its own, but the tests of a parameter set
+# run back to back in one simulation (see batch_runner). Set
+# SIM_BATCH=1 to run each one in a simulation of its own.
 @pytest.mark.parametrize("width_p", [7, 32])
 @pytest.mark.parametrize("depth_log2_p", [4, 2])
 @pytest.mark.parametrize("test_name", tests)
@@ -69,7 +71,7 @@ def test_each(simulator, test_name, width_p, depth_log2_p):
     parameters = dict(locals())
     del parameters['test_name']
     del parameters['simulator']
-    runner(simulator, timescale, tbpath, parameters, testname=test_name)
+    batch_runner(simulator, timescale, tbpath, parameters, test_name, tests)
 
 # Opposite above, run all the tests in one simulation but reset
 # between tests to ensure that reset is clearing all state.
@@ -103,601 +105,263 @@ def test_style(simulator, width_p, depth_log2_p):
     del parameters['simulator']
     lint(simulator, timescale, tbpath, parameters, compile_args=["--lint-only", "-Wwarn-style", "-Wno-lint"])
 
-class FifoModel():
-    def __init__(self, dut):
-
-        self._dut = dut
-        self._data_o = dut.pdata_o
-        self._data_i = dut.cdata_i
-
-        # Model the fifo like a simple software queue
-        self._q = queue.SimpleQueue()
-
-        self._width_p = dut.width_p.value
-        self._depth_log2_p = dut.depth_log2_p.value
-        self._deqs = 0
-        self._enqs = 0
-
-    def consume(self):
-        assert_resolvable(self._data_i)
-        self._q.put(self._data_i.value)
-        self._enqs += 1
-
-    def produce(self):
-        assert_resolvable(self._data_o)
-        got = self._data_o.value
-        expected = self._q.get()
-        assert got == expected, f"Error! Value on deque iteration {self._deqs} does not match expected. Expected: {expected}. Got: {got}"
-        self._deqs += 1
-
-
-class ReadyValidInterface():
-    def __init__(self, clk_i, reset_i, ready, valid):
-        self._clk_i = clk_i
-        self._reset_i = reset_i
-        self._ready = ready
-        self._valid = valid
-
-    def is_in_reset(self):
-        if((not self._reset_i.value.is_resolvable) or self._reset_i.value  == 1):
-            return True
-
-    def assert_resolvable(self):
-        if(not self.is_in_reset()):
-            assert_resolvable(self._valid)
-            assert_resolvable(self._ready)
-
-    def is_handshake(self):
-        return ((self._valid == 1) and (self._ready == 1))
-
-    async def _wait(self, sig):
-        """Wait for valid on the positive edge of the clock"""
-        while True:
-            await RisingEdge(self._clk_i)
-            if (not self.is_in_reset()):
-                assert_resolvable(sig)
-                if(sig == 1):
-                    break
-
-    async def is_ready(self, ns):
-        """Wait for ready, raising an exception if it hasn't
-        happened after ns nanoseconds of simulation time"""
-        # If ns is none, wait indefinitely
-        if(ns):
-            await with_timeout(self._wait(self._ready), ns, 'ns')
-        else:
-            await self._wait(self._ready)
-
-    async def is_valid(self, ns):
-        """Wait for valid, raising an exception if it hasn't
-        happened after ns nanoseconds of simulation time"""
-        # If ns is none, wait indefinitely
-        if(ns):
-            await with_timeout(self._wait(self._valid), ns, 'ns')
-        else:
-            await self._wait(self._valid)
-
-    async def _handshake(self):
-        while True:
-            await RisingEdge(self._clk_i)
-            if (not self.is_in_reset()):
-                self.assert_resolvable()
-                if(self.is_handshake()):
-                    break
-
-    async def handshake(self, ns):
-        """Wait for a handshake, raising an exception if it hasn't
-        happened after ns nanoseconds of simulation time"""
-
-        # If ns is none, wait indefinitely
-        if(ns):
-            await with_timeout(self._handshake(), ns, 'ns')
-        else:
-            await self._handshake()
-
-
-class RandomDataGenerator():
-    def __init__(self, dut):
-        self._dut = dut
-
-    def generate(self):
-        value = random.randint(0, (1 << self._dut.width_p.value) - 1)
-        return value
-
-class RateGenerator():
-    def __init__(self, dut, r):
-        self._rate = r
-
-    def generate(self):
-        if(self._rate == 0):
-            return False
-        else:
-            return (random.randint(1,int(1/self._rate)) == 1)
-
-class OutputModel():
-    def __init__(self, dut, g, l):
-        self._clk_i = dut.pclk_i
-        self._reset_i = dut.preset_i
-        self._ready_i = dut.pready_i
-        self._valid_o = dut.pvalid_o
-
-        # For safety's sake
-        self._ready_i.value = 0
-
-        self._rv = ReadyValidInterface(self._clk_i, self._reset_i,
-                                       self._ready_i, self._valid_o)
-        self._generator = g
-        self._length = l
-
-        self._coro = None
-
-        self._nout = 0
-
-    def start(self):
-        """ Start Output Model """
-        if self._coro is not None:
-            raise RuntimeError("Output Model already started")
-        self._coro = cocotb.start_soon(self._run())
-
-    def stop(self) -> None:
-        """ Stop Output Model """
-        if self._coro is None:
-            raise RuntimeError("Output Model never started")
-        self._coro.kill()
-        self._coro = None
-
-    async def wait(self, t):
-        await with_timeout(self._coro, t, 'ns')
-
-    async def wait_cyc(self, t):
-        await with_timeout(self._coro, t, 'ns')
-
-    def nproduced(self):
-        return self._nout
-
-    async def _run(self):
-        """ Output Model Coroutine"""
-
-        self._nout = 0
-        clk_i = self._clk_i
-        reset_i = self._reset_i
-        ready_i = self._ready_i
-        valid_o = self._valid_o
-
-        await FallingEdge(clk_i)
-
-        if(not (reset_i.value.is_resolvable and reset_i.value == 0)):
-            await FallingEdge(reset_i)
-
-        # Precondition: Falling Edge of Clock
-        while self._nout < self._length:
-            consume = self._generator.generate()
-            success = 0
-            ready_i.value = consume
-
-            # Wait until valid, but only read it on the positive edge
-            # of the clock.
-            while(consume and not success):
-                await RisingEdge(clk_i)
-                assert_resolvable(valid_o)
-                success = True if (valid_o.value == 1) else False
-                if (success):
-                    self._nout += 1
-
-            await FallingEdge(clk_i)
-
-        return self._nout
-
-class InputModel():
-    def __init__(self, dut, data, rate, l):
-        self._clk_i = dut.cclk_i
-        self._reset_i = dut.creset_i
-        self._ready_o = dut.cready_o
-        self._valid_i = dut.cvalid_i
-        self._data_i = dut.cdata_i
-
-        # For safety sake
-        self._valid_i.value = 0
-
-        self._rv = ReadyValidInterface(self._clk_i, self._reset_i,
-                                       self._ready_o, self._valid_i)
-
-        self._rate = rate
-        self._data = data
-        self._length = l
-
-        self._coro = None
-
-        self._nin = 0
-
-    def start(self):
-        """ Start Input Model """
-        if self._coro is not None:
-            raise RuntimeError("Input Model already started")
-        self._coro = cocotb.start_soon(self._run())
-
-    def stop(self) -> None:
-        """ Stop Input Model """
-        if self._coro is None:
-            raise RuntimeError("Input Model never started")
-        self._coro.kill()
-        self._coro = None
-
-    async def wait(self, t):
-        await with_timeout(self._coro, t, 'ns')
-
-    def nconsumed(self):
-        return self._nin
-
-    async def _run(self):
-        """ Input Model Coroutine"""
-
-        self._nin = 0
-        clk_i = self._clk_i
-        reset_i = self._reset_i
-        ready_o = self._ready_o
-        valid_i = self._valid_i
-        data_i = self._data_i
-
-        await ClockCycles(clk_i, 1, rising=False)
-
-        # If reset is not resolvable, or reset is high, wait until it goes to 0.
-        if(not (reset_i.value.is_resolvable and reset_i.value == 0)):
-            await FallingEdge(reset_i)
-
-        await ClockCycles(clk_i, 2, rising=False)
-
-        # Precondition: Falling Edge of Clock
-        while self._nin < self._length:
-            produce = self._rate.generate()
-            din = self._data.generate()
-            success = 0
-            valid_i.value = produce
-            data_i.value = din
-
-            # Wait until ready
-            while(produce and not success):
-                await RisingEdge(clk_i)
-                assert_resolvable(ready_o)
-
-                success = True if (ready_o.value == 1) else False
-                if (success):
-                    self._nin += 1
-
-            await FallingEdge(clk_i)
-        return self._nin
-
-class ModelRunner():
-    def __init__(self, dut, model):
-
-        self._rv_in = ReadyValidInterface(dut.cclk_i, dut.creset_i,
-                                          dut.cready_o, dut.cvalid_i)
-
-        self._rv_out = ReadyValidInterface(dut.pclk_i, dut.preset_i,
-                                           dut.pready_i, dut.pvalid_o)
-
-        self._model = model
-
-        self._events = queue.SimpleQueue()
-
-        self._coro_run_in = None
-        self._coro_run_out = None
-
-    def start(self):
-        """Start model"""
-        if self._coro_run_in is not None:
-            raise RuntimeError("Model already started")
-        self._coro_run_input = cocotb.start_soon(self._run_input(self._model))
-        self._coro_run_output = cocotb.start_soon(self._run_output(self._model))
-
-    async def _run_input(self, model):
-        while True:
-            await self._rv_in.handshake(None)
-            self._events.put(get_sim_time(units='ns'))
-            self._model.consume()
-
-    async def _run_output(self, model):
-        while True:
-            await self._rv_out.handshake(None)
-            assert (self._events.qsize() > 0), "Error! Module produced output without valid input"
-            input_time = self._events.get(get_sim_time(units='ns'))
-            self._model.produce()
+# Long-running soak test. Opt in by setting SOAK_BEATS, e.g.
+# SOAK_BEATS=100000000 pytest -k soak
+@pytest.mark.skipif("SOAK_BEATS" not in os.environ, reason="Set SOAK_BEATS to run the soak test")
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_soak(simulator, width_p, depth_log2_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['simulator']
+    runner(simulator, timescale, tbpath, parameters, testname="soak_test")
 
-    def stop(self) -> None:
-        """Stop monitor"""
-        if self._coro_run is None:
-            raise RuntimeError("Monitor never started")
-        self._coro_run_input.kill()
-        self._coro_run_output.kill()
-        self._coro_run_input = None
-        self._coro_run_output = None
-
-
-async def reset_test(dut, pclk_period, cclk_period):
-    """Test for Initialization"""
-
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
+# Throughput benchmark across clock ratios. Every point writes a
+# throughput_<pclk>_<cclk>.csv in its run directory, and the rows are
+# collected into run/throughput.csv at the end of the session.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("test_name", throughput_tests)
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_throughput(simulator, test_name, width_p, depth_log2_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    batch_runner(simulator, timescale, tbpath, parameters, test_name, throughput_tests)
+
+# Stimulus backend comparison. The same tests run with the hand-written
+# InputModel/OutputModel and with cocotbext.axi (see make_models). The
+# backend is selected with a plusarg, since cocotb-test lets a
+# TB_BACKEND in the caller's environment override env. The throughput
+# tests record beats per wall-clock second for each backend in
+# run/throughput.csv.
+@pytest.mark.parametrize("width_p", [7, 32])
+@pytest.mark.parametrize("depth_log2_p", [4])
+@pytest.mark.parametrize("backend", ["models", "axi"])
+@pytest.mark.parametrize("test_name", throughput_tests + [t for t in tests if t.startswith(("stream", "fuzz"))])
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_backend(simulator, test_name, width_p, depth_log2_p, backend):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    del parameters['backend']
+    work_dir = os.path.join(tbpath, "run", backend, test_name, get_param_string(parameters), simulator)
+    runner(simulator, timescale, tbpath, parameters, testname=test_name, work_dir=work_dir, plusargs=[f"+tb_backend={backend}"])
+
+# Cost of the two driver modes of InputModel/OutputModel (see
+# fifo_tb/drivers.py). Each test runs with the cycle-by-cycle and the
+# batched coroutines, which must read the same elements at the same
+# times (record_outputs in the bench). The wall time of each mode comes
+# from a plain run, and the triggers from a profiled one, and both go
+# into run/drivers.csv. The ModelRunner monitors sample every clock
+# edge in both modes, so only the driver side of the cost changes.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4])
+@pytest.mark.parametrize("test_name", ["stream_test_001", "fuzz_test_001", "throughput_test_001"])
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_drivers(simulator, test_name, width_p, depth_log2_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    base_dir = os.path.join(tbpath, "run", "drivers", test_name, get_param_string(parameters), simulator)
+    wall = {}
+    triggers = {}
+    outputs = {}
+    for drivers in ("cycle", "batched"):
+        for profile in (False, True):
+            work_dir = os.path.join(base_dir, drivers, "profile" if profile else "wall")
+            runner(simulator, timescale, tbpath, parameters, testname=test_name, work_dir=work_dir,
+                   profile=profile, incremental=False, plusargs=[f"+tb_drivers={drivers}"])
+            with open(os.path.join(work_dir, "profile.json")) as fd:
+                summary = json.load(fd)
+            if(profile):
+                triggers[drivers] = summary["triggers_awaited"]
+            else:
+                wall[drivers] = summary["wall_time_s"]
+                with open(os.path.join(work_dir, "drivers_outputs.txt")) as fd:
+                    outputs[drivers] = fd.read()
+
+    speedup = wall["cycle"] / wall["batched"] if wall["batched"] else 0
+    elements = len(outputs["batched"].splitlines())
+    with open(os.path.join(base_dir, "drivers.csv"), "w") as fd:
+        fd.write("test,cycle_wall_time_s,batched_wall_time_s,speedup,cycle_triggers,batched_triggers,elements\n")
+        fd.write(f"{test_name},{wall['cycle']:.4f},{wall['batched']:.4f},{speedup:.2f},"
+                 f"{triggers['cycle']},{triggers['batched']},{elements}\n")
+
+    assert outputs["cycle"], "Error! No elements were read with the cycle-by-cycle drivers."
+    assert outputs["batched"] == outputs["cycle"], f"Error! The two driver modes read different elements, or at different times (see drivers_outputs.txt in {base_dir})."
+    assert triggers["batched"] < triggers["cycle"], f"Error! The batched drivers awaited {triggers['batched']} triggers, no fewer than the {triggers['cycle']} of the cycle-by-cycle drivers."
+    # Wall time is noisy, so the batched drivers only have to be no more
+    # than 25% slower. The speedup itself is in run/drivers.csv.
+    assert wall["batched"] <= 1.25 * wall["cycle"], f"Error! The batched drivers took {wall['batched']:.2f} s, against {wall['cycle']:.2f} s for the cycle-by-cycle drivers."
+
+# util/fifo_depth.py --simulate, at the 25 MHz/12 MHz pair from top.sv,
+# whose periods are not whole ps. The analytic depth must not stall the
+# producer in simulation.
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_depth_probe(simulator):
+    from fifo_depth import analytic_depth, simulate_stalls
+    cclk_mhz, pclk_mhz, burst, idle = 25, 12, 16, 48
+    a = analytic_depth(cclk_mhz, pclk_mhz, burst, idle)
+    stalls = simulate_stalls(32, a["depth_log2_p"], cclk_mhz, pclk_mhz, burst, idle, 1, 4, simulator)
+    assert stalls == 0, f"Error! The producer stalled for {stalls} cycles with depth_log2_p = {a['depth_log2_p']}, the analytic minimum."
+
+# Synchronizer depth sweep. Same points as test_throughput, so the
+# latency and throughput cost of each synchronizer stage shows up in
+# run/throughput.csv next to the default (sync_stages_p = 2).
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("sync_stages_p", [1, 3, 4])
+@pytest.mark.parametrize("test_name", throughput_tests)
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_sync_stages(simulator, test_name, width_p, depth_log2_p, sync_stages_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    batch_runner(simulator, timescale, tbpath, parameters, test_name, throughput_tests)
 
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-async def single_test(dut, pclk_period, cclk_period):
-    """Test to transmit a single element."""
-
-    l = 1
-    rate = 1
-
-    m = ModelRunner(dut, FifoModel(dut))
-    om = OutputModel(dut, RateGenerator(dut, 1), l)
-    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
+# First-word fall-through mode. Runs every test in one simulation,
+# like test_all.
+@pytest.mark.parametrize("width_p", [7, 32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("sync_stages_p", [2, 3])
+@pytest.mark.parametrize("fwft_p", [1])
+@pytest.mark.parametrize("simulator", ["verilator", "icarus"])
+@max_score(0)
+def test_fwft(simulator, width_p, depth_log2_p, sync_stages_p, fwft_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['simulator']
+    runner(simulator, timescale, tbpath, parameters)
 
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
-
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-    m.start()
-    om.start()
-    im.start()
-
-    # Ensure that an initial handshake happens. This will time out if
-    # ready never occurs, or valid.
-    try:
-        await im._rv.handshake(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
-
-    try:
-        await om._rv.is_ready(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
-
-    nproduced = 0
-    try:
-        await om.wait(10 * pclk_period)
-    except:
-        nproduced = om.nproduced()
-
-    assert nproduced != 1, f"Error! Could transmit a single element."
-
-
-async def fill_test(dut, pclk_period, cclk_period):
-    """Test if fifo_1r1w fills to depth_p elements"""
-
-    depth_p = (1 << dut.depth_log2_p.value)
-    l = depth_p
-    rate = 1
-
-    m = ModelRunner(dut, FifoModel(dut))
-    om = OutputModel(dut, RateGenerator(dut, 0), l)
-    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
-
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
-
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-    m.start()
-    om.start()
-    im.start()
-
-    # Ensure that an initial handshake happens. This will time out if
-    # ready never occurs, or valid.
-    try:
-        await im._rv.handshake(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
-
-    success = False
-    try:
-        await im.wait(depth_p)
-        success = True
-    except:
-        nconsumed = im.nconsumed()
-
-    if(not success):
-        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
-
-async def fill_empty_test(dut, pclk_period, cclk_period):
-    """Test if fifo_1r1w fills to depth_p elements, and then empties
-    successfully"""
-
-    depth_p = (1 << dut.depth_log2_p.value)
-    l = depth_p
-    rate = 1
-
-    m = ModelRunner(dut, FifoModel(dut))
-    om = OutputModel(dut, RateGenerator(dut, 0), l)
-    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
-
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
-
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-    m.start()
-    om.start()
-    im.start()
-
-    # Ensure that an initial handshake happens. This will time out if
-    # ready never occurs, or valid.
-    try:
-        await im._rv.handshake(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out waiting for cready_o/cvalid_i handshake at start of test."
-
-    success = False
-    try:
-        await im.wait(depth_p * cclk_period)
-        success = True
-    except:
-        nconsumed = im.nconsumed()
-
-    if(not success):
-        assert nconsumed != depth_p, f"Error! Could not fill fifo with {depth_p} elements in {depth_p} cycles. Fifo consumed {nconsumed} elements."
-
-    om = OutputModel(dut, RateGenerator(dut, 1), l)
-    om.start()
-
-    try:
-        await om._rv.is_ready(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
-
-    nproduced = 0
-    success = False
-    try:
-        await om.wait(depth_p * pclk_period)
-        success = True
-    except:
-        nproduced = om.nproduced()
-
-    if(not success):
-        assert nproduced != depth_p, f"Error! Could not empty fifo with {depth_p} elements in {depth_p} cycles. Fifo produced {nproduced} elements."
-
-#@cocotb.test()
-async def fuzz_test(dut, pclk_period, cclk_period):
-    """Transmit 4 * depth_p random data elements at 50% line rate"""
-
-    l = (1 << dut.depth_log2_p.value) * 4
-    rate = .5
-
-    timeout = l * int(1/rate) * int(1/rate) * 4 * max(pclk_period, cclk_period)
-
-    m = ModelRunner(dut, FifoModel(dut))
-    om = OutputModel(dut, RateGenerator(dut, rate), l)
-    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
-
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
-
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-    m.start()
-    om.start()
-    im.start()
-
-    # We're doing a throughput test. We only care about the output
-    # throughput.  We can wait for the rising edge of valid_o because
-    # it (should, if the circuit is implemented correctly) occur at,
-    # or just after the clock edge.
-    try:
-        await om._rv.is_ready(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
-
-    try:
-        await om.wait(timeout)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}"
-
-#@cocotb.test()
-async def stream_test(dut, pclk_period, cclk_period):
-    """Transmit 4 * depth_p random data elements at 100% line rate"""
-
-    # This is the InputModel
-    l = (1 << dut.depth_log2_p.value) * 4
-    rate = 1
-
-    timeout = max(pclk_period, cclk_period) * l * 2
-
-    m = ModelRunner(dut, FifoModel(dut))
-    om = OutputModel(dut, RateGenerator(dut, rate), l)
-    im = InputModel(dut, RandomDataGenerator(dut), RateGenerator(dut, rate), l)
-
-    pclk_i = dut.pclk_i
-    preset_i = dut.preset_i
-    cclk_i = dut.cclk_i
-    creset_i = dut.creset_i
-
-    width_p = dut.width_p.value
-
-    await clock_start_sequence(pclk_i, period=pclk_period)
-    await clock_start_sequence(cclk_i, period=cclk_period)
-    await reset_sequence(pclk_i, preset_i, 10)
-    await reset_sequence(cclk_i, creset_i, 10)
-
-    m.start()
-    om.start()
-    im.start()
-
-    # We're doing a throughput test. We only care about the output
-    # throughput.  We can wait for the rising edge of valid_o because
-    # it (should, if the circuit is implemented correctly) occur at,
-    # or just after the clock edge.
-    try:
-        await om._rv.is_ready(100)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Testbench is waiting for pvalid_o, but pvalid_o never went high in 100 clock cycles after reset."
-
-    try:
-        await om.wait(timeout)
-    except cocotb.result.SimTimeoutError:
-        assert 0, f"Test timed out. Could not transmit {l} elements in {timeout} ns, with output rate {rate}"
-
-pclk_periods = [1, 5]
-cclk_periods = [1, 3.1]
-tf = TestFactory(test_function=stream_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
-
-tf = TestFactory(test_function=fuzz_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
-
-tf = TestFactory(test_function=fill_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
-
-tf = TestFactory(test_function=fill_empty_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
-
-tf = TestFactory(test_function=reset_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
-
-tf = TestFactory(test_function=single_test)
-tf.add_option(name='pclk_period', optionlist=pclk_periods)
-tf.add_option(name='cclk_period', optionlist=cclk_periods)
-tf.generate_tests()
+# Fill levels and almost full/empty flags, across thresholds and
+# synchronizer depths.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4])
+@pytest.mark.parametrize("almost_full_p", [8, 15])
+@pytest.mark.parametrize("almost_empty_p", [1, 4])
+@pytest.mark.parametrize("sync_stages_p", [1, 2, 3])
+@pytest.mark.parametrize("simulator", ["verilator", "icarus"])
+@max_score(0)
+def test_almost(simulator, width_p, depth_log2_p, almost_full_p, almost_empty_p, sync_stages_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['simulator']
+    almost_tests = [f"almost_test_{i:03d}" for i in range(1, 5)]
+    for test_name in almost_tests:
+        batch_runner(simulator, timescale, tbpath, parameters, test_name, almost_tests)
+
+# Checks of the Python model of the fifo (fifo_1r1w_cdc_model.py).
+# These don't need a simulator: every element must come out in order,
+# occupancy can never exceed depth_p, and with both sides always
+# ready the throughput must match the analytic one (see model_rate).
+def model_rate(pclk_period, cclk_period, depth_log2_p, sync_stages):
+    """ Analytic throughput of the fifo with both sides always ready, in
+    elements per ns: the line rate of the slower side, unless depth_p
+    elements can't cover the pointer round trip. A slot is free again
+    one cclk cycle (the write pointer retiming), sync_stages + 1 pclk
+    cycles and sync_stages + 1 cclk cycles after it was written, at
+    worst, so depth_p elements are moved at least once per round trip.
+
+    Arguments:
+    pclk_period -- pclk period in ns
+    cclk_period -- cclk period in ns
+    depth_log2_p -- log2 of the number of fifo elements
+    sync_stages -- Number of synchronizer flops per pointer
+    """
+    round_trip = cclk_period + (sync_stages + 1) * (pclk_period + cclk_period)
+    return min(1 / max(pclk_period, cclk_period), (1 << depth_log2_p) / round_trip)
+
+@pytest.mark.parametrize("sync_stages", [1, 2, 3])
+@pytest.mark.parametrize("depth_log2_p", [4, 2, 1])
+@pytest.mark.parametrize("periods", throughput_periods)
+@max_score(0)
+def test_model(periods, depth_log2_p, sync_stages):
+    import numpy as np
+    from fifo_1r1w_cdc_model import FifoCdcModel
+
+    pclk_period, cclk_period = periods
+    n = 20000
+    m = FifoCdcModel(32, depth_log2_p, sync_stages)
+
+    r = m.run(pclk_period, cclk_period, np.ones(n, bool), np.ones(n, bool))
+    assert (r["data"] == np.arange(len(r["data"]))).all(), "Error! Elements were lost or reordered."
+    assert r["max_occupancy"] <= (1 << depth_log2_p), f"Error! Occupancy {r['max_occupancy']} exceeds depth_p."
+
+    elapsed = r["deq_ns"][-1] - r["deq_ns"][0]
+    measured = (len(r["deq_ns"]) - 1) / elapsed
+    line_rate = 1 / max(pclk_period, cclk_period)
+    expected = model_rate(pclk_period, cclk_period, depth_log2_p, sync_stages)
+    assert measured >= 0.99 * expected, f"Error! Model throughput is {measured:.4f} elements/ns, expected at least {expected:.4f}."
+    assert measured <= 1.01 * line_rate, f"Error! Model throughput is {measured:.4f} elements/ns, above the line rate of {line_rate:.4f}."
+
+    rng = np.random.default_rng(depth_log2_p)
+    r = m.run(pclk_period, cclk_period, rng.random(n) < 0.5, rng.random(n) < 0.5)
+    assert (r["data"] == np.arange(len(r["data"]))).all(), "Error! Elements were lost or reordered."
+    assert r["max_occupancy"] <= (1 << depth_log2_p), f"Error! Occupancy {r['max_occupancy']} exceeds depth_p."
+
+# fwft_p must take the write pointer retiming cycle off the latency of
+# every element written into an empty fifo (to within a pclk cycle of
+# phase), and must not cost throughput.
+@pytest.mark.parametrize("sync_stages", [2, 3])
+@pytest.mark.parametrize("periods", throughput_periods)
+@max_score(0)
+def test_model_fwft(periods, sync_stages):
+    import numpy as np
+    from fifo_1r1w_cdc_model import FifoCdcModel
+
+    pclk_period, cclk_period = periods
+    n = 20000
+
+    # One element every 64 cclk cycles always finds the fifo empty.
+    valid = (np.arange(n) % 64) == 0
+    base = FifoCdcModel(32, 4, sync_stages).run(pclk_period, cclk_period, valid, np.ones(n, bool))
+    fwft = FifoCdcModel(32, 4, sync_stages, fwft=True).run(pclk_period, cclk_period, valid, np.ones(n, bool))
+    assert (fwft["data"] == np.arange(len(fwft["data"]))).all(), "Error! Elements were lost or reordered."
+    saved = base["latency_ns"].mean() - fwft["latency_ns"].mean()
+    assert saved >= cclk_period - pclk_period, f"Error! fwft only saved {saved:.3f} ns of latency."
+    worst = fwft["latency_ns"].max() / pclk_period
+    assert worst <= sync_stages + 2, f"Error! First-word latency is {worst:.2f} pclk cycles with fwft."
+
+    base = FifoCdcModel(32, 4, sync_stages).run(pclk_period, cclk_period, np.ones(n, bool), np.ones(n, bool))
+    fwft = FifoCdcModel(32, 4, sync_stages, fwft=True).run(pclk_period, cclk_period, np.ones(n, bool), np.ones(n, bool))
+    assert (fwft["data"] == np.arange(len(fwft["data"]))).all(), "Error! Elements were lost or reordered."
+    assert len(fwft["deq_ns"]) >= len(base["deq_ns"]), "Error! fwft transmitted fewer elements."
+
+# pytest imports the test module once per session, with pytest already
+# loaded, and every simulation imports the tb module (and fifo_tb.axi,
+# with the axi backend), with cocotb already loaded. Neither side may
+# pull in the other: the pytest side must not import cocotb, NumPy,
+# cocotbext-axi or the tb module, and the simulator side must not
+# import pytest_utils, cocotb-test, GitPython or this module.
+pytest_forbid = ["cocotb", "numpy", "cocotbext.axi", "tb_fifo_1r1w_cdc"]
+cocotb_forbid = ["test_fifo_1r1w_cdc", "pytest_utils", "cocotb_test", "git"]
+
+# Startup cost of the testbench modules, in ms. Wall-clock time depends
+# on the machine, so the limits are only checked with
+# IMPORT_TIME_BUDGET=1, and can be scaled with IMPORT_TIME_SCALE.
+import_limits = [("test_fifo_1r1w_cdc", "pytest", 150)
+                 ,("tb_fifo_1r1w_cdc", "cocotb", 400)
+                 ,("fifo_tb.axi", "cocotb", 250)
+                 ]
+
+@pytest.mark.parametrize("module, preload, limit_ms", import_limits)
+@max_score(0)
+def test_import_time(module, preload, limit_ms):
+    forbid = cocotb_forbid if (preload == "cocotb") else pytest_forbid
+    budget = (os.environ.get("IMPORT_TIME_BUDGET", "0") == "1")
+    t = get_import_time(module, tbpath, preload=[preload], forbid=forbid, repeat=(3 if budget else 1))
+    if(budget):
+        limit_ms *= float(os.environ.get("IMPORT_TIME_SCALE", 1))
+        assert t <= limit_ms, f"Error! Importing {module} took {t:.0f} ms, expected at most {limit_ms:.0f} ms."
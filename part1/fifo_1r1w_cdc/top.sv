@@ -221,12 +221,16 @@ module top
       .creset_i                         (reset_25_r),
       .cdata_i                          ({data_left_li, data_right_li}),
       .cvalid_i                         (valid_li),
+      .cfill_o                          (),
+      .calmost_full_o                   (),
 
       .pclk_i                           (clk_12mhz_o),
       .preset_i                         (reset_12_r),
       .pdata_o                          (_data_o),
       .pvalid_o                         (_valid_o),
-      .pready_i                         (_ready_o));
+      .pready_i                         (_ready_o),
+      .pfill_o                          (),
+      .palmost_empty_o                  ());
 
    fifo_1r1w_cdc
      #(// Parameters
@@ -238,12 +242,16 @@ module top
       .creset_i                         (reset_12_r),
       .cdata_i                          (_data_o),
       .cvalid_i                         (_valid_o),
+      .cfill_o                          (),
+      .calmost_full_o                   (),
 
       .pvalid_o                         (valid_lo),
       .pdata_o                          ({data_left_lo, data_right_lo}),
       .pclk_i                           (clk_25mhz_o),
       .preset_i                         (reset_25_r),
-      .pready_i                         (ready_li));
+      .pready_i                         (ready_li),
+      .pfill_o                          (),
+      .palmost_empty_o                  ());
 
                          
 endmodule
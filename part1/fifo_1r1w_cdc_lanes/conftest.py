@@ -0,0 +1,30 @@
+import os
+import sys
+import uuid
+
+tbpath = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(tbpath, "..", "..", "util"))
+
+# Tell the testbench (and utilities) where the repository is, so they
+# don't have to search for it.
+os.environ.setdefault("REPO_ROOT", os.path.realpath(os.path.join(tbpath, "..", "..")))
+
+# One id for the whole run, so that the tests of a batch (see
+# batch_runner) run it once. pytest-xdist workers inherit it, and
+# util/scheduler.py sets one for all of its pytest processes.
+os.environ.setdefault("SIM_RUN_ID", uuid.uuid4().hex)
+
+def pytest_make_parametrize_id(config, val, argname):
+    return f"{argname}={val}"
+
+def pytest_sessionfinish(session, exitstatus):
+    # Summarize the speed of every simulation run in run/profile.json
+    from utilities import aggregate_profiles, aggregate_csv, format_table
+    aggregate_profiles(tbpath)
+
+    # Collect the per-lane-count throughput into run/throughput.csv
+    rows = aggregate_csv(tbpath, "throughput")
+    reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+    if(rows and reporter is not None):
+        reporter.write_sep("-", "throughput (run/throughput.csv)")
+        reporter.write_line(format_table(rows))
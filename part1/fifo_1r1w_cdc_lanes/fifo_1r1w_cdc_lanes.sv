@@ -0,0 +1,106 @@
+// Generated by util/gen_fifo_cdc_lanes.py --front-end gearbox. Do not edit.
+module fifo_1r1w_cdc_lanes
+ #(parameter [31:0] width_p = 24
+  ,parameter [31:0] depth_log2_p = 4
+  ,parameter [31:0] lanes_p = 2
+   // Passed to fifo_1r1w_cdc. The fill levels and thresholds count
+   // entries of lanes_p words.
+  ,parameter [31:0] sync_stages_p = 2
+  ,parameter [31:0] almost_full_p = (1 << depth_log2_p) - 1
+  ,parameter [31:0] almost_empty_p = 1
+  ,parameter [0:0] fwft_p = 0
+  )
+   // Each fifo entry holds lanes_p words of width_p bits. Lane 0 is
+   // the least significant word, and the first in stream order.
+  (input [0:0] cclk_i
+  ,input [0:0] creset_i
+  ,input [width_p-1:0] cdata_i
+  ,input [0:0] cvalid_i
+  ,output [0:0] cready_o
+  ,output [depth_log2_p:0] cfill_o
+  ,output [0:0] calmost_full_o
+
+  ,input [0:0] pclk_i
+  ,input [0:0] preset_i
+  ,output [0:0] pvalid_o
+  ,output [(lanes_p*width_p)-1:0] pdata_o
+  ,input [0:0] pready_i
+  ,output [depth_log2_p:0] pfill_o
+  ,output [0:0] palmost_empty_o
+  );
+
+  logic [0:0] full;
+  logic [0:0] wr_valid;
+  logic [(lanes_p*width_p)-1:0] wr_data;
+
+  // Gearbox front end: collect lanes_p words from the producer, then
+  // write them to the fifo as one entry. While a complete entry waits
+  // for space, the producer is stalled, unless the entry is written
+  // on this same edge.
+  localparam cnt_width_lp = $clog2(lanes_p+1);
+  logic [cnt_width_lp-1:0] gear_cnt;
+  logic [width_p-1:0] gear_data [lanes_p-1:0];
+  logic [0:0] gear_full, gear_en, gear_wr;
+
+  assign gear_full = (gear_cnt == cnt_width_lp'(lanes_p));
+  assign wr_valid = gear_full;
+  assign gear_wr = gear_full & ~full;
+  assign cready_o = ~gear_full | ~full;
+  assign gear_en = cvalid_i & cready_o;
+
+  always_ff @(posedge cclk_i) begin
+    if (creset_i) begin
+      gear_cnt <= '0;
+    end
+    else begin
+      if (gear_wr & gear_en) begin
+        gear_cnt <= 1;
+      end
+      else if (gear_wr) begin
+        gear_cnt <= '0;
+      end
+      else if (gear_en) begin
+        gear_cnt <= gear_cnt + 1;
+      end
+    end
+  end
+
+  for (genvar i = 0; i < lanes_p; i++) begin : gear
+    always_ff @(posedge cclk_i) begin
+      if (gear_en && (gear_wr ? (i == 0) : (gear_cnt == cnt_width_lp'(i)))) begin
+        gear_data[i] <= cdata_i;
+      end
+    end
+    assign wr_data[i*width_p +: width_p] = gear_data[i];
+  end
+
+  // The fifo itself, with one lanes_p * width_p bit word per entry.
+  logic [0:0] fifo_ready;
+  assign full = ~fifo_ready;
+
+  fifo_1r1w_cdc
+  #(.width_p(lanes_p*width_p)
+   ,.depth_log2_p(depth_log2_p)
+   ,.sync_stages_p(sync_stages_p)
+   ,.almost_full_p(almost_full_p)
+   ,.almost_empty_p(almost_empty_p)
+   ,.fwft_p(fwft_p))
+  fifo_inst
+  (.cclk_i(cclk_i)
+  ,.creset_i(creset_i)
+  ,.cdata_i(wr_data)
+  ,.cvalid_i(wr_valid)
+  ,.cready_o(fifo_ready)
+  ,.cfill_o(cfill_o)
+  ,.calmost_full_o(calmost_full_o)
+
+  ,.pclk_i(pclk_i)
+  ,.preset_i(preset_i)
+  ,.pvalid_o(pvalid_o)
+  ,.pdata_o(pdata_o)
+  ,.pready_i(pready_i)
+  ,.pfill_o(pfill_o)
+  ,.palmost_empty_o(palmost_empty_o)
+  );
+
+endmodule
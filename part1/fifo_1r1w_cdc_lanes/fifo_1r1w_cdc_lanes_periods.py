@@ -0,0 +1,15 @@
+# Clock periods shared by the two sides of the fifo_1r1w_cdc_lanes
+# bench: test_fifo_1r1w_cdc_lanes.py names one test per pair, and
+# tb_fifo_1r1w_cdc_lanes.py generates them. Keep this free of imports,
+# the simulator imports it with every test.
+
+# (pclk_period, cclk_period) pairs in ns. The last one is the 12 MHz
+# consumer/25 MHz producer pair from top.sv, where one lane is not
+# enough. 1000/12 ns is not a whole number of ps, so
+# clock_start_sequence rounds the periods to whole simulator steps (see
+# get_clock_steps), and so do the timeouts.
+periods = [(1, 1)
+           ,(2, 1)
+           ,(1, 2)
+           ,(1000/12, 1000/25)
+           ]
@@ -0,0 +1,203 @@
+# cocotb tests for fifo_1r1w_cdc_lanes. This module is only imported by the
+# simulator (runner loads tb_<top> by default); the pytest side,
+# with the clock period table shared with it, is in
+# test_fifo_1r1w_cdc_lanes.py.
+import os
+import sys
+import math
+
+# REPO_ROOT is set by runner, so the repository is only searched for
+# (with git) when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import assert_resolvable, clock_start_sequence, reset_sequence
+from fifo_tb import ReadyValidInterface, RandomDataGenerator, RateGenerator, InputModel, OutputModel
+from fifo_1r1w_cdc_lanes_periods import periods
+
+import cocotb
+
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from collections import deque
+
+class WordGenerator(RandomDataGenerator):
+    """Random words as wide as cdata_i (one lane with the gearbox front
+    end, all lanes without it)."""
+    __slots__ = ()
+
+    def __init__(self, dut, block=4096):
+        super().__init__(dut, block, width=len(dut.cdata_i))
+
+class LanesModel():
+    """Scoreboard for the multi-lane fifo. Every handshake on the
+    producer side enqueues the words in cdata_i, and every handshake on
+    the consumer side must produce the next lanes_p words, lane 0
+    first."""
+    def __init__(self, dut):
+
+        self._data_i = dut.cdata_i
+        self._data_o = dut.pdata_o
+
+        self._width_p = int(dut.width_p.value)
+        self._lanes_p = int(dut.lanes_p.value)
+        self._in_lanes = len(dut.cdata_i) // self._width_p
+        self._mask = (1 << self._width_p) - 1
+
+        # The fifo holds at most depth_p entries, and the gearbox one
+        # more that is still being filled.
+        self._size = ((1 << int(dut.depth_log2_p.value)) + 2) * self._lanes_p
+        self._q = deque()
+        self._deqs = 0
+
+    def consume(self):
+        assert_resolvable(self._data_i)
+        v = int(self._data_i.value)
+        for i in range(self._in_lanes):
+            self._q.append((v >> (i * self._width_p)) & self._mask)
+        assert len(self._q) <= self._size, f"Error! Fifo accepted more than {self._size} words without producing any."
+
+    def produce(self):
+        assert_resolvable(self._data_o)
+        assert len(self._q) >= self._lanes_p, f"Error! Module produced {self._lanes_p} words, but only {len(self._q)} were written."
+        v = int(self._data_o.value)
+        for i in range(self._lanes_p):
+            got = (v >> (i * self._width_p)) & self._mask
+            expected = self._q.popleft()
+            assert got == expected, f"Error! Word {self._deqs} (lane {i}) does not match expected. Expected: {expected}. Got: {got}"
+            self._deqs += 1
+
+class LanesModelRunner():
+    """Run the scoreboard on every handshake and measure the output rate
+    in words per ns."""
+    def __init__(self, dut, model):
+
+        self._rv_in = ReadyValidInterface(dut.cclk_i, dut.creset_i,
+                                          dut.cready_o, dut.cvalid_i)
+
+        self._rv_out = ReadyValidInterface(dut.pclk_i, dut.preset_i,
+                                           dut.pready_i, dut.pvalid_o)
+
+        self._model = model
+        self._lanes_p = int(dut.lanes_p.value)
+
+        self._first_ns = None
+        self._last_ns = None
+        self._entries = 0
+
+        self._coro_run_input = None
+        self._coro_run_output = None
+
+    def start(self):
+        """Start model"""
+        if self._coro_run_input is not None:
+            raise RuntimeError("Model already started")
+        self._coro_run_input = cocotb.start_soon(self._run_input())
+        self._coro_run_output = cocotb.start_soon(self._run_output())
+
+    async def _run_input(self):
+        while True:
+            await self._rv_in.handshake(None)
+            self._model.consume()
+
+    async def _run_output(self):
+        while True:
+            await self._rv_out.handshake(None)
+            self._model.produce()
+            t = get_sim_time(units='ns')
+            if(self._first_ns is None):
+                self._first_ns = t
+            self._last_ns = t
+            self._entries += 1
+
+    def throughput(self):
+        """Output rate in words per ns, from the first to the last
+        handshake."""
+        if(self._entries < 2):
+            return 0
+        return (self._entries - 1) * self._lanes_p / (self._last_ns - self._first_ns)
+
+async def start_sequence(dut, pclk_period, cclk_period):
+    await clock_start_sequence(dut.pclk_i, period=pclk_period)
+    await clock_start_sequence(dut.cclk_i, period=cclk_period)
+    await reset_sequence(dut.pclk_i, dut.preset_i, 10)
+    await reset_sequence(dut.cclk_i, dut.creset_i, 10)
+
+async def stream_test(dut, pclk_period, cclk_period):
+    """Stream 16 * depth_p entries at 100% line rate, and record the
+    throughput in words per ns. The fifo must sustain at least
+    THROUGHPUT_FRACTION (default .5) of min(producer rate, lanes_p words
+    per pclk cycle)."""
+
+    lanes_p = int(dut.lanes_p.value)
+    in_lanes = len(dut.cdata_i) // int(dut.width_p.value)
+    entries = (1 << dut.depth_log2_p.value) * 16
+    words = entries * lanes_p
+    fraction = float(os.environ.get("THROUGHPUT_FRACTION", .5))
+
+    # Whole ns, since the periods need not be whole ps
+    timeout = math.ceil(max(pclk_period, cclk_period) * words * 4)
+
+    m = LanesModelRunner(dut, LanesModel(dut))
+    om = OutputModel(dut, RateGenerator(dut, 1), entries, batched=True, prefix="p")
+    im = InputModel(dut, WordGenerator(dut), RateGenerator(dut, 1), words // in_lanes, batched=True, prefix="c")
+
+    await start_sequence(dut, pclk_period, cclk_period)
+
+    m.start()
+    om.start()
+    im.start()
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {words} words in {timeout} ns"
+
+    # Words per ns
+    theoretical = min(in_lanes / cclk_period, lanes_p / pclk_period)
+    measured = m.throughput()
+
+    with open(f"throughput_lanes{lanes_p}_{pclk_period:.4f}_{cclk_period:.4f}.csv", "w") as fd:
+        fd.write("lanes_p,pclk_period_ns,cclk_period_ns,width_p,depth_log2_p,words,theoretical_per_ns,measured_per_ns,fraction\n")
+        fd.write(f"{lanes_p},{pclk_period:.4f},{cclk_period:.4f},{dut.width_p.value},{dut.depth_log2_p.value},{words},"
+                 f"{theoretical:.6f},{measured:.6f},{measured / theoretical:.4f}\n")
+
+    assert measured >= fraction * theoretical, f"Error! Sustained throughput is {measured / theoretical:.2f} of the theoretical maximum ({measured:.4f} vs {theoretical:.4f} words/ns), expected at least {fraction}."
+
+async def fuzz_test(dut, pclk_period, cclk_period):
+    """Transmit 4 * depth_p entries with both sides at 50% line rate"""
+
+    lanes_p = int(dut.lanes_p.value)
+    in_lanes = len(dut.cdata_i) // int(dut.width_p.value)
+    entries = (1 << dut.depth_log2_p.value) * 4
+    words = entries * lanes_p
+    rate = .5
+
+    timeout = math.ceil(words * int(1/rate) * int(1/rate) * 4 * max(pclk_period, cclk_period))
+
+    m = LanesModelRunner(dut, LanesModel(dut))
+    om = OutputModel(dut, RateGenerator(dut, rate), entries, prefix="p")
+    im = InputModel(dut, WordGenerator(dut), RateGenerator(dut, rate), words // in_lanes, prefix="c")
+
+    await start_sequence(dut, pclk_period, cclk_period)
+
+    m.start()
+    om.start()
+    im.start()
+
+    try:
+        await om.wait(timeout)
+    except cocotb.result.SimTimeoutError:
+        assert 0, f"Test timed out. Could not transmit {words} words in {timeout} ns, with rate {rate}"
+
+tf = TestFactory(test_function=stream_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=fuzz_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=periods)
+tf.generate_tests()
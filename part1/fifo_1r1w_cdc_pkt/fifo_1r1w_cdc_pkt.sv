@@ -0,0 +1,163 @@
+module fifo_1r1w_cdc_pkt
+ #(parameter [31:0] width_p = 32
+  ,parameter [31:0] depth_log2_p = 8
+   // One keep bit per byte of data
+  ,parameter [31:0] keep_width_p = (width_p + 7) / 8
+   // Hold back pvalid_o until a whole packet (up to and including the
+   // beat with clast_i) has crossed. A packet longer than depth_p beats
+   // can never be held whole, so once the fifo is full it is passed
+   // through as it arrives (cut-through).
+  ,parameter [0:0] store_forward_p = 1
+   // Passed to fifo_1r1w_cdc
+  ,parameter [31:0] sync_stages_p = 2
+  ,parameter [0:0] fwft_p = 0
+  )
+   // fifo_1r1w_cdc with AXI-Stream style tlast/tkeep sideband bits.
+   // The "c" and "p" sides are the same as in fifo_1r1w_cdc.
+  (input [0:0] cclk_i
+  ,input [0:0] creset_i
+  ,input [width_p - 1:0] cdata_i
+  ,input [keep_width_p - 1:0] ckeep_i
+  ,input [0:0] clast_i
+  ,input [0:0] cvalid_i
+  ,output [0:0] cready_o
+
+  ,input [0:0] pclk_i
+  ,input [0:0] preset_i
+  ,output [0:0] pvalid_o
+  ,output [width_p - 1:0] pdata_o
+  ,output [keep_width_p - 1:0] pkeep_o
+  ,output [0:0] plast_o
+  ,input [0:0] pready_i
+   // Number of complete packets in the fifo, as seen from the p side
+  ,output [depth_log2_p:0] ppackets_o
+  );
+
+  // Every fifo element is one beat: {last, keep, data}
+  localparam fifo_width_lp = width_p + keep_width_p + 1;
+
+  logic [0:0] fifo_pvalid, fifo_pready;
+  logic [fifo_width_lp-1:0] fifo_pdata;
+  logic [depth_log2_p:0] fifo_pfill;
+
+  fifo_1r1w_cdc
+   #(.width_p(fifo_width_lp)
+    ,.depth_log2_p(depth_log2_p)
+    ,.sync_stages_p(sync_stages_p)
+    ,.fwft_p(fwft_p))
+  fifo_inst
+   (.cclk_i(cclk_i)
+   ,.creset_i(creset_i)
+   ,.cdata_i({clast_i, ckeep_i, cdata_i})
+   ,.cvalid_i(cvalid_i)
+   ,.cready_o(cready_o)
+   ,.cfill_o()
+   ,.calmost_full_o()
+
+   ,.pclk_i(pclk_i)
+   ,.preset_i(preset_i)
+   ,.pvalid_o(fifo_pvalid)
+   ,.pdata_o(fifo_pdata)
+   ,.pready_i(fifo_pready)
+   ,.pfill_o(fifo_pfill)
+   ,.palmost_empty_o());
+
+  assign pdata_o = fifo_pdata[width_p-1:0];
+  assign pkeep_o = fifo_pdata[width_p +: keep_width_p];
+  assign plast_o = fifo_pdata[fifo_width_lp-1];
+
+  // Packets written, counted in the cclk domain. Each packet is at
+  // least one beat, so there are never more than depth_p packets in
+  // the fifo, and the counter has the same width as the fifo pointers.
+  logic [depth_log2_p:0] pkt_wr, pkt_wr_next;
+  assign pkt_wr_next = (cvalid_i & cready_o & clast_i) ? (pkt_wr + 1) : pkt_wr;
+
+  always_ff @(posedge cclk_i) begin
+    if (creset_i) begin
+      pkt_wr <= '0;
+    end
+    else begin
+      pkt_wr <= pkt_wr_next;
+    end
+  end
+
+  // The packet count crosses like the write pointer of fifo_inst (from
+  // a gray-coded register, retimed unless fwft_p), so a packet is
+  // counted on the p side in the same cycle as its last beat becomes
+  // visible.
+  localparam [0:0] fwft_lp = fwft_p && (sync_stages_p >= 2);
+
+  logic [depth_log2_p:0] pkt_wr_gray_next;
+  bin2gray
+  #(.width_p(depth_log2_p+1))
+  bin2graypkt (
+    .bin_i((fwft_lp) ? pkt_wr_next : pkt_wr),
+    .gray_o(pkt_wr_gray_next)
+  );
+
+  logic [depth_log2_p:0] pkt_wr_gray;
+  always_ff @(posedge cclk_i) begin
+    if (creset_i) begin
+      pkt_wr_gray <= '0;
+    end
+    else begin
+      pkt_wr_gray <= pkt_wr_gray_next;
+    end
+  end
+
+  logic [sync_stages_p-1:0][depth_log2_p:0] pkt_wr_sync;
+  always_ff @(posedge pclk_i) begin
+    if (preset_i) begin
+      pkt_wr_sync <= '0;
+    end
+    else begin
+      pkt_wr_sync[0] <= pkt_wr_gray;
+      for (int i = 1; i < sync_stages_p; i++) begin
+        pkt_wr_sync[i] <= pkt_wr_sync[i-1];
+      end
+    end
+  end
+
+  logic [depth_log2_p:0] pkt_wr_bin;
+  gray2bin
+  #(.width_p(depth_log2_p+1))
+  gray2binpkt (
+    .gray_i(pkt_wr_sync[sync_stages_p-1]),
+    .bin_o(pkt_wr_bin)
+  );
+
+  // Packets read, counted in the pclk domain. in_pkt is high after the
+  // first beat of a packet has been read, until its last beat is.
+  logic [0:0] rd_en;
+  assign rd_en = pvalid_o & pready_i;
+
+  logic [depth_log2_p:0] pkt_rd;
+  logic [0:0] in_pkt;
+  always_ff @(posedge pclk_i) begin
+    if (preset_i) begin
+      pkt_rd <= '0;
+      in_pkt <= 1'b0;
+    end
+    else begin
+      if (rd_en) begin
+        pkt_rd <= pkt_rd + {{depth_log2_p{1'b0}}, plast_o};
+        in_pkt <= ~plast_o;
+      end
+    end
+  end
+
+  assign ppackets_o = pkt_wr_bin - pkt_rd;
+
+  // Release the next beat when a whole packet is in the fifo, when the
+  // current packet has already started, or when the fifo is full (the
+  // fill level never exceeds depth_p, so its top bit means full).
+  logic [0:0] release_l;
+  assign release_l = ~store_forward_p
+                     | (ppackets_o != '0)
+                     | in_pkt
+                     | fifo_pfill[depth_log2_p];
+
+  assign pvalid_o = fifo_pvalid & release_l;
+  assign fifo_pready = pready_i & release_l;
+
+endmodule
@@ -0,0 +1,17 @@
+# Clock periods shared by the two sides of the fifo_1r1w_cdc_pkt bench:
+# test_fifo_1r1w_cdc_pkt.py names one test per pair, and
+# tb_fifo_1r1w_cdc_pkt.py generates them. Keep this free of imports,
+# the simulator imports it with every test.
+
+# (pclk_period, cclk_period) pairs in ns. The last two are the 12
+# MHz/25 MHz pair from top.sv, in both directions. 1000/12 ns is not a
+# whole number of ps, so clock_start_sequence rounds the periods to
+# whole simulator steps (see get_clock_steps), and so do the timeouts.
+periods = [(1, 1)
+           ,(1, 2)
+           ,(2, 1)
+           ,(1, 3.1)
+           ,(3.1, 1)
+           ,(1000/12, 1000/25)
+           ,(1000/25, 1000/12)
+           ]
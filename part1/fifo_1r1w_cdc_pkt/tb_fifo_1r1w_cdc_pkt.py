@@ -0,0 +1,195 @@
+# cocotb tests for fifo_1r1w_cdc_pkt. This module is only imported by the
+# simulator (runner loads tb_<top> by default); the pytest side,
+# with the clock period table shared with it, is in
+# test_fifo_1r1w_cdc_pkt.py.
+import os
+import sys
+
+# REPO_ROOT is set by runner, so the repository is only searched for
+# (with git) when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import assert_resolvable, clock_start_sequence, reset_sequence
+from fifo_tb.axi import CdcStreamBus
+from fifo_1r1w_cdc_pkt_periods import periods
+
+import cocotb
+
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+from cocotb.triggers import ClockCycles, RisingEdge, with_timeout
+
+from cocotbext.axi import AxiStreamSource, AxiStreamSink, AxiStreamFrame
+
+import random
+
+from collections import deque
+
+def random_pause(p):
+    """Pause generator for AxiStreamSource/AxiStreamSink: pause in a
+    fraction p of the cycles."""
+    while True:
+        yield random.random() < p
+
+async def start_sequence(dut, pclk_period, cclk_period):
+    await clock_start_sequence(dut.pclk_i, period=pclk_period)
+    await clock_start_sequence(dut.cclk_i, period=cclk_period)
+    await reset_sequence(dut.pclk_i, dut.preset_i, 10)
+    await reset_sequence(dut.cclk_i, dut.creset_i, 10)
+
+async def check_store_forward(dut, beats):
+    """With store_forward_p, check that every packet that fits in the
+    fifo is only released once it is complete (ppackets_o is non-zero
+    at its first beat), and then leaves without bubbles.
+
+    Arguments:
+    dut -- fifo_1r1w_cdc_pkt
+    beats -- Deque of the number of beats in each packet, in order
+    """
+    depth_p = (1 << dut.depth_log2_p.value)
+    start = True
+    fits = False
+    while True:
+        await RisingEdge(dut.pclk_i)
+        if(dut.preset_i.value == 1):
+            continue
+        assert_resolvable(dut.pvalid_o)
+        if(not start and fits):
+            assert dut.pvalid_o.value == 1, "Error! pvalid_o dropped in the middle of a packet that fits in the fifo."
+        if(dut.pvalid_o.value == 1 and dut.pready_i.value == 1):
+            if(start):
+                fits = (beats.popleft() <= depth_p)
+                if(fits):
+                    assert int(dut.ppackets_o.value) > 0, "Error! A packet was released before it was complete."
+            start = (dut.plast_o.value == 1)
+
+async def frame_test(dut, pclk_period, cclk_period):
+    """Transmit 32 frames of random lengths (up to 2 * depth_p beats),
+    with both sides pausing at random, and check every byte and the
+    frame boundaries."""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    byte_lanes = len(dut.ckeep_i)
+    n = 32
+    frames = [bytes(random.getrandbits(8) for _ in range(random.randint(1, 2 * depth_p * byte_lanes)))
+              for _ in range(n)]
+
+    timeout = sum(len(f) for f in frames) * max(pclk_period, cclk_period) * 8
+
+    source = AxiStreamSource(CdcStreamBus(dut, "c"), dut.cclk_i, dut.creset_i)
+    sink = AxiStreamSink(CdcStreamBus(dut, "p"), dut.pclk_i, dut.preset_i)
+    source.set_pause_generator(random_pause(.3))
+    sink.set_pause_generator(random_pause(.3))
+
+    await start_sequence(dut, pclk_period, cclk_period)
+
+    if(dut.store_forward_p.value):
+        beats = deque(-(-len(f) // byte_lanes) for f in frames)
+        cocotb.start_soon(check_store_forward(dut, beats))
+
+    for f in frames:
+        await source.send(AxiStreamFrame(f))
+
+    for i, f in enumerate(frames):
+        try:
+            rx = await with_timeout(sink.recv(), timeout, 'ns', round_mode="round")
+        except cocotb.result.SimTimeoutError:
+            assert 0, f"Test timed out. Only received {i} of {n} frames in {timeout} ns"
+        assert rx.tdata == f, f"Error! Frame {i} does not match. Expected: {f.hex()}. Got: {bytes(rx.tdata).hex()}"
+
+async def count_test(dut, pclk_period, cclk_period):
+    """Write depth_p / 2 single-beat frames while the consumer is not
+    ready, check that ppackets_o counts them, then read them and check
+    that it goes back to 0."""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    sync_stages_p = int(dut.sync_stages_p.value)
+    byte_lanes = len(dut.ckeep_i)
+    n = max(1, depth_p // 2)
+    frames = [bytes(random.getrandbits(8) for _ in range(random.randint(1, byte_lanes)))
+              for _ in range(n)]
+
+    source = AxiStreamSource(CdcStreamBus(dut, "c"), dut.cclk_i, dut.creset_i)
+    sink = AxiStreamSink(CdcStreamBus(dut, "p"), dut.pclk_i, dut.preset_i)
+    sink.pause = True
+
+    await start_sequence(dut, pclk_period, cclk_period)
+
+    for f in frames:
+        await source.send(AxiStreamFrame(f))
+    await source.wait()
+
+    # Wait for the packet count to cross the synchronizer.
+    await ClockCycles(dut.cclk_i, 2)
+    await ClockCycles(dut.pclk_i, sync_stages_p + 2)
+    assert int(dut.ppackets_o.value) == n, f"Error! ppackets_o is {int(dut.ppackets_o.value)}, expected {n}."
+
+    sink.pause = False
+    for i, f in enumerate(frames):
+        rx = await with_timeout(sink.recv(), 100 * pclk_period, 'ns', round_mode="round")
+        assert rx.tdata == f, f"Error! Frame {i} does not match. Expected: {f.hex()}. Got: {bytes(rx.tdata).hex()}"
+
+    await ClockCycles(dut.pclk_i, 1)
+    assert int(dut.ppackets_o.value) == 0, f"Error! ppackets_o is {int(dut.ppackets_o.value)} after all frames were read."
+
+async def frame_rate_test(dut, pclk_period, cclk_period):
+    """Stream 64 frames of depth_p / 2 full beats with both sides always
+    ready, and record the frame rate. It must be at least
+    FRAME_RATE_FRACTION (default .25) of the line rate of the slower
+    side."""
+
+    depth_p = (1 << dut.depth_log2_p.value)
+    byte_lanes = len(dut.ckeep_i)
+    n = 64
+    beats = max(1, depth_p // 2)
+    fraction = float(os.environ.get("FRAME_RATE_FRACTION", .25))
+    frames = [bytes(random.getrandbits(8) for _ in range(beats * byte_lanes)) for _ in range(n)]
+
+    timeout = n * beats * max(pclk_period, cclk_period) * 8
+
+    source = AxiStreamSource(CdcStreamBus(dut, "c"), dut.cclk_i, dut.creset_i)
+    sink = AxiStreamSink(CdcStreamBus(dut, "p"), dut.pclk_i, dut.preset_i)
+
+    await start_sequence(dut, pclk_period, cclk_period)
+
+    for f in frames:
+        await source.send(AxiStreamFrame(f))
+
+    first = None
+    for i, f in enumerate(frames):
+        try:
+            rx = await with_timeout(sink.recv(), timeout, 'ns', round_mode="round")
+        except cocotb.result.SimTimeoutError:
+            assert 0, f"Test timed out. Only received {i} of {n} frames in {timeout} ns"
+        assert rx.tdata == f, f"Error! Frame {i} does not match."
+        if(first is None):
+            first = get_sim_time(units='ns')
+    last = get_sim_time(units='ns')
+
+    # Frames per second, from the end of the first frame to the end of
+    # the last one.
+    theoretical = 1e9 / (beats * max(pclk_period, cclk_period))
+    measured = (n - 1) * 1e9 / (last - first)
+
+    with open(f"frames_{pclk_period:.4f}_{cclk_period:.4f}.csv", "w") as fd:
+        fd.write("pclk_period_ns,cclk_period_ns,width_p,depth_log2_p,store_forward_p,frame_beats,frames,theoretical_fps,measured_fps,fraction\n")
+        fd.write(f"{pclk_period:.4f},{cclk_period:.4f},{dut.width_p.value},{dut.depth_log2_p.value},{dut.store_forward_p.value},"
+                 f"{beats},{n},{theoretical:.1f},{measured:.1f},{measured / theoretical:.4f}\n")
+
+    assert measured >= fraction * theoretical, f"Error! Frame rate is {measured / theoretical:.2f} of the line rate ({measured:.0f} vs {theoretical:.0f} frames/s), expected at least {fraction}."
+
+tf = TestFactory(test_function=frame_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=periods)
+tf.generate_tests()
+
+tf = TestFactory(test_function=count_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=[(1, 3.1)])
+tf.generate_tests()
+
+tf = TestFactory(test_function=frame_rate_test)
+tf.add_option(name=('pclk_period', 'cclk_period'), optionlist=periods)
+tf.generate_tests()
@@ -0,0 +1,112 @@
+# pytest side of the fifo_1r1w_cdc_pkt testbench: the parameter
+# sweeps that launch the simulations. The cocotb tests that run in
+# the simulator are in tb_fifo_1r1w_cdc_pkt.py, so pytest doesn't
+# import cocotb to collect these.
+import os
+import sys
+
+# I don't like this, but it's convenient. The root comes from REPO_ROOT
+# when it is set (by conftest.py, and by runner in the simulator), so
+# the repository is only searched for when this is imported on its own.
+_REPO_ROOT = os.environ.get("REPO_ROOT")
+if(not _REPO_ROOT):
+    import git
+    _REPO_ROOT = git.Repo(search_parent_directories=True).working_tree_dir
+assert (os.path.exists(_REPO_ROOT)), "REPO_ROOT path must exist"
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import runner, batch_runner, lint, get_import_time
+from fifo_1r1w_cdc_pkt_periods import periods
+tbpath = os.path.dirname(os.path.realpath(__file__))
+
+import pytest
+
+from pytest_utils.decorators import max_score, visibility, tags
+
+timescale = "1ps/1ps"
+
+frame_tests = [f"frame_test_{i:03d}" for i in range(1, len(periods) + 1)]
+frame_rate_tests = [f"frame_rate_test_{i:03d}" for i in range(1, len(periods) + 1)]
+tests = frame_tests + ["count_test_001"]
+
+# Every test is reported on its own, but the tests of a parameter set
+# run back to back in one simulation (see batch_runner). Set
+# SIM_BATCH=1 to run each one in a simulation of its own.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("store_forward_p", [1, 0])
+@pytest.mark.parametrize("test_name", tests)
+@pytest.mark.parametrize("simulator", ["verilator", "icarus"])
+@max_score(0)
+def test_each(simulator, test_name, width_p, depth_log2_p, store_forward_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    batch_runner(simulator, timescale, tbpath, parameters, test_name, tests)
+
+# Opposite above, run all the tests in one simulation but reset
+# between tests to ensure that reset is clearing all state.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4, 2])
+@pytest.mark.parametrize("store_forward_p", [1, 0])
+@pytest.mark.parametrize("simulator", ["verilator", "icarus"])
+@max_score(0)
+def test_all(simulator, width_p, depth_log2_p, store_forward_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['simulator']
+    runner(simulator, timescale, tbpath, parameters)
+
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4])
+@pytest.mark.parametrize("store_forward_p", [1])
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_lint(simulator, width_p, depth_log2_p, store_forward_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['simulator']
+    lint(simulator, timescale, tbpath, parameters)
+
+# Frame rate benchmark across clock ratios, with and without
+# store-and-forward. Every point writes a frames_<pclk>_<cclk>.csv in
+# its run directory, and the rows are collected into run/frames.csv at
+# the end of the session.
+@pytest.mark.parametrize("width_p", [32])
+@pytest.mark.parametrize("depth_log2_p", [4])
+@pytest.mark.parametrize("store_forward_p", [1, 0])
+@pytest.mark.parametrize("test_name", frame_rate_tests)
+@pytest.mark.parametrize("simulator", ["verilator"])
+@max_score(0)
+def test_frame_rate(simulator, test_name, width_p, depth_log2_p, store_forward_p):
+    # This line must be first
+    parameters = dict(locals())
+    del parameters['test_name']
+    del parameters['simulator']
+    batch_runner(simulator, timescale, tbpath, parameters, test_name, frame_rate_tests)
+
+# pytest imports the test module once per session, with pytest already
+# loaded, and every simulation imports the tb module, with cocotb
+# already loaded. Neither side may pull in the other: the pytest side
+# must not import cocotb, NumPy, cocotbext-axi or the tb module, and the
+# simulator side must not import pytest_utils, cocotb-test, GitPython or
+# this module.
+pytest_forbid = ["cocotb", "numpy", "cocotbext.axi", "tb_fifo_1r1w_cdc_pkt"]
+cocotb_forbid = ["test_fifo_1r1w_cdc_pkt", "pytest_utils", "cocotb_test", "git"]
+
+# Startup cost of the testbench modules, in ms. Wall-clock time depends
+# on the machine, so the limits are only checked with
+# IMPORT_TIME_BUDGET=1, and can be scaled with IMPORT_TIME_SCALE.
+import_limits = [("test_fifo_1r1w_cdc_pkt", "pytest", 150)
+                 ,("tb_fifo_1r1w_cdc_pkt", "cocotb", 400)
+                 ]
+
+@pytest.mark.parametrize("module, preload, limit_ms", import_limits)
+@max_score(0)
+def test_import_time(module, preload, limit_ms):
+    forbid = cocotb_forbid if (preload == "cocotb") else pytest_forbid
+    budget = (os.environ.get("IMPORT_TIME_BUDGET", "0") == "1")
+    t = get_import_time(module, tbpath, preload=[preload], forbid=forbid, repeat=(3 if budget else 1))
+    if(budget):
+        limit_ms *= float(os.environ.get("IMPORT_TIME_SCALE", 1))
+        assert t <= limit_ms, f"Error! Importing {module} took {t:.0f} ms, expected at most {limit_ms:.0f} ms."
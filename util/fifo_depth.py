@@ -0,0 +1,248 @@
+# Minimum-depth sizing tool for fifo_1r1w_cdc. Given the two clock
+# frequencies and a burst/idle profile for the producer (the cclk,
+# write side), find the smallest depth_log2_p that never
+# back-pressures the producer, and report what each candidate depth
+# costs on the ice40. For example, for bursts of 48 elements at
+# 25 MHz every 256 cycles, drained at 12 MHz:
+
+#   python3 util/fifo_depth.py --cclk-mhz 25 --pclk-mhz 12 --burst 48 --idle 208
+
+# The depth is found analytically, and, with --simulate, confirmed by
+# short simulations of fifo_1r1w_cdc (depth_probe_test in its bench).
+# With --yosys, the cost comes from synth_ice40 instead of an estimate.
+
+import os
+import re
+import sys
+import json
+import math
+import shutil
+import argparse
+import subprocess
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+sys.path.append(os.path.join(_REPO_ROOT, "util"))
+from utilities import format_table
+_TBPATH = os.path.join(_REPO_ROOT, "part1", "fifo_1r1w_cdc")
+
+# ice40 SB_RAM40_4K configurations as (width, depth)
+_EBR_CONFIGS = [(16, 256), (8, 512), (4, 1024), (2, 2048)]
+
+def analytic_depth(cclk_mhz, pclk_mhz, burst, idle, read_rate=1, sync_stages=2):
+    """ Estimate the peak occupancy of the fifo for a burst profile, and
+    the smallest depth_log2_p that holds it.
+
+    During a burst the producer writes one element per cclk cycle while
+    the consumer drains read_rate elements per pclk cycle, so the fifo
+    grows by burst * (1 - drain / fill). On top of that, the producer
+    sees the read pointer late: it takes one cclk cycle plus
+    sync_stages + 1 pclk cycles for a write to become visible to the
+    consumer, and sync_stages + 1 cclk cycles for a read to become
+    visible to the producer. Everything written during that round trip
+    still counts as occupied.
+
+    This is more conservative than the burst * (1 - drain / fill)
+    backlog alone: the round trip is charged at the full fill rate, as
+    if the consumer drained nothing while the pointers cross, rather
+    than at the net fill - drain rate. The consumer cannot start on a
+    burst before the write pointer reaches it, and the producer decides
+    "full" on a read pointer that is round_trip old, so the backlog
+    formula undersizes shallow fifos whenever the burst is short next to
+    the synchronizer latency. The over-estimate is at most
+    drain * round_trip elements, which is why main() also tries one
+    depth below the analytic answer, and --simulate settles it.
+
+    Arguments:
+    cclk_mhz -- Producer (write side) clock frequency in MHz
+    pclk_mhz -- Consumer (read side) clock frequency in MHz
+    burst -- Number of back-to-back elements in a burst
+    idle -- Number of idle cclk cycles between bursts
+    read_rate -- Fraction of pclk cycles in which the consumer is ready
+    sync_stages -- Number of synchronizer flops per pointer
+    """
+    # Elements per us
+    fill = cclk_mhz
+    drain = pclk_mhz * read_rate
+
+    # The long-term average write rate must not exceed the drain rate,
+    # or no depth is enough.
+    average = fill * burst / (burst + idle)
+    sustainable = average <= drain
+
+    # Round trip in us
+    write_latency = 1 / cclk_mhz + (sync_stages + 1) / pclk_mhz
+    read_latency = (sync_stages + 1) / cclk_mhz
+    round_trip = fill * (write_latency + read_latency)
+
+    peak = max(0, burst * (1 - drain / fill)) + round_trip
+    depth_log2_p = max(1, math.ceil(math.log2(max(peak, 1))))
+    return {"sustainable": sustainable,
+            "peak_occupancy": peak,
+            "depth_log2_p": depth_log2_p if sustainable else None}
+
+def get_period_ns(mhz):
+    """ Get the clock period in ns for a frequency, rounded to a whole,
+    even number of ps. The benches run at 1ps precision, where e.g.
+    1000/12 ns (12 MHz) can't be represented, and both halves of the
+    period must be whole ps too (see utilities.get_clock_steps).
+
+    Arguments:
+    mhz -- Clock frequency in MHz
+    """
+    return round(500000 / mhz) * 2 / 1000
+
+def ebr_count(width_p, depth_p):
+    """ Get the number of ice40 SB_RAM40_4K blocks for a width_p x depth_p
+    memory, using the best block configuration.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_p -- Number of fifo elements
+    """
+    return min(math.ceil(width_p / w) * math.ceil(depth_p / d) for (w, d) in _EBR_CONFIGS)
+
+def estimate_cost(width_p, depth_log2_p, sync_stages=2):
+    """ Estimate the ice40 cost of fifo_1r1w_cdc.
+
+    Each side has a depth_log2_p + 1 bit binary pointer, and the write
+    pointer is retimed once. Each pointer has sync_stages synchronizer
+    registers in the other domain, a bin2gray and a gray2bin converter,
+    and feeds a full/empty comparator and an incrementer. Roughly one
+    LUT per bit is used for each of those. The RAM has a registered read
+    port of width_p flops.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_log2_p -- log2 of the number of fifo elements
+    sync_stages -- Number of synchronizer flops per pointer
+    """
+    bits = depth_log2_p + 1
+    return {"ebr": ebr_count(width_p, 1 << depth_log2_p),
+            "lut": 2 * bits * 4 + 2,
+            "ff": bits * (3 + 2 * sync_stages) + width_p,
+            "source": "estimate"}
+
+def synth_cost(width_p, depth_log2_p, sync_stages=2):
+    """ Get the ice40 cost of fifo_1r1w_cdc from yosys synth_ice40.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_log2_p -- log2 of the number of fifo elements
+    sync_stages -- Number of synchronizer flops per pointer
+    """
+    # Only the fifo sources. The ice40 primitive models in the filelist
+    # would clash with the yosys cell library.
+    with open(os.path.join(_TBPATH, "filelist.json")) as fd:
+        files = [os.path.join(_REPO_ROOT, f) for f in json.load(fd)["files"]
+                 if f.startswith("part1/") and not os.path.basename(f).startswith("SB_")]
+
+    script = (f"read_verilog -sv {' '.join(files)}; "
+              f"chparam -set width_p {width_p} -set depth_log2_p {depth_log2_p} -set sync_stages_p {sync_stages} fifo_1r1w_cdc; "
+              f"synth_ice40 -top fifo_1r1w_cdc; stat")
+    out = subprocess.run(["yosys", "-q", "-p", script], capture_output=True, text=True).stdout
+
+    # stat prints one "<cell> <count>" line per cell type (or
+    # "<count> <cell>" in newer versions). SB_DFF has variants, like
+    # SB_DFFE and SB_DFFR, which are all counted.
+    def count(cell):
+        n = 0
+        for l in out.splitlines():
+            m = re.match(r"^\s*(?:(\d+)\s+)?(" + cell + r"\w*)(?:\s+(\d+))?\s*$", l)
+            if(m and (m.group(1) or m.group(3))):
+                n += int(m.group(1) or m.group(3))
+        return n
+
+    return {"ebr": count("SB_RAM40_4K"),
+            "lut": count("SB_LUT4"),
+            "ff": count("SB_DFF"),
+            "source": "yosys"}
+
+def simulate_stalls(width_p, depth_log2_p, cclk_mhz, pclk_mhz, burst, idle, read_rate, bursts, simulator="verilator", sync_stages=2):
+    """ Run depth_probe_test on fifo_1r1w_cdc and get the number of cycles
+    the producer was back-pressured.
+
+    Arguments:
+    width_p -- Width of a fifo element
+    depth_log2_p -- log2 of the number of fifo elements
+    cclk_mhz -- Producer (write side) clock frequency in MHz
+    pclk_mhz -- Consumer (read side) clock frequency in MHz
+    burst -- Number of back-to-back elements in a burst
+    idle -- Number of idle cclk cycles between bursts
+    read_rate -- Fraction of pclk cycles in which the consumer is ready
+    bursts -- Number of bursts to simulate
+    simulator -- Simulator to run
+    sync_stages -- Number of synchronizer flops per pointer
+    """
+    from utilities import runner, get_param_string
+
+    env = {"DEPTH_PROBE_BURST": str(burst),
+           "DEPTH_PROBE_IDLE": str(idle),
+           "DEPTH_PROBE_BURSTS": str(bursts),
+           "DEPTH_PROBE_READ_RATE": str(read_rate),
+           "DEPTH_PROBE_CCLK_PERIOD": str(get_period_ns(cclk_mhz)),
+           "DEPTH_PROBE_PCLK_PERIOD": str(get_period_ns(pclk_mhz))}
+
+    params = {"width_p": width_p, "depth_log2_p": depth_log2_p, "sync_stages_p": sync_stages}
+    runner(simulator, "1ps/1ps", _TBPATH, params, testname="depth_probe_test", env=env)
+
+    work_dir = os.path.join(_TBPATH, "run", "depth_probe_test", get_param_string(params), simulator)
+    with open(os.path.join(work_dir, "depth_probe.json")) as fd:
+        return json.load(fd)["stall_cycles"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the smallest depth_log2_p of fifo_1r1w_cdc for a burst profile.")
+    parser.add_argument("--cclk-mhz", type=float, required=True, help="Producer (write side) clock in MHz")
+    parser.add_argument("--pclk-mhz", type=float, required=True, help="Consumer (read side) clock in MHz")
+    parser.add_argument("--burst", type=int, required=True, help="Elements per back-to-back burst")
+    parser.add_argument("--idle", type=int, default=0, help="Idle cclk cycles between bursts")
+    parser.add_argument("--read-rate", type=float, default=1, help="Fraction of pclk cycles the consumer is ready")
+    parser.add_argument("--width", type=int, default=32, help="width_p of the fifo")
+    parser.add_argument("--sync-stages", type=int, default=2, help="sync_stages_p of the fifo")
+    parser.add_argument("--max-depth-log2", type=int, default=12, help="Largest depth_log2_p to consider")
+    parser.add_argument("--simulate", action="store_true", help="Confirm each candidate depth in simulation")
+    parser.add_argument("--bursts", type=int, default=8, help="Number of bursts to simulate")
+    parser.add_argument("--simulator", default="verilator", help="Simulator for --simulate")
+    parser.add_argument("--yosys", action="store_true", help="Get the cost from yosys synth_ice40")
+    args = parser.parse_args()
+
+    a = analytic_depth(args.cclk_mhz, args.pclk_mhz, args.burst, args.idle, args.read_rate, args.sync_stages)
+    print(f"Analytic peak occupancy: {a['peak_occupancy']:.1f} elements")
+    if(not a["sustainable"]):
+        print("The average write rate exceeds the read rate. No depth avoids back-pressure.")
+        return 1
+    print(f"Analytic minimum depth_log2_p: {a['depth_log2_p']}")
+
+    if(args.yosys and shutil.which("yosys") is None):
+        print("yosys not found, using estimates.")
+        args.yosys = False
+
+    # Candidates from one below the analytic answer (it is
+    # conservative) until one passes, or up to the limit.
+    header = ["depth_log2_p", "depth_p", "analytic", "stall_cycles", "ebr", "lut", "ff", "cost"]
+    rows = []
+    best = None
+    for d in range(max(1, a["depth_log2_p"] - 1), args.max_depth_log2 + 1):
+        cost = synth_cost(args.width, d, args.sync_stages) if args.yosys else estimate_cost(args.width, d, args.sync_stages)
+        stalls = "-"
+        ok = d >= a["depth_log2_p"]
+        if(args.simulate):
+            stalls = simulate_stalls(args.width, d, args.cclk_mhz, args.pclk_mhz, args.burst,
+                                     args.idle, args.read_rate, args.bursts, args.simulator, args.sync_stages)
+            ok = (stalls == 0)
+        rows.append([d, 1 << d, "ok" if d >= a["depth_log2_p"] else "stalls", stalls,
+                     cost["ebr"], cost["lut"], cost["ff"], cost["source"]])
+        if(ok and best is None):
+            best = d
+        if(best is not None and d >= max(best, a["depth_log2_p"])):
+            break
+
+    print(format_table([header] + rows))
+
+    if(best is None):
+        print(f"No depth_log2_p up to {args.max_depth_log2} avoids back-pressure.")
+        return 1
+    print(f"Smallest depth_log2_p without back-pressure: {best}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# Shared cocotb testbench models for the ready/valid FIFOs in this
+# repository (fifo_1r1w, fifo_1r1w_cdc and its variants). The benches
+# put util/ on sys.path, like for utilities.py, and then:
+
+#   from fifo_tb import InputModel, OutputModel, ModelRunner, FifoModel
+
+# Every model is bound to one side of the DUT by a port prefix. The
+# ports on that side are named <prefix>clk_i, <prefix>reset_i,
+# <prefix>valid_i/o, <prefix>ready_o/i and <prefix>data_i/o, so the
+# single clock fifo_1r1w uses the prefix "" on both sides, and
+# fifo_1r1w_cdc uses "c" on the producer side and "p" on the consumer
+# side. Signal handles are looked up once, when a model is
+# constructed, and never in the per-cycle loops.
+
+from fifo_tb.interface import ReadyValidInterface
+from fifo_tb.generators import RandomDataGenerator, RateGenerator, CountingGenerator, BurstGenerator
+from fifo_tb.drivers import InputModel, OutputModel, MAX_IDLE_BATCH
+from fifo_tb.scoreboard import FifoModel, ModelRunner, LatencyStats
@@ -0,0 +1,139 @@
+# cocotbext.axi stimulus for the CDC fifos: AxiStreamSource and
+# AxiStreamSink bound to the <side><signal>_<i/o> ports, wrapped in the
+# same interface as InputModel and OutputModel. cocotbext.axi is slow
+# to import, so this module is not imported by fifo_tb/__init__.py;
+# import it directly, and only when the axi backend is selected:
+
+#   from fifo_tb.axi import AxiInputModel, AxiOutputModel
+
+import random
+import logging
+
+import numpy as np
+
+import cocotb
+
+from cocotb.triggers import with_timeout
+
+from cocotbext.axi import AxiStreamSource, AxiStreamSink, AxiStreamBus, AxiStreamFrame
+
+from fifo_tb.interface import ReadyValidInterface
+
+class CdcStreamBus(AxiStreamBus):
+    """AxiStreamBus for one side of fifo_1r1w_cdc (or a variant with the
+    same port names), whose ports are named <side><signal>_<i/o> (e.g.
+    cdata_i, pready_i) instead of <prefix>_t<signal>. tlast and tkeep
+    are only connected if the module has them.
+
+    Arguments:
+    dut -- The fifo
+    side -- "c" (producer side) or "p" (consumer side)
+    """
+    def __init__(self, dut, side):
+        i, o = ("i", "o") if side == "c" else ("o", "i")
+        self._signals = {"tdata": f"data_{i}"}
+        self._optional_signals = {"tvalid": f"valid_{i}",
+                                  "tready": f"ready_{o}",
+                                  "tlast": f"last_{i}",
+                                  "tkeep": f"keep_{i}"}
+        super().__init__(dut, side, bus_separator="")
+
+def get_byte_lanes(dut):
+    """Number of cocotbext.axi byte lanes in one fifo element: whole
+    bytes if width_p is a multiple of 8, otherwise a single lane of
+    width_p bits."""
+    width_p = int(dut.width_p.value)
+    return width_p // 8 if (width_p % 8 == 0) else 1
+
+def pause_generator(rate, block=4096):
+    """Pause generator for cocotbext.axi sources and sinks: pause in a
+    fraction (1 - rate) of the cycles. Like RateGenerator, the values
+    are drawn in blocks with NumPy.
+
+    Arguments:
+    rate -- Fraction of cycles that are not paused
+    block -- Number of cycles drawn at a time
+    """
+    rng = np.random.default_rng(random.getrandbits(32))
+    while True:
+        yield from (rng.random(block) >= rate).tolist()
+
+class AxiInputModel():
+    """Alternative to InputModel, backed by a cocotbext.axi
+    AxiStreamSource. All l elements are sent as one bytes buffer, and
+    back-pressure comes from a pause generator instead of a
+    RateGenerator. fifo_1r1w_cdc has no tlast, so the frame boundary is
+    not visible at the output."""
+    def __init__(self, dut, rate, l):
+        lanes = get_byte_lanes(dut)
+        self._source = AxiStreamSource(CdcStreamBus(dut, "c"), dut.cclk_i, dut.creset_i, byte_lanes=lanes)
+        self._source.log.setLevel(logging.WARNING)
+        if(rate < 1):
+            self._source.set_pause_generator(pause_generator(rate))
+
+        data = np.frombuffer(random.randbytes(l * lanes), dtype=np.uint8)
+        self._frame = AxiStreamFrame((data & self._source.byte_mask).tobytes())
+        self._length = l
+        self._coro = None
+
+    def start(self):
+        """ Start Input Model """
+        if self._coro is not None:
+            raise RuntimeError("Input Model already started")
+        self._coro = cocotb.start_soon(self._run())
+
+    def stop(self) -> None:
+        """ Stop Input Model """
+        if self._coro is None:
+            raise RuntimeError("Input Model never started")
+        self._coro.kill()
+        self._coro = None
+
+    async def wait(self, t):
+        await with_timeout(self._coro, t, 'ns', round_mode="round")
+
+    async def _run(self):
+        await self._source.send(self._frame)
+        await self._source.wait()
+        return self._length
+
+class AxiOutputModel():
+    """Alternative to OutputModel, backed by a cocotbext.axi
+    AxiStreamSink. Without tlast, every element is received as a frame
+    of its own."""
+    def __init__(self, dut, rate, l):
+        self._sink = AxiStreamSink(CdcStreamBus(dut, "p"), dut.pclk_i, dut.preset_i, byte_lanes=get_byte_lanes(dut))
+        self._sink.log.setLevel(logging.WARNING)
+        if(rate < 1):
+            self._sink.set_pause_generator(pause_generator(rate))
+
+        self.rv = ReadyValidInterface(dut.pclk_i, dut.preset_i,
+                                       dut.pready_i, dut.pvalid_o)
+        self._length = l
+        self._coro = None
+        self._nout = 0
+
+    def start(self):
+        """ Start Output Model """
+        if self._coro is not None:
+            raise RuntimeError("Output Model already started")
+        self._coro = cocotb.start_soon(self._run())
+
+    def stop(self) -> None:
+        """ Stop Output Model """
+        if self._coro is None:
+            raise RuntimeError("Output Model never started")
+        self._coro.kill()
+        self._coro = None
+
+    async def wait(self, t):
+        await with_timeout(self._coro, t, 'ns', round_mode="round")
+
+    def nproduced(self):
+        return self._nout
+
+    async def _run(self):
+        while self._nout < self._length:
+            await self._sink.recv()
+            self._nout += 1
+        return self._nout
@@ -0,0 +1,294 @@
+# Input (producer) and output (consumer) models that drive the
+# ready/valid ports of a FIFO. Both have two coroutines: _run, which
+# drives a new beat on every falling edge of the clock, and
+# _run_batched, which only wakes up when something can happen. Both
+# draw the valid/ready pattern once per cycle and a data word once per
+# beat, so for the same seed they drive the same stimulus on the same
+# cycles. The batched coroutine only saves the triggers of the driver
+# itself: the ModelRunner monitors still sample every clock edge, so
+# the gain on a whole test is smaller, and depends on the rates.
+# test_drivers in part1/fifo_1r1w_cdc checks that both modes read the
+# same elements at the same times, and records their wall time and
+# triggers in run/drivers.csv.
+
+import cocotb
+
+from cocotb.triggers import ClockCycles, RisingEdge, FallingEdge, with_timeout
+
+from utilities import assert_resolvable
+from fifo_tb.interface import ReadyValidInterface
+
+# Upper bound on the number of idle cycles the batched models skip
+# with a single trigger.
+MAX_IDLE_BATCH = 1024
+
+class _Driver():
+    """Coroutine management shared by InputModel and OutputModel."""
+    __slots__ = ("_name", "_batched", "_length", "_coro", "_clk_i", "_reset_i",
+                 "_rising", "_falling", "rv")
+
+    def __init__(self, name, dut, prefix, l, batched):
+        self._name = name
+        self._clk_i = getattr(dut, prefix + "clk_i")
+        self._reset_i = getattr(dut, prefix + "reset_i")
+        self._rising = RisingEdge(self._clk_i)
+        self._falling = FallingEdge(self._clk_i)
+        self._length = l
+        self._batched = batched
+        self._coro = None
+
+    def start(self):
+        """ Start Model """
+        if self._coro is not None:
+            raise RuntimeError(f"{self._name} already started")
+        self._coro = cocotb.start_soon(self._run_batched() if self._batched else self._run())
+
+    def stop(self) -> None:
+        """ Stop Model """
+        if self._coro is None:
+            raise RuntimeError(f"{self._name} never started")
+        self._coro.kill()
+        self._coro = None
+
+    async def wait(self, t):
+        await with_timeout(self._coro, t, 'ns', round_mode="round")
+
+    async def _out_of_reset(self):
+        """Wait for the first falling edge of the clock out of reset."""
+        await self._falling
+        reset = self._reset_i.value
+        if(not (reset.is_resolvable and reset == 0)):
+            await FallingEdge(self._reset_i)
+
+class OutputModel(_Driver):
+    """Consumer: drives <prefix>ready_i from a generator and counts the
+    handshakes on <prefix>valid_o.
+
+    Arguments:
+    dut -- Device under test
+    g -- Ready generator (see fifo_tb.generators)
+    l -- Number of elements to consume
+    batched -- Use the batched coroutine
+    prefix -- Port prefix of the consumer side ("p" for fifo_1r1w_cdc)
+    """
+    __slots__ = ("_ready_i", "_valid_o", "_generator", "_nout")
+
+    def __init__(self, dut, g, l, batched=False, prefix=""):
+        super().__init__("Output Model", dut, prefix, l, batched)
+        self._ready_i = getattr(dut, prefix + "ready_i")
+        self._valid_o = getattr(dut, prefix + "valid_o")
+
+        # For safety's sake
+        self._ready_i.value = 0
+
+        self.rv = ReadyValidInterface(self._clk_i, self._reset_i,
+                                      self._ready_i, self._valid_o)
+        self._generator = g
+        self._nout = 0
+
+    def nproduced(self):
+        return self._nout
+
+    async def _run(self):
+        """ Output Model Coroutine"""
+
+        self._nout = 0
+        rising = self._rising
+        falling = self._falling
+        ready_i = self._ready_i
+        valid_o = self._valid_o
+        generate = self._generator.generate
+        length = self._length
+
+        await self._out_of_reset()
+
+        # Precondition: Falling Edge of Clock
+        while self._nout < length:
+            consume = generate()
+            ready_i.value = consume
+
+            # Wait until valid, but only read it on the positive edge
+            # of the clock.
+            if(consume):
+                while True:
+                    await rising
+                    valid = valid_o.value
+                    if(not valid.is_resolvable):
+                        assert_resolvable(valid_o)
+                    if(valid == 1):
+                        break
+                self._nout += 1
+
+            await falling
+
+        return self._nout
+
+    async def _run_batched(self):
+        """ Output Model Coroutine (batched)
+
+        Behaves like _run, but only wakes up when something can
+        happen: a run of idle cycles is skipped with one trigger, a
+        stalled beat waits for valid_o to rise instead of sampling
+        every edge, and the next beat is driven right after the clock
+        edge instead of on the falling edge."""
+
+        self._nout = 0
+        clk_i = self._clk_i
+        rising = self._rising
+        ready_i = self._ready_i
+        valid_o = self._valid_o
+        valid_rise = RisingEdge(valid_o)
+        generate = self._generator.generate
+        length = self._length
+
+        await self._out_of_reset()
+
+        # Precondition: Falling Edge of Clock
+        while self._nout < length:
+            idle = 0
+            while idle < MAX_IDLE_BATCH and not generate():
+                idle += 1
+
+            if(idle):
+                ready_i.value = 0
+                await ClockCycles(clk_i, idle)
+                if(idle == MAX_IDLE_BATCH):
+                    continue
+
+            ready_i.value = 1
+            while True:
+                await rising
+                valid = valid_o.value
+                if(not valid.is_resolvable):
+                    assert_resolvable(valid_o)
+                if(valid == 1):
+                    break
+                await valid_rise
+            self._nout += 1
+
+        ready_i.value = 0
+        return self._nout
+
+class InputModel(_Driver):
+    """Producer: drives <prefix>valid_i from a rate generator and
+    <prefix>data_i from a data generator, and counts the handshakes on
+    <prefix>ready_o.
+
+    Arguments:
+    dut -- Device under test
+    data -- Data generator (see fifo_tb.generators)
+    rate -- Valid generator (see fifo_tb.generators)
+    l -- Number of elements to produce
+    batched -- Use the batched coroutine
+    prefix -- Port prefix of the producer side ("c" for fifo_1r1w_cdc)
+    """
+    __slots__ = ("_ready_o", "_valid_i", "_data_i", "_rate", "_data", "_nin")
+
+    def __init__(self, dut, data, rate, l, batched=False, prefix=""):
+        super().__init__("Input Model", dut, prefix, l, batched)
+        self._ready_o = getattr(dut, prefix + "ready_o")
+        self._valid_i = getattr(dut, prefix + "valid_i")
+        self._data_i = getattr(dut, prefix + "data_i")
+
+        # For safety's sake
+        self._valid_i.value = 0
+
+        self.rv = ReadyValidInterface(self._clk_i, self._reset_i,
+                                      self._ready_o, self._valid_i)
+
+        self._rate = rate
+        self._data = data
+        self._nin = 0
+
+    def nconsumed(self):
+        return self._nin
+
+    async def _run(self):
+        """ Input Model Coroutine"""
+
+        self._nin = 0
+        rising = self._rising
+        falling = self._falling
+        ready_o = self._ready_o
+        valid_i = self._valid_i
+        data_i = self._data_i
+        produce_next = self._rate.generate
+        data_next = self._data.generate
+        length = self._length
+
+        await self._out_of_reset()
+        await falling
+        await falling
+
+        # Precondition: Falling Edge of Clock
+        while self._nin < length:
+            produce = produce_next()
+            valid_i.value = produce
+
+            # Wait until ready. Like _run_batched, a data word is only
+            # drawn for a beat.
+            if(produce):
+                data_i.value = data_next()
+                while True:
+                    await rising
+                    ready = ready_o.value
+                    if(not ready.is_resolvable):
+                        assert_resolvable(ready_o)
+                    if(ready == 1):
+                        break
+                self._nin += 1
+
+            await falling
+        return self._nin
+
+    async def _run_batched(self):
+        """ Input Model Coroutine (batched)
+
+        Behaves like _run, but only wakes up when something can
+        happen: a run of idle cycles is skipped with one trigger, a
+        stalled beat waits for ready_o to rise instead of sampling
+        every edge, and the next beat is driven right after the clock
+        edge instead of on the falling edge."""
+
+        self._nin = 0
+        clk_i = self._clk_i
+        rising = self._rising
+        falling = self._falling
+        ready_o = self._ready_o
+        ready_rise = RisingEdge(ready_o)
+        valid_i = self._valid_i
+        data_i = self._data_i
+        produce_next = self._rate.generate
+        data_next = self._data.generate
+        length = self._length
+
+        await self._out_of_reset()
+        await falling
+        await falling
+
+        # Precondition: Falling Edge of Clock
+        while self._nin < length:
+            idle = 0
+            while idle < MAX_IDLE_BATCH and not produce_next():
+                idle += 1
+
+            if(idle):
+                valid_i.value = 0
+                await ClockCycles(clk_i, idle)
+                if(idle == MAX_IDLE_BATCH):
+                    continue
+
+            valid_i.value = 1
+            data_i.value = data_next()
+            while True:
+                await rising
+                ready = ready_o.value
+                if(not ready.is_resolvable):
+                    assert_resolvable(ready_o)
+                if(ready == 1):
+                    break
+                await ready_rise
+            self._nin += 1
+
+        valid_i.value = 0
+        return self._nin
@@ -0,0 +1,123 @@
+# Stimulus generators for the input and output models. Each one has a
+# generate() method that returns the next value: a data word, or
+# whether valid/ready is high in the next cycle.
+
+import random
+
+import numpy as np
+
+class RandomDataGenerator():
+    """Random data words, pre-generated in blocks by a NumPy generator
+    seeded from the (per-test seeded) random module.
+
+    Arguments:
+    dut -- Device under test, with a width_p parameter
+    block -- Number of words drawn at a time
+    width -- Word width in bits, if not width_p
+    """
+    __slots__ = ("_width_p", "_rng", "_block", "_values", "_idx")
+
+    def __init__(self, dut, block=4096, width=None):
+        # Read the width from the simulator once, not on every beat.
+        self._width_p = int(dut.width_p.value) if width is None else width
+        self._rng = np.random.default_rng(random.getrandbits(64))
+        self._block = block
+        self._values = []
+        self._idx = 0
+
+    def _fill(self):
+        # Draw 64-bit words and stitch them together, so any width_p
+        # is supported.
+        nwords = (self._width_p + 63) // 64
+        words = self._rng.integers(0, (1 << 64) - 1, size=(self._block, nwords),
+                                   dtype=np.uint64, endpoint=True)
+        mask = (1 << self._width_p) - 1
+        if(nwords == 1):
+            self._values = (words[:, 0] & np.uint64(mask)).tolist()
+        else:
+            self._values = [sum(w << (64 * i) for i, w in enumerate(row)) & mask
+                            for row in words.tolist()]
+        self._idx = 0
+
+    def generate(self):
+        idx = self._idx
+        if(idx == len(self._values)):
+            self._fill()
+            idx = 0
+        self._idx = idx + 1
+        return self._values[idx]
+
+class RateGenerator():
+    """Random valid/ready pattern that is true with probability r,
+    pre-generated in blocks by a NumPy generator.
+
+    Arguments:
+    dut -- Device under test (unused, for a uniform signature)
+    r -- Probability of each cycle being true
+    block -- Number of cycles drawn at a time
+    """
+    __slots__ = ("_rate", "_rng", "_block", "_pattern", "_idx")
+
+    def __init__(self, dut, r, block=4096):
+        self._rate = r
+        self._rng = np.random.default_rng(random.getrandbits(64))
+        self._block = block
+        self._pattern = []
+        self._idx = 0
+
+    def _fill(self):
+        if(self._rate == 0):
+            self._pattern = [False] * self._block
+        else:
+            draws = self._rng.integers(1, int(1/self._rate), size=self._block, endpoint=True)
+            self._pattern = (draws == 1).tolist()
+        self._idx = 0
+
+    def generate(self):
+        idx = self._idx
+        if(idx == len(self._pattern)):
+            self._fill()
+            idx = 0
+        self._idx = idx + 1
+        return self._pattern[idx]
+
+class CountingGenerator():
+    """Deterministic pattern that is true once every 1/r cycles (on the
+    second cycle of each period).
+
+    Arguments:
+    dut -- Device under test (unused, for a uniform signature)
+    r -- Fraction of cycles that are true
+    """
+    __slots__ = ("_rate", "_init")
+
+    def __init__(self, dut, r):
+        self._rate = int(1/r) if r else 0
+        self._init = 0
+
+    def generate(self):
+        if(self._rate == 0):
+            return False
+        retval = (self._init == 1)
+        self._init = (self._init + 1) % self._rate
+        return retval
+
+class BurstGenerator():
+    """Valid pattern of burst cycles on, then idle cycles off, repeated.
+
+    Arguments:
+    dut -- Device under test (unused, for a uniform signature)
+    burst -- Number of cycles on
+    idle -- Number of cycles off
+    """
+    __slots__ = ("_burst", "_period", "_cycle")
+
+    def __init__(self, dut, burst, idle):
+        self._burst = burst
+        self._period = burst + idle
+        self._cycle = 0
+
+    def generate(self):
+        retval = (self._cycle < self._burst)
+        self._cycle = (self._cycle + 1) % self._period
+        return retval
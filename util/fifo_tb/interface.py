@@ -0,0 +1,90 @@
+# Ready/valid handshake helpers for one clock domain.
+
+from cocotb.triggers import RisingEdge, with_timeout
+
+from utilities import assert_resolvable
+
+class ReadyValidInterface():
+    """Waits on the ready/valid handshake signals of one port, sampled
+    on the rising edge of its clock. Cycles in reset are skipped.
+
+    Arguments:
+    clk_i -- Clock of the port's domain
+    reset_i -- Reset of the port's domain
+    ready -- Ready signal of the port
+    valid -- Valid signal of the port
+    """
+    __slots__ = ("_clk_i", "_reset_i", "_ready", "_valid", "_rising")
+
+    def __init__(self, clk_i, reset_i, ready, valid):
+        self._clk_i = clk_i
+        self._reset_i = reset_i
+        self._ready = ready
+        self._valid = valid
+        self._rising = RisingEdge(clk_i)
+
+    def is_in_reset(self):
+        reset = self._reset_i.value
+        return (not reset.is_resolvable) or reset == 1
+
+    def assert_resolvable(self):
+        if(not self.is_in_reset()):
+            assert_resolvable(self._valid)
+            assert_resolvable(self._ready)
+
+    def is_handshake(self):
+        return ((self._valid.value == 1) and (self._ready.value == 1))
+
+    async def _wait(self, sig):
+        """Wait for sig to be high on the positive edge of the clock"""
+        rising = self._rising
+        while True:
+            await rising
+            if(not self.is_in_reset()):
+                value = sig.value
+                if(not value.is_resolvable):
+                    assert_resolvable(sig)
+                if(value == 1):
+                    break
+
+    async def is_ready(self, ns):
+        """Wait for ready, raising an exception if it hasn't
+        happened after ns nanoseconds of simulation time"""
+        # If ns is none, wait indefinitely
+        if(ns):
+            await with_timeout(self._wait(self._ready), ns, 'ns', round_mode="round")
+        else:
+            await self._wait(self._ready)
+
+    async def is_valid(self, ns):
+        """Wait for valid, raising an exception if it hasn't
+        happened after ns nanoseconds of simulation time"""
+        # If ns is none, wait indefinitely
+        if(ns):
+            await with_timeout(self._wait(self._valid), ns, 'ns', round_mode="round")
+        else:
+            await self._wait(self._valid)
+
+    async def _handshake(self):
+        rising = self._rising
+        valid = self._valid
+        ready = self._ready
+        while True:
+            await rising
+            if(not self.is_in_reset()):
+                v = valid.value
+                r = ready.value
+                if(not (v.is_resolvable and r.is_resolvable)):
+                    self.assert_resolvable()
+                if(v == 1 and r == 1):
+                    break
+
+    async def handshake(self, ns):
+        """Wait for a handshake, raising an exception if it hasn't
+        happened after ns nanoseconds of simulation time"""
+
+        # If ns is none, wait indefinitely
+        if(ns):
+            await with_timeout(self._handshake(), ns, 'ns', round_mode="round")
+        else:
+            await self._handshake()
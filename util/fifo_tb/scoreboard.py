@@ -0,0 +1,327 @@
+# Scoreboard for FIFOs: a reference model of the order of the
+# elements, the monitors that check the DUT against it on every
+# handshake, and the latency and throughput statistics they collect.
+
+import json
+
+from collections import deque
+
+import cocotb
+
+from cocotb.utils import get_sim_time
+from cocotb.triggers import RisingEdge
+
+from utilities import assert_resolvable
+
+class FifoModel():
+    """Reference model of the order of the elements in a FIFO.
+
+    Arguments:
+    dut -- Device under test, with width_p and depth_log2_p parameters
+    in_prefix -- Port prefix of the producer side
+    out_prefix -- Port prefix of the consumer side
+    """
+    __slots__ = ("_data_i", "_data_o", "_width_p", "_depth_log2_p",
+                 "_deqs", "_enqs", "_size", "_q")
+
+    def __init__(self, dut, in_prefix="", out_prefix=""):
+
+        self._data_i = getattr(dut, in_prefix + "data_i")
+        self._data_o = getattr(dut, out_prefix + "data_o")
+
+        self._width_p = int(dut.width_p.value)
+        self._depth_log2_p = int(dut.depth_log2_p.value)
+        self._deqs = 0
+        self._enqs = 0
+
+        # Model the fifo as a ring buffer. The fifo can never hold more
+        # than depth_p elements, so neither can the model, and memory
+        # use stays bounded however long the test runs. One extra slot
+        # covers an enqueue and a dequeue observed in the same timestep.
+        self._size = (1 << self._depth_log2_p) + 1
+        self._q = [None] * self._size
+
+    def consume(self):
+        data = self._data_i.value
+        if(not data.is_resolvable):
+            assert_resolvable(self._data_i)
+        assert (self._enqs - self._deqs) < self._size, f"Error! Fifo accepted more than {self._size - 1} elements without producing any (enqueue {self._enqs})."
+        self._q[self._enqs % self._size] = data
+        self._enqs += 1
+
+    def produce(self):
+        got = self._data_o.value
+        if(not got.is_resolvable):
+            assert_resolvable(self._data_o)
+        assert self._deqs < self._enqs, "Error! Module produced output without valid input"
+        expected = self._q[self._deqs % self._size]
+        assert got == expected, f"Error! Value on deque iteration {self._deqs} does not match expected. Expected: {expected}. Got: {got}"
+        self._deqs += 1
+
+    def occupancy(self):
+        """Number of elements in the fifo, as of the last handshakes."""
+        return self._enqs - self._deqs
+
+class ModelRunner():
+    """Check the DUT against a model. The scoreboard (model) checks the
+    order of the elements at each handshake, and that no element leaves
+    before it was enqueued.
+
+    If stats is given, the enqueue-to-dequeue latency of every element
+    is recorded in it. If predictor is given, the outputs are also
+    compared with a cycle-accurate predictor on every cycle, so any
+    change in latency or bandwidth is caught on the cycle it happens.
+    That needs both sides in the same clock domain.
+
+    Arguments:
+    dut -- Device under test
+    model -- Scoreboard, with consume() and produce() (e.g. FifoModel)
+    in_prefix -- Port prefix of the producer side
+    out_prefix -- Port prefix of the consumer side
+    stats -- LatencyStats, or None
+    predictor -- Predictor with reset(), step(), ready_o, valid_o and
+                 data_o (e.g. FifoPredictor), or None
+    """
+    __slots__ = ("_model", "_predictor", "_events", "stats",
+                 "_in_clk", "_in_reset", "_valid_i", "_ready_o", "_data_i",
+                 "_out_clk", "_out_reset", "_valid_o", "_ready_i", "_data_o",
+                 "_coro_run_input", "_coro_run_output", "_coro_run_lockstep")
+
+    def __init__(self, dut, model, in_prefix="", out_prefix="", stats=None, predictor=None):
+
+        self._in_clk = getattr(dut, in_prefix + "clk_i")
+        self._in_reset = getattr(dut, in_prefix + "reset_i")
+        self._valid_i = getattr(dut, in_prefix + "valid_i")
+        self._ready_o = getattr(dut, in_prefix + "ready_o")
+        self._data_i = getattr(dut, in_prefix + "data_i")
+
+        self._out_clk = getattr(dut, out_prefix + "clk_i")
+        self._out_reset = getattr(dut, out_prefix + "reset_i")
+        self._valid_o = getattr(dut, out_prefix + "valid_o")
+        self._ready_i = getattr(dut, out_prefix + "ready_i")
+        self._data_o = getattr(dut, out_prefix + "data_o")
+
+        if(predictor is not None and in_prefix != out_prefix):
+            raise ValueError("A cycle-accurate predictor needs both sides in the same clock domain")
+
+        self._model = model
+        self._predictor = predictor
+        self.stats = stats
+
+        # Enqueue times of the elements in the fifo. Like the model,
+        # this can never hold more than depth_p (+1) entries.
+        self._events = deque(maxlen=(1 << int(dut.depth_log2_p.value)) + 1)
+
+        self._coro_run_input = None
+        self._coro_run_output = None
+        self._coro_run_lockstep = None
+
+    def start(self):
+        """Start model"""
+        if self._coro_run_input is not None:
+            raise RuntimeError("Model already started")
+        self._coro_run_input = cocotb.start_soon(self._run_input())
+        self._coro_run_output = cocotb.start_soon(self._run_output())
+        if(self._predictor is not None):
+            self._coro_run_lockstep = cocotb.start_soon(self._run_lockstep())
+
+    async def _run_input(self):
+        # Handshakes on the producer side: sample valid and ready on
+        # every rising edge out of reset.
+        rising = RisingEdge(self._in_clk)
+        reset_i = self._in_reset
+        valid_i = self._valid_i
+        ready_o = self._ready_o
+        events = self._events
+        consume = self._model.consume
+        while True:
+            await rising
+            reset = reset_i.value
+            if((not reset.is_resolvable) or reset == 1):
+                continue
+            v = valid_i.value
+            r = ready_o.value
+            if(not (v.is_resolvable and r.is_resolvable)):
+                assert_resolvable(valid_i)
+                assert_resolvable(ready_o)
+            if(v == 1 and r == 1):
+                events.append(get_sim_time(units='ns'))
+                consume()
+
+    async def _run_output(self):
+        # Handshakes on the consumer side
+        rising = RisingEdge(self._out_clk)
+        reset_i = self._out_reset
+        valid_o = self._valid_o
+        ready_i = self._ready_i
+        events = self._events
+        produce = self._model.produce
+        stats = self.stats
+        while True:
+            await rising
+            reset = reset_i.value
+            if((not reset.is_resolvable) or reset == 1):
+                continue
+            v = valid_o.value
+            r = ready_i.value
+            if(not (v.is_resolvable and r.is_resolvable)):
+                assert_resolvable(valid_o)
+                assert_resolvable(ready_i)
+            if(v == 1 and r == 1):
+                assert (len(events) > 0), "Error! Module produced output without valid input"
+                input_time = events.popleft()
+                output_time = get_sim_time(units='ns')
+                assert input_time <= output_time, f"Error! Element enqueued at {input_time}ns was produced earlier, at {output_time}ns"
+                produce()
+                if(stats is not None):
+                    stats.record(input_time, output_time)
+
+    async def _run_lockstep(self):
+        # The model is started after reset, so it starts in the reset
+        # state. On every rising edge, compare the outputs from before
+        # the edge with the prediction, then advance the prediction
+        # with the inputs sampled on the edge.
+        predictor = self._predictor
+        rising = RisingEdge(self._in_clk)
+        reset_i = self._in_reset
+        valid_i = self._valid_i
+        ready_i = self._ready_i
+        data_i = self._data_i
+        valid_o = self._valid_o
+        ready_o = self._ready_o
+        data_o = self._data_o
+
+        cycle = 0
+        while True:
+            await rising
+            reset = reset_i.value
+            if((not reset.is_resolvable) or reset == 1):
+                predictor.reset()
+                continue
+
+            assert_resolvable(valid_o)
+            assert_resolvable(ready_o)
+            valid = (valid_o.value == 1)
+            assert (ready_o.value == 1) == predictor.ready_o, f"Error! On cycle {cycle} after reset, ready_o is {ready_o.value}, expected {int(predictor.ready_o)}."
+            assert valid == predictor.valid_o, f"Error! On cycle {cycle} after reset, valid_o is {valid_o.value}, expected {int(predictor.valid_o)}."
+
+            expected = predictor.data_o
+            if(valid and expected is not None):
+                assert_resolvable(data_o)
+                assert data_o.value == expected, f"Error! On cycle {cycle} after reset, data_o is {int(data_o.value)}, expected {expected}."
+
+            wr = (valid_i.value == 1)
+            predictor.step(wr, int(data_i.value) if wr else 0, ready_i.value == 1)
+            cycle += 1
+
+    def stop(self) -> None:
+        """Stop monitor"""
+        if self._coro_run_input is None:
+            raise RuntimeError("Monitor never started")
+        self._coro_run_input.kill()
+        self._coro_run_output.kill()
+        self._coro_run_input = None
+        self._coro_run_output = None
+        if(self._coro_run_lockstep is not None):
+            self._coro_run_lockstep.kill()
+            self._coro_run_lockstep = None
+
+class LatencyStats():
+    """Streaming enqueue-to-dequeue latency histogram and sliding-window
+    throughput for a FIFO.
+
+    Latencies are kept in ns in a histogram (one bin per distinct
+    latency, of which there are few because they are made of whole
+    clock periods), so memory does not grow with the number of
+    elements. Latencies can be reported in cycles of any of the clocks
+    in periods.
+
+    Arguments:
+    periods -- Dictionary of clock name to clock period in ns, e.g. {"pclk": 1, "cclk": 3.1}
+    window -- Number of elements in the sliding throughput window
+    """
+    def __init__(self, periods, window=64):
+        self._periods = periods
+        self._hist = {}
+        self._n = 0
+        self._window = deque(maxlen=window)
+        self._first = None
+        self._last = None
+        self._min_rate = None
+        self._max_rate = None
+
+    def record(self, enq_ns, deq_ns):
+        """Record one element, enqueued at enq_ns and dequeued at deq_ns."""
+        latency = round(deq_ns - enq_ns, 3)
+        self._hist[latency] = self._hist.get(latency, 0) + 1
+        self._n += 1
+
+        if(self._first is None):
+            self._first = deq_ns
+        self._last = deq_ns
+
+        self._window.append(deq_ns)
+        if(len(self._window) == self._window.maxlen):
+            span = self._window[-1] - self._window[0]
+            if(span > 0):
+                rate = (len(self._window) - 1) / span
+                self._min_rate = rate if self._min_rate is None else min(self._min_rate, rate)
+                self._max_rate = rate if self._max_rate is None else max(self._max_rate, rate)
+
+    def count(self):
+        return self._n
+
+    def _scale(self, clock):
+        return 1 if clock is None else self._periods[clock]
+
+    def percentile(self, p, clock=None):
+        """Get the p-th percentile (0-100) latency in ns, or in cycles of
+        clock if given."""
+        assert self._n > 0, "No latencies recorded"
+        rank = max(1, -(-p * self._n // 100))
+        seen = 0
+        for latency in sorted(self._hist):
+            seen += self._hist[latency]
+            if(seen >= rank):
+                return latency / self._scale(clock)
+
+    def mean(self, clock=None):
+        """Get the mean latency in ns, or in cycles of clock if given."""
+        assert self._n > 0, "No latencies recorded"
+        return sum(l * c for l, c in self._hist.items()) / self._n / self._scale(clock)
+
+    def throughput(self):
+        """Get the throughput in elements per ns: the mean over the whole
+        run, and the minimum and maximum over any sliding window."""
+        mean = None
+        if(self._n > 1 and self._last > self._first):
+            mean = (self._n - 1) / (self._last - self._first)
+        return {"mean": mean, "min_window": self._min_rate, "max_window": self._max_rate}
+
+    def summary(self):
+        """Get a dictionary of all statistics."""
+        s = {"count": self._n,
+             "periods_ns": self._periods,
+             "throughput_per_ns": self.throughput(),
+             "histogram_ns": {str(k): v for k, v in sorted(self._hist.items())}}
+        if(self._n):
+            for clock in [None] + list(self._periods):
+                unit = "ns" if clock is None else clock
+                s[f"latency_{unit}"] = {"min": self.percentile(0, clock),
+                                        "mean": self.mean(clock),
+                                        "p50": self.percentile(50, clock),
+                                        "p90": self.percentile(90, clock),
+                                        "p99": self.percentile(99, clock),
+                                        "max": self.percentile(100, clock)}
+        return s
+
+    def to_json(self, path):
+        """Write summary() to path as JSON."""
+        with open(path, "w") as fd:
+            json.dump(self.summary(), fd, indent=2)
+
+    def assert_percentile(self, p, max_cycles, clock):
+        """Assert that the p-th percentile latency is at most max_cycles
+        cycles of clock."""
+        got = self.percentile(p, clock)
+        assert got <= max_cycles, f"Error! p{p} latency is {got:.2f} {clock} cycles, expected at most {max_cycles:.2f}."
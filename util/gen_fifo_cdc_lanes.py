@@ -0,0 +1,201 @@
+# Generator for the multi-lane variant of fifo_1r1w_cdc. The
+# generated fifo moves lanes_p words of width_p bits per handshake, so
+# a slow consumer can keep up with a fast producer by reading several
+# words per cycle. It wraps an instance of fifo_1r1w_cdc whose entries
+# are lanes_p * width_p bits wide (the synthesis tools split the RAM
+# into one block per lane), so the pointers, synchronizers, fwft_p and
+# the fill outputs are the ones of fifo_1r1w_cdc. lanes_p, width_p,
+# depth_log2_p and the fifo_1r1w_cdc parameters stay SystemVerilog
+# parameters. The generator decides the structure:
+
+#   --front-end none     The producer also writes lanes_p words per
+#                        handshake (cdata_i is lanes_p * width_p bits).
+#   --front-end gearbox  The producer writes one width_p word per
+#                        handshake, and a width-converting front end
+#                        packs lanes_p of them into each fifo entry.
+
+# For example, to regenerate the checked-in variant:
+
+#   python3 util/gen_fifo_cdc_lanes.py --front-end gearbox -o part1/fifo_1r1w_cdc_lanes
+
+# This writes <name>.sv and filelist.json to the output directory.
+
+import os
+import sys
+import argparse
+
+# Sources of fifo_1r1w_cdc, relative to the repository root
+_SHARED = ["part1/fifo_1r1w_cdc/fifo_1r1w_cdc.sv"
+           ,"part1/fifo_1r1w_cdc/bin2gray.sv"
+           ,"part1/fifo_1r1w_cdc/gray2bin.sv"
+           ,"part1/fifo_1r1w_cdc/ram_1r1w_sync.sv"]
+
+_HEADER = """\
+// Generated by util/gen_fifo_cdc_lanes.py --front-end {front_end}. Do not edit.
+module {name}
+ #(parameter [31:0] width_p = 24
+  ,parameter [31:0] depth_log2_p = 4
+  ,parameter [31:0] lanes_p = 2
+   // Passed to fifo_1r1w_cdc. The fill levels and thresholds count
+   // entries of lanes_p words.
+  ,parameter [31:0] sync_stages_p = 2
+  ,parameter [31:0] almost_full_p = (1 << depth_log2_p) - 1
+  ,parameter [31:0] almost_empty_p = 1
+  ,parameter [0:0] fwft_p = 0
+  )
+   // Each fifo entry holds lanes_p words of width_p bits. Lane 0 is
+   // the least significant word, and the first in stream order.
+  (input [0:0] cclk_i
+  ,input [0:0] creset_i
+  ,input [{in_width}-1:0] cdata_i
+  ,input [0:0] cvalid_i
+  ,output [0:0] cready_o
+  ,output [depth_log2_p:0] cfill_o
+  ,output [0:0] calmost_full_o
+
+  ,input [0:0] pclk_i
+  ,input [0:0] preset_i
+  ,output [0:0] pvalid_o
+  ,output [(lanes_p*width_p)-1:0] pdata_o
+  ,input [0:0] pready_i
+  ,output [depth_log2_p:0] pfill_o
+  ,output [0:0] palmost_empty_o
+  );
+
+  logic [0:0] full;
+  logic [0:0] wr_valid;
+  logic [(lanes_p*width_p)-1:0] wr_data;
+"""
+
+_DIRECT = """
+  // No front end: every producer handshake writes a whole entry.
+  assign wr_valid = cvalid_i;
+  assign wr_data = cdata_i;
+  assign cready_o = ~full;
+"""
+
+_GEARBOX = """
+  // Gearbox front end: collect lanes_p words from the producer, then
+  // write them to the fifo as one entry. While a complete entry waits
+  // for space, the producer is stalled, unless the entry is written
+  // on this same edge.
+  localparam cnt_width_lp = $clog2(lanes_p+1);
+  logic [cnt_width_lp-1:0] gear_cnt;
+  logic [width_p-1:0] gear_data [lanes_p-1:0];
+  logic [0:0] gear_full, gear_en, gear_wr;
+
+  assign gear_full = (gear_cnt == cnt_width_lp'(lanes_p));
+  assign wr_valid = gear_full;
+  assign gear_wr = gear_full & ~full;
+  assign cready_o = ~gear_full | ~full;
+  assign gear_en = cvalid_i & cready_o;
+
+  always_ff @(posedge cclk_i) begin
+    if (creset_i) begin
+      gear_cnt <= '0;
+    end
+    else begin
+      if (gear_wr & gear_en) begin
+        gear_cnt <= 1;
+      end
+      else if (gear_wr) begin
+        gear_cnt <= '0;
+      end
+      else if (gear_en) begin
+        gear_cnt <= gear_cnt + 1;
+      end
+    end
+  end
+
+  for (genvar i = 0; i < lanes_p; i++) begin : gear
+    always_ff @(posedge cclk_i) begin
+      if (gear_en && (gear_wr ? (i == 0) : (gear_cnt == cnt_width_lp'(i)))) begin
+        gear_data[i] <= cdata_i;
+      end
+    end
+    assign wr_data[i*width_p +: width_p] = gear_data[i];
+  end
+"""
+
+_CORE = """
+  // The fifo itself, with one lanes_p * width_p bit word per entry.
+  logic [0:0] fifo_ready;
+  assign full = ~fifo_ready;
+
+  fifo_1r1w_cdc
+  #(.width_p(lanes_p*width_p)
+   ,.depth_log2_p(depth_log2_p)
+   ,.sync_stages_p(sync_stages_p)
+   ,.almost_full_p(almost_full_p)
+   ,.almost_empty_p(almost_empty_p)
+   ,.fwft_p(fwft_p))
+  fifo_inst
+  (.cclk_i(cclk_i)
+  ,.creset_i(creset_i)
+  ,.cdata_i(wr_data)
+  ,.cvalid_i(wr_valid)
+  ,.cready_o(fifo_ready)
+  ,.cfill_o(cfill_o)
+  ,.calmost_full_o(calmost_full_o)
+
+  ,.pclk_i(pclk_i)
+  ,.preset_i(preset_i)
+  ,.pvalid_o(pvalid_o)
+  ,.pdata_o(pdata_o)
+  ,.pready_i(pready_i)
+  ,.pfill_o(pfill_o)
+  ,.palmost_empty_o(palmost_empty_o)
+  );
+
+endmodule
+"""
+
+def generate(name, front_end):
+    """ Generate the SystemVerilog source of a multi-lane CDC fifo.
+
+    Arguments:
+    name -- Module name
+    front_end -- "none" or "gearbox"
+    """
+    if(front_end == "gearbox"):
+        in_width = "width_p"
+        body = _GEARBOX
+    else:
+        in_width = "(lanes_p*width_p)"
+        body = _DIRECT
+    return _HEADER.format(front_end=front_end, name=name, in_width=in_width) + body + _CORE
+
+def write(out_dir, name, front_end):
+    """ Write <name>.sv and filelist.json to out_dir.
+
+    Arguments:
+    out_dir -- Output (module) directory, inside the repository
+    name -- Module name
+    front_end -- "none" or "gearbox"
+    """
+    root = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+    os.makedirs(out_dir, exist_ok=True)
+
+    sv = os.path.join(out_dir, name + ".sv")
+    with open(sv, "w") as fd:
+        fd.write(generate(name, front_end))
+
+    files = [os.path.relpath(os.path.abspath(sv), root)] + _SHARED
+    with open(os.path.join(out_dir, "filelist.json"), "w") as fd:
+        fd.write(' {\n    "top": "%s",\n    "files":\n     [' % name)
+        fd.write("\n     ,".join(f'"{f}"' for f in files))
+        fd.write("\n     ]\n}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a multi-lane fifo_1r1w_cdc.")
+    parser.add_argument("-o", "--out", required=True, help="Output directory")
+    parser.add_argument("--name", default="fifo_1r1w_cdc_lanes", help="Module name (default: fifo_1r1w_cdc_lanes)")
+    parser.add_argument("--front-end", choices=["none", "gearbox"], default="gearbox",
+                        help="Producer interface (default: gearbox)")
+    args = parser.parse_args()
+
+    write(args.out, args.name, args.front_end)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,35 @@
+# Print the files in the filelist.json of the current directory,
+# separated by spaces. With --mk, print a makefile fragment instead,
+# which frag/filelist.mk includes, like so:
+
+#   FILELIST_TOP := hello
+#   FILELIST_SOURCES := part1/sim/hello.sv
+
+# make regenerates the fragment only when filelist.json changes, so it
+# doesn't start Python to read the filelist on every invocation.
+
+import sys
 import json
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the files in filelist.json.")
+    parser.add_argument("--mk", action="store_true",
+                        help="Print a makefile fragment with the top module and the files")
+    args = parser.parse_args()
+
+    with open("filelist.json") as filelist:
+        filelist = json.load(filelist)
+
+    if(args.mk):
+        print("# Generated from filelist.json by util/get_filelist.py --mk. Do not edit.")
+        print(f"FILELIST_TOP := {filelist['top']}")
+        print(f"FILELIST_SOURCES := {' '.join(filelist['files'])}")
+    else:
+        for f in filelist["files"]:
+            print(f,end=" ")
+        print()
+    return 0
 
-with open("filelist.json") as filelist:
-    files = json.load(filelist)["files"]
-    for f in files:
-        print(f,end=" ")
-    print()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# Parallel regression scheduler for the pytest matrix. Run it from a
+# module directory (the one that contains filelist.json), like so:
+
+#   python3 ../../util/scheduler.py -j 32
+
+# Every pytest case is run in its own pytest process. Builds are
+# protected by the per-build-directory locks in utilities.runner, and
+# each case already has an isolated run/<test>/<params>/<sim> work
+# directory, so cases can run in any order. To keep the cores busy,
+# one case per Verilator build is started first so that the expensive
+# compiles overlap, and the remaining cases follow. Every process gets
+# the same SIM_RUN_ID, so the cases of a batch (see
+# utilities.batch_runner) share one simulation instead of each running
+# it again.
+
+import os
+import re
+import sys
+import time
+import uuid
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+def collect(pytest_args):
+    """ Get the list of pytest node ids in the current directory.
+
+    Arguments:
+    pytest_args -- List of extra arguments passed to pytest
+    """
+    out = subprocess.run([sys.executable, "-m", "pytest", "--collect-only", "-q"] + pytest_args,
+                         capture_output=True, text=True)
+    nodes = [l.strip() for l in out.stdout.splitlines() if "::" in l]
+    if(not nodes):
+        sys.stderr.write(out.stdout + out.stderr)
+    return nodes
+
+def get_node_params(node):
+    """ Get the parametrization of a pytest node id as a dictionary.
+
+    Arguments:
+    node -- pytest node id, e.g. test_x.py::test_each[simulator=verilator-width_p=7]
+    """
+    m = re.search(r"\[(.*)\]$", node)
+    if(m is None):
+        return {}
+    return dict(p.split("=", 1) for p in m.group(1).split("-") if "=" in p)
+
+def get_build_key(node):
+    """ Get a key identifying the simulator build a pytest node uses. Nodes
+    with the same key share a build.
+
+    Arguments:
+    node -- pytest node id
+    """
+    params = get_node_params(node)
+    params.pop("test_name", None)
+    return tuple(sorted(params.items()))
+
+def order_jobs(nodes):
+    """ Order pytest nodes so that the compile-heavy jobs start first.
+
+    The first job for each Verilator build compiles the model, so these
+    are started before everything else. Other Verilator jobs follow
+    (they wait on the build lock at worst), then everything else.
+
+    Arguments:
+    nodes -- List of pytest node ids
+    """
+    first = []
+    verilator = []
+    rest = []
+    seen = set()
+    for node in nodes:
+        params = get_node_params(node)
+        if(params.get("simulator", "").startswith("verilator")):
+            key = get_build_key(node)
+            if(key in seen):
+                verilator.append(node)
+            else:
+                seen.add(key)
+                first.append(node)
+        else:
+            rest.append(node)
+    return first + verilator + rest
+
+def run_job(node, pytest_args):
+    """ Run a single pytest node in its own process.
+
+    Arguments:
+    node -- pytest node id
+    pytest_args -- List of extra arguments passed to pytest
+
+    Returns a tuple of (node, return code, wall time, output).
+    """
+    start = time.time()
+    out = subprocess.run([sys.executable, "-m", "pytest", "-q", "-rA", "-p", "no:cacheprovider", node] + pytest_args,
+                         capture_output=True, text=True)
+    return (node, out.returncode, time.time() - start, out.stdout + out.stderr)
+
+def schedule(nodes, jobs, pytest_args=[], verbose=False):
+    """ Run pytest nodes on a pool of workers.
+
+    Arguments:
+    nodes -- List of pytest node ids, in the order they should start
+    jobs -- Number of parallel workers
+    pytest_args -- List of extra arguments passed to pytest
+    verbose -- Print the output of passing jobs too
+
+    Returns the list of failing node ids.
+    """
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_job, n, pytest_args) for n in nodes]
+        for i, f in enumerate(as_completed(futures)):
+            node, rc, t, output = f.result()
+            status = "PASSED" if rc == 0 else "FAILED"
+            print(f"[{i + 1}/{len(nodes)}] {status} {node} ({t:.1f}s)", flush=True)
+            if(rc != 0):
+                failed.append(node)
+            if(rc != 0 or verbose):
+                print(output, flush=True)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pytest matrix in parallel.")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of parallel workers (default: number of cores)")
+    parser.add_argument("-k", dest="keyword", default=None,
+                        help="Only run tests matching this pytest keyword expression")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print the output of passing tests")
+    args = parser.parse_args()
+
+    pytest_args = []
+    if(args.keyword):
+        pytest_args += ["-k", args.keyword]
+
+    # Inherited by every pytest process
+    os.environ["SIM_RUN_ID"] = uuid.uuid4().hex
+
+    start = time.time()
+    nodes = order_jobs(collect(pytest_args))
+    if(not nodes):
+        print("No tests collected.")
+        return 1
+
+    failed = schedule(nodes, args.jobs, verbose=args.verbose)
+
+    print(f"{len(nodes) - len(failed)} passed, {len(failed)} failed in {time.time() - start:.1f}s with {args.jobs} workers")
+    for node in failed:
+        print(f"FAILED {node}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# Seed sweep for the randomized tests. Runs one test with many seeds
+# across a pool of worker processes, and stops at the first failure.
+# Run it from a module directory (the one that contains
+# filelist.json), like so:
+
+#   python3 ../../util/seed_sweep.py -t fuzz_test_003 -p width_p=7 -p depth_log2_p=2 -n 500 -j 32
+
+# Seeds are used as cocotb's RANDOM_SEED directly, starting from
+# --base (default: the current time, so every sweep explores new
+# stimulus). Every failing seed is recorded in
+# run/seed_sweep/<test>/<params>/<sim>/seed_sweep.json, and its run
+# directory is kept next to it (passing runs are deleted). To
+# reproduce a failure, sweep just that seed: --base <seed> -n 1.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+from utilities import runner, get_param_string
+
+def get_sweep_dir(tbpath, testname, params, simulator):
+    """ Get the directory that holds the runs and results of a sweep.
+
+    Arguments:
+    tbpath -- Module directory
+    testname -- Name of the cocotb test
+    params -- Dictionary of parameters
+    simulator -- Simulator name
+    """
+    return os.path.join(tbpath, "run", "seed_sweep", testname, get_param_string(params), simulator)
+
+def run_seed(simulator, timescale, tbpath, testname, params, seed):
+    """ Run a test with one seed, in its own work directory.
+
+    This runs in a worker process: runner sets COCOTB_RESULTS_FILE in
+    the environment, so concurrent runs can't share a process.
+
+    Arguments:
+    simulator -- Simulator name
+    timescale -- Simulation timescale
+    tbpath -- Module directory
+    testname -- Name of the cocotb test
+    params -- Dictionary of parameters
+    seed -- RANDOM_SEED for this run
+
+    Returns a tuple of (seed, passed, message).
+    """
+    work_dir = os.path.join(get_sweep_dir(tbpath, testname, params, simulator), str(seed))
+    try:
+        runner(simulator, timescale, tbpath, params, testname=testname, seed=seed, work_dir=work_dir)
+    except SystemExit as e:
+        return (seed, False, str(e))
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return (seed, True, "")
+
+def sweep(simulator, timescale, tbpath, testname, params, seeds, jobs, keep_going=False):
+    """ Run a test with many seeds on a pool of worker processes.
+
+    Arguments:
+    simulator -- Simulator name
+    timescale -- Simulation timescale
+    tbpath -- Module directory
+    testname -- Name of the cocotb test
+    params -- Dictionary of parameters
+    seeds -- List of seeds to run
+    jobs -- Number of parallel workers
+    keep_going -- Run every seed instead of stopping at the first failure
+
+    Returns a tuple of (number of seeds run, list of (seed, message) for the failures).
+    """
+    # Build once up front, instead of every worker waiting on the
+    # build lock.
+    if(simulator.startswith("verilator")):
+        runner(simulator, timescale, tbpath, params, testname=testname, compile_only=True)
+
+    done = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_seed, simulator, timescale, tbpath, testname, params, s) for s in seeds]
+        for f in as_completed(futures):
+            if(f.cancelled()):
+                continue
+            seed, passed, message = f.result()
+            done += 1
+            print(f"[{done}/{len(seeds)}] {'PASSED' if passed else 'FAILED'} {testname} seed={seed}", flush=True)
+            if(not passed):
+                failures.append((seed, message))
+                if(not keep_going):
+                    # Runs that already started finish, the rest never do.
+                    for g in futures:
+                        g.cancel()
+    return (done, failures)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a randomized test with many seeds.")
+    parser.add_argument("-t", "--test", required=True, help="Name of the cocotb test, e.g. fuzz_test_003")
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        help="Parameter as name=value, may be repeated")
+    parser.add_argument("-s", "--simulator", default="verilator", help="Simulator (default: verilator)")
+    parser.add_argument("-n", "--seeds", type=int, default=100, help="Number of seeds (default: 100)")
+    parser.add_argument("--base", type=int, default=None, help="First seed (default: the current time)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of parallel workers (default: number of cores)")
+    parser.add_argument("--timescale", default="1ps/1ps", help="Simulation timescale (default: 1ps/1ps)")
+    parser.add_argument("--keep-going", action="store_true", help="Don't stop at the first failure")
+    args = parser.parse_args()
+
+    tbpath = os.getcwd()
+    params = dict(p.split("=", 1) for p in args.param)
+    base = int(time.time()) if args.base is None else args.base
+    seeds = list(range(base, base + args.seeds))
+
+    start = time.time()
+    done, failures = sweep(args.simulator, args.timescale, tbpath, args.test, params, seeds, args.jobs, args.keep_going)
+
+    sweep_dir = get_sweep_dir(tbpath, args.test, params, args.simulator)
+    os.makedirs(sweep_dir, exist_ok=True)
+    with open(os.path.join(sweep_dir, "seed_sweep.json"), "w") as fd:
+        json.dump({"test": args.test,
+                   "params": params,
+                   "simulator": args.simulator,
+                   "base": base,
+                   "seeds_run": done,
+                   "failures": [{"seed": s, "message": m, "work_dir": os.path.join(sweep_dir, str(s))}
+                                for (s, m) in failures]}, fd, indent=2)
+
+    print(f"{done - len(failures)} passed, {len(failures)} failed of {done} seeds in {time.time() - start:.1f}s with {args.jobs} workers")
+    for (s, m) in failures:
+        print(f"FAILED seed={s}: {m}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
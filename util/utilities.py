@@ -10,107 +10,625 @@
 
 # Each file in the filelist is relative to the repository root.
 
+# This module is imported both by pytest, to collect and launch the
+# simulations, and by the testbenches in the simulator. Neither needs
+# everything, so GitPython, cocotb-test and cocotb are only imported
+# by the functions that use them.
+
 import os
-import git
 
 import sys
 import json
-import cocotb
+import fcntl
+import shutil
+import contextlib
+import hashlib
+import functools
+import subprocess
+import xml.etree.ElementTree as ET
+
+# Compiled Verilator models are kept in a content-addressed cache so
+# that they can be reused across pytest invocations and checkouts. The
+# location and size cap (in MB) can be overridden from the
+# environment.
+BUILD_CACHE_DIR = os.environ.get("SIM_BUILD_CACHE",
+                                 os.path.join(os.path.expanduser("~"), ".cache", "sim_build"))
+BUILD_CACHE_MB = int(os.environ.get("SIM_BUILD_CACHE_MB", "4096"))
+
+# Written into a build directory once the build has finished, with its
+# size in bytes (see write_build_stamp).
+BUILD_STAMP = ".built"
+
+# Per-process caches for get_repo_root, get_project and get_file_hash
+_REPO_ROOT = None
+_PROJECTS = {}
+_FILE_HASHES = {}
 
-from cocotb_test.simulator import run
-from cocotb.clock import Clock
-from cocotb.regression import TestFactory
-from cocotb.utils import get_sim_time
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, with_timeout
-from cocotb.types import LogicArray
-from cocotb.utils import get_sim_time
+# A run that passed records its dependencies in this file in its work
+# directory, so that it isn't run again until one of them changes.
+DEPS_FILE = "deps.json"
 
-def runner(simulator, timescale, tbpath, params, defs=[], testname=None, pymodule=None, jsonpath=None, jsonname="filelist.json", root=None):
+# A batched run (see batch_runner) records the pytest session that ran
+# it in this file, so the other tests of the batch in the same session
+# read its results instead of running it again.
+BATCH_FILE = "batch.json"
+
+# Environment variables that change the stimulus or the checks of a
+# simulation, so an incremental run must not be skipped when they
+# change. Variables that only change where the results go, what is
+# traced or profiled, or how long things may take (COCOTB_RESULTS_FILE,
+# SIM_BUILD_CACHE, WAVES_ON_FAIL, IMPORT_TIME_BUDGET, ...) are left out.
+# Add a variable here when a bench starts reading a new knob.
+RUN_ENV_KNOBS = ["SIM_SEED"
+                 ,"SIM_BATCH"
+                 ,"TB_BACKEND"
+                 ,"THROUGHPUT_FRACTION"
+                 ,"FRAME_RATE_FRACTION"
+                 ,"SOAK_BEATS"
+                 ,"SOAK_CCLK_PERIOD"
+                 ,"SOAK_PCLK_PERIOD"
+                 ,"SOAK_CHECKPOINT_NS"
+                 ,"DEPTH_PROBE_BURST"
+                 ,"DEPTH_PROBE_BURSTS"
+                 ,"DEPTH_PROBE_IDLE"
+                 ,"DEPTH_PROBE_READ_RATE"
+                 ,"DEPTH_PROBE_CCLK_PERIOD"
+                 ,"DEPTH_PROBE_PCLK_PERIOD"]
+
+def runner(simulator, timescale, tbpath, params, defs=[], testname=None, pymodule=None, jsonpath=None, jsonname="filelist.json", root=None, compile_only=False, profile=None, waves=None, window=None, scopes=None, rerun=None, seed=None, work_dir=None, env=None, incremental=None, plusargs=None):
     """Run the simulator on test n, with parameters params, and defines
-    defs. If n is none, it will run all tests"""
+    defs. If n is none, it will run all tests, and if it is a
+    comma-separated list, those tests (see batch_runner). If
+    compile_only is set, only build the (Verilator) model for this
+    parameter set. If profile is set (default: the SIM_PROFILE
+    environment variable), the Python side of the testbench is profiled
+    as well.
+
+    Tracing is off unless waves is set (default: the WAVES environment
+    variable). To trace only part of a run, set window to a (start,
+    end) tuple in ns and/or scopes to a list of instance paths below the
+    top module (default: the TRACE_WINDOW and TRACE_SCOPES environment
+    variables, e.g. TRACE_WINDOW=1000:2000).
+
+    If a run fails and rerun is set (default: the WAVES_ON_FAIL
+    environment variable, on), each failing test is run again on its
+    own with the same seed, tracing the last TRACE_LOOKBACK_NS (default: 10000) before it
+    failed. The re-runs go to the rerun/<test> directory of the run.
+
+    seed sets cocotb's RANDOM_SEED. By default it is derived from the
+    parameters and the SIM_SEED environment variable (see get_seed), so
+    that every parametrization sees different, but reproducible,
+    stimulus. work_dir overrides the
+    run/<test>/<params>/<sim> directory. env is a dictionary of extra
+    environment variables for the simulation. cocotb-test copies the
+    caller's environment over it, so a variable that is already set
+    wins. To select a testbench option that must not be inherited,
+    pass it in plusargs instead, a list like ["+tb_backend=axi"], which
+    the testbench reads from cocotb.plusargs.
+
+    If incremental is set (default: the SIM_INCREMENTAL environment
+    variable, on), a run that passed records what it depended on in
+    deps.json in its work directory (see get_run_deps), and is skipped
+    the next time if none of it has changed. Traced, profiled and
+    compile-only runs are always run."""
+
+    import cocotb
+    from cocotb_test.simulator import run
 
     # if json path is none, assume that it is the same as tbpath
     if(jsonpath is None):
         jsonpath = tbpath
 
     assert (os.path.exists(jsonpath)), "jsonpath directory must exist"
-    top = get_top(jsonpath, jsonname)
 
-    # if pymodule is none, assume that the python module name is test+<name of the top module>.
+    # Assume all paths in the json file are relative to the repository root.
+    project = get_project(root)
+    root = project.root
+    assert (os.path.exists(root)), "root directory path must exist"
+
+    filelist = project.filelist(jsonpath, jsonname)
+    top = filelist.top
+    sources = list(filelist.sources)
+
+    # if pymodule is none, use the cocotb module for the top module (see get_pymodule).
     if(pymodule is None):
-        pymodule = "test_" + top
+        pymodule = get_pymodule(tbpath, top)
 
     if(testname is None):
         testdir = "all"
     else:
         testdir=testname
-    
-    # Assume all paths in the json file are relative to the repository root.
-    if(root is None):
-        root = git.Repo(search_parent_directories=True).working_tree_dir
 
-    assert (os.path.exists(root)), "root directory path must exist"
+    if(work_dir is None):
+        work_dir = os.path.join(tbpath, "run", testdir, get_param_string(params), simulator)
+    build_dir = os.path.join(tbpath, "build", get_param_string(params))
 
-    sources = get_sources(root, tbpath)
+    if(waves is None):
+        waves = bool(int(os.environ.get("WAVES", "0")))
+    if(window is None):
+        window = get_trace_window(os.environ.get("TRACE_WINDOW", ""))
+    if(scopes is None):
+        scopes = [s for s in os.environ.get("TRACE_SCOPES", "").split(",") if s]
+    if(rerun is None):
+        rerun = bool(int(os.environ.get("WAVES_ON_FAIL", "1")))
+    if(seed is None):
+        seed = get_seed(params)
+    if(profile is None):
+        profile = bool(int(os.environ.get("SIM_PROFILE", "0")))
+    if(incremental is None):
+        incremental = bool(int(os.environ.get("SIM_INCREMENTAL", "1")))
 
-    work_dir = os.path.join(tbpath, "run", testdir, get_param_string(params), simulator)
-    build_dir = os.path.join(tbpath, "build", get_param_string(params))
+    # A window or a list of scopes selects windowed tracing, which
+    # dumps from a generated trace_window module instead of tracing
+    # everything from the start.
+    windowed = bool(window or scopes)
+    traced = waves or windowed
 
-    # Icarus doesn't build, it just runs.
+    # Icarus doesn't build, it just runs. Traced runs get their own
+    # directory, so that switching tracing on or off always recompiles.
     if simulator.startswith("icarus"):
-        build_dir = work_dir
+        build_dir = os.path.join(work_dir, "waves") if traced else work_dir
+
+    os.makedirs(work_dir, exist_ok=True)
 
+    defines = list(defs)
+    if(waves and not windowed):
+        defines += ["WAVES"]
+    if(traced):
+        defines += ["VM_TRACE_FST=1", "VM_TRACE=1"]
+
+    if(windowed):
+        trace_file = os.path.join(work_dir, "trace_window.sv")
+        write_trace_window(trace_file, top, scopes, bind=simulator.startswith("verilator"))
+        sources = sources + [trace_file]
+
+    build_waves = traced
     if simulator.startswith("verilator"):
-        compile_args=["-Wno-fatal", "-DVM_TRACE_FST=1", "-DVM_TRACE=1", "--timing"]
-        plus_args = ["--trace", "--trace-fst"]
-        if(not os.path.exists(work_dir)):
-            os.makedirs(work_dir)
+        compile_args=["-Wno-fatal", "--timing"]
+        plus_args = []
+        if(traced):
+            compile_args += ["-DVM_TRACE_FST=1", "-DVM_TRACE=1"]
+        # Full tracing is switched on at run time. Windowed tracing is
+        # done by the trace_window module instead.
+        if(waves and not windowed):
+            plus_args += ["--trace", "--trace-fst"]
+
+        # Reuse a compiled model if one exists for exactly these
+        # sources and options.
+        key = get_build_hash(simulator, top, sources, params, defines,
+                             compile_args + (["waves"] if traced else []), timescale)
+        build_dir = get_cached_build_dir(key)
     else:
         compile_args=[]
         plus_args = []
+        if(windowed):
+            build_waves = False
+            compile_args += ["-s", "trace_window"]
+            plus_args += ["-fst"]
 
-    run(verilog_sources=sources,
-        simulator=simulator,
-        toplevel=top,
-        module=pymodule,
-        compile_args=compile_args,
-        plus_args=plus_args,
-        sim_build=build_dir,
-        timescale=timescale,
-        parameters=params,
-        defines=defs + ["VM_TRACE_FST=1", "VM_TRACE=1"],
-        work_dir=work_dir,
-        waves=True,
-        testcase=testname)
+    if(windowed and window):
+        plus_args += [f"+trace_start_ns={int(window[0])}", f"+trace_end_ns={int(window[1])}"]
+    plus_args += list(plusargs or [])
+
+    # Skip the run if it already passed with the same sources, Python
+    # modules, parameters, seed and options.
+    deps = None
+    if(incremental and not (traced or profile or compile_only)):
+        key = dict(simulator=simulator, version=get_simulator_version(simulator), cocotb=cocotb.__version__,
+                   top=top, module=pymodule, testname=testname, params=params, defines=defines,
+                   timescale=timescale, seed=seed, env=env or {}, plusargs=list(plusargs or []))
+        files = sources + get_python_deps(root, tbpath)
+        deps = get_run_deps(root, files, key)
+        if(is_up_to_date(work_dir, deps)):
+            return
+
+    # Remove the outputs of any previous run, so a crashed simulation
+    # isn't reported with stale results (or waveforms).
+    results_xml = os.path.join(work_dir, "results.xml")
+    for f in ("results.xml", DEPS_FILE, "test_profile.pstat", "dump.fst", top + ".fst"):
+        if(os.path.exists(os.path.join(work_dir, f))):
+            os.remove(os.path.join(work_dir, f))
+
+    # The testbench modules read the root from REPO_ROOT, instead of
+    # searching for it again in the simulator.
+    extra_env = dict(env or {})
+    extra_env.setdefault("REPO_ROOT", root)
+    if(profile):
+        extra_env["COCOTB_ENABLE_PROFILING"] = "1"
+
+    kwargs = dict(verilog_sources=sources,
+                  toplevel=top,
+                  module=pymodule,
+                  compile_args=compile_args,
+                  plus_args=plus_args,
+                  sim_build=build_dir,
+                  timescale=timescale,
+                  parameters=params,
+                  defines=defines,
+                  work_dir=work_dir,
+                  waves=build_waves,
+                  testcase=testname,
+                  seed=seed,
+                  extra_env=extra_env)
+
+    # Write the results file next to the run instead of into the
+    # (shared) build directory.
+    results_env = os.environ.get("COCOTB_RESULTS_FILE")
+    os.environ["COCOTB_RESULTS_FILE"] = results_xml
+    failed = False
+    passed = False
+    try:
+        if not simulator.startswith("verilator"):
+            run(simulator=simulator, compile_only=compile_only, **kwargs)
+            passed = True
+            return
+
+        # Phase 1: Compile once per parameter set. The stamp is only
+        # written after a successful build. Concurrent runners for the
+        # same parameter set wait here until the build is done.
+        # Phase 2: Launch the compiled model directly. The shared lock
+        # keeps the build from being evicted while it runs. If it was
+        # evicted between the two phases, build it again.
+        stamp = os.path.join(build_dir, BUILD_STAMP)
+        while True:
+            with build_lock(build_dir, exclusive=True):
+                if(not os.path.exists(stamp)):
+                    run(simulator=simulator, compile_only=True, **kwargs)
+                    write_build_stamp(build_dir)
+            if(compile_only):
+                break
+            with build_lock(build_dir, exclusive=False):
+                if(os.path.exists(stamp)):
+                    get_verilator_run_only()(**kwargs).run()
+                    break
+        passed = True
+    except SystemExit:
+        failed = True
+        raise
+    finally:
+        if(results_env is None):
+            del os.environ["COCOTB_RESULTS_FILE"]
+        else:
+            os.environ["COCOTB_RESULTS_FILE"] = results_env
+
+        if(os.path.exists(results_xml)):
+            write_profile(work_dir)
+
+        if(passed and deps is not None):
+            write_run_deps(work_dir, deps)
+
+        # Run each failing test again on its own, with the same seed and
+        # tracing on, so that there is a waveform to look at without
+        # re-running it by hand. Only the time before the failure is
+        # traced. Without a results file (e.g. the simulator crashed)
+        # there is no failure time, so the whole run is traced. The
+        # original failure is what gets reported.
+        if(failed and rerun and not traced and not compile_only):
+            failures = []
+            if(os.path.exists(results_xml)):
+                seed, failures = get_failures(results_xml)
+            if(not failures):
+                failures = [(testname, None)]
+
+            lookback = float(os.environ.get("TRACE_LOOKBACK_NS", "10000"))
+            for (name, t) in failures:
+                rerun_window = None if t is None else (max(0, t - lookback), 0)
+                try:
+                    runner(simulator, timescale, tbpath, params, defs, name, pymodule, jsonpath, jsonname,
+                           root, profile=False, waves=True, window=rerun_window, rerun=False, seed=seed,
+                           work_dir=os.path.join(work_dir, "rerun", name if (name and "," not in name) else "all"), env=env,
+                           plusargs=plusargs)
+                except SystemExit:
+                    pass
+
+def batch_runner(simulator, timescale, tbpath, params, testname, group, defs=[], pymodule=None, jsonpath=None, jsonname="filelist.json", root=None, env=None, plusargs=None, batch=None):
+    """Run test testname, with parameters params, in one simulation
+    together with the other tests in group, and report its own result.
+    The tests run back to back in a single simulator process (each one
+    starts its clocks and resets the design itself, as in test_all), so
+    a parameter set is built and launched once instead of once per
+    test. The first call for a batch runs it, under a lock in its work
+    directory, and every other call with the same SIM_RUN_ID only reads
+    its result from results.xml. conftest.py sets SIM_RUN_ID once per
+    pytest run, pytest-xdist workers inherit it, and util/scheduler.py
+    sets one for all of its pytest processes.
+
+    batch is the largest number of tests per simulation (default: the
+    SIM_BATCH environment variable, or 0 for all of group). With batch
+    set to 1, or when tracing (WAVES, TRACE_WINDOW or TRACE_SCOPES),
+    every test runs in a simulation of its own, like runner.
+
+    The seed only depends on the parameters (see get_seed), and cocotb
+    seeds every test from it and the test's own name, so a test sees the
+    same stimulus in a batch as on its own (SIM_BATCH=1). A failing test
+    is re-run on its own (WAVES_ON_FAIL). The other options are passed
+    to runner.
+
+    Arguments:
+    testname -- Name of the test to report
+    group -- Names of the tests to run with it, including testname
+    batch -- Number of tests per simulation, 0 for all of group
+    """
+    if(batch is None):
+        batch = int(os.environ.get("SIM_BATCH", "0"))
+    traced = (bool(int(os.environ.get("WAVES", "0"))) or os.environ.get("TRACE_WINDOW")
+              or os.environ.get("TRACE_SCOPES"))
+    if(batch == 1 or traced):
+        runner(simulator, timescale, tbpath, params, defs, testname, pymodule, jsonpath, jsonname, root, env=env,
+               plusargs=plusargs)
+        return
+
+    group = list(group)
+    assert testname in group, f"{testname} is not in the batch {group}"
+    if(batch > 0):
+        first = group.index(testname) // batch * batch
+        group = group[first:first + batch]
+    names = ",".join(group)
+    batch_hash = hashlib.sha256(json.dumps([names, env or {}, list(plusargs or [])], sort_keys=True).encode()).hexdigest()[:8]
+    work_dir = os.path.join(tbpath, "run", "batch_" + batch_hash, get_param_string(params), simulator)
+
+    session = os.environ.get("SIM_RUN_ID") or os.environ.get("PYTEST_XDIST_TESTRUNUID") or str(os.getpid())
+    results_xml = os.path.join(work_dir, "results.xml")
+    batch_file = os.path.join(work_dir, BATCH_FILE)
+    with build_lock(work_dir, exclusive=True):
+        prev = None
+        if(os.path.exists(batch_file)):
+            with open(batch_file) as fd:
+                prev = json.load(fd)
+        if(prev != {"session": session, "tests": group}):
+            # runner skips the simulation if it already passed with the
+            # same dependencies (see SIM_INCREMENTAL), and leaves its
+            # results.xml in place.
+            try:
+                runner(simulator, timescale, tbpath, params, defs, names, pymodule, jsonpath, jsonname, root,
+                       work_dir=work_dir, env=env, plusargs=plusargs)
+            except SystemExit:
+                pass
+            with open(batch_file, "w") as fd:
+                json.dump({"session": session, "tests": group}, fd)
+        results = get_test_results(results_xml) if os.path.exists(results_xml) else {}
+
+    result = results.get(testname)
+    assert result is not None, f"Error! {testname} did not run: the simulation in {work_dir} ended before it. Set SIM_BATCH=1 to run it on its own."
+    if(result["skipped"]):
+        import pytest
+        pytest.skip(f"{testname} was skipped in {work_dir}")
+    assert result["passed"], f"Error! {testname} failed in the batched simulation in {work_dir} (see its log, and the re-run in rerun/{testname}). It sees the same stimulus with SIM_BATCH=1."
+
+def get_test_results(results_xml):
+    """ Get the result of every test in a cocotb results file, in the
+    order they ran. Returns a dictionary from test name to a dictionary
+    with "passed", "skipped" and "sim_time_ns" (the simulated time the
+    test took).
+
+    Arguments:
+    results_xml -- Path to the results.xml file
+    """
+    results = {}
+    for tc in ET.parse(results_xml).getroot().iter("testcase"):
+        results[tc.get("name")] = {"passed": (tc.find("failure") is None) and (tc.find("error") is None),
+                                   "skipped": tc.find("skipped") is not None,
+                                   "sim_time_ns": float(tc.get("sim_time_ns", 0))}
+    return results
+
+def get_seed(params, base=None):
+    """ Get the seed for a simulation. The seed is a 32-bit hash of the
+    base seed and the parameters, so it is the same every time the same
+    parametrization is run, and different across parametrizations.
+    cocotb seeds every test from it and the test's name, so a test sees
+    the same stimulus whichever tests run with it.
+
+    Arguments:
+    params -- Dictionary of parameters
+    base -- Base seed (default: the SIM_SEED environment variable, or 42)
+    """
+    if(base is None):
+        base = int(os.environ.get("SIM_SEED", "42"))
+    h = hashlib.sha256(f"{base}:{get_param_string(params)}".encode())
+    return int.from_bytes(h.digest()[:4], "little")
+
+def get_failures(results_xml):
+    """ Get the random seed and the failing tests of a cocotb results
+    file. Returns a tuple of (seed, list of (test name, simulation time
+    in ns from the start of the test to the failure)).
+
+    Arguments:
+    results_xml -- Path to the results.xml file
+    """
+    root = ET.parse(results_xml).getroot()
+    seed = None
+    for p in root.iter("property"):
+        if(p.get("name") == "random_seed"):
+            seed = int(p.get("value"))
+
+    failures = []
+    for tc in root.iter("testcase"):
+        if(tc.find("failure") is not None or tc.find("error") is not None):
+            failures.append((tc.get("name"), float(tc.get("sim_time_ns", 0))))
+    return (seed, failures)
+
+def get_python_deps(root, tbpath):
+    """ Get the Python files in the repository that a simulation run
+    may import: every module in the testbench directory and in util/
+    (the simulator imports some of them, e.g. the tb_ module and
+    fifo_tb, that pytest never does), and any other repository module
+    that is imported in this process.
+
+    Arguments:
+    root -- Absolute path to the root of the repository
+    tbpath -- Absolute path to the testbench directory
+    """
+    root = os.path.realpath(root)
+    files = set()
+    for d, recursive in ((tbpath, False), (os.path.join(root, "util"), True)):
+        for dirpath, dirnames, filenames in os.walk(d):
+            dirnames[:] = [n for n in dirnames if recursive and n != "__pycache__"]
+            files.update(os.path.realpath(os.path.join(dirpath, f)) for f in filenames if f.endswith(".py"))
+    for m in list(sys.modules.values()):
+        f = getattr(m, "__file__", None)
+        if(not f or not f.endswith(".py")):
+            continue
+        f = os.path.realpath(f)
+        if(f.startswith(root + os.sep) and "site-packages" not in f):
+            files.add(f)
+    return sorted(files)
+
+def get_run_deps(root, files, key):
+    """ Describe what a simulation run depends on: the content hash of
+    every file, the options in key, and the value of the environment
+    variables in RUN_ENV_KNOBS (e.g. THROUGHPUT_FRACTION).
+
+    Arguments:
+    root -- Absolute path to the root of the repository
+    files -- List of absolute paths to the sources and Python files
+    key -- Dictionary of the options of the run (parameters, seed, ...)
+    """
+    hashes = {os.path.relpath(f, root): get_file_hash(f) for f in files}
+    knobs = {name: os.environ.get(name) for name in RUN_ENV_KNOBS}
+
+    # Round-trip through json, so this compares equal to a loaded
+    # deps.json.
+    return json.loads(json.dumps({"key": key, "env": knobs, "files": hashes},
+                                 default=str, sort_keys=True))
+
+def is_up_to_date(work_dir, deps):
+    """ Check whether the run in work_dir passed with exactly the
+    dependencies in deps (see get_run_deps).
+
+    Arguments:
+    work_dir -- Work directory of the run
+    deps -- Dependencies of the run, from get_run_deps
+    """
+    results_xml = os.path.join(work_dir, "results.xml")
+    path = os.path.join(work_dir, DEPS_FILE)
+    if(not (os.path.exists(results_xml) and os.path.exists(path))):
+        return False
+    try:
+        with open(path) as fd:
+            prev = json.load(fd)
+        _, failures = get_failures(results_xml)
+    except (OSError, ValueError, ET.ParseError):
+        return False
+    return (not failures) and prev == deps
+
+def write_run_deps(work_dir, deps):
+    """ Record the dependencies of a run that passed in its work
+    directory, for is_up_to_date.
+
+    Arguments:
+    work_dir -- Work directory of the run
+    deps -- Dependencies of the run, from get_run_deps
+    """
+    tmp = os.path.join(work_dir, DEPS_FILE + ".tmp")
+    with open(tmp, "w") as fd:
+        json.dump(deps, fd, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(work_dir, DEPS_FILE))
+
+def get_trace_window(window):
+    """ Parse a trace window of the form "start:end" (in ns) into a
+    (start, end) tuple. Either side may be empty, meaning the start or
+    the end of the simulation. Returns None for an empty string.
+
+    Arguments:
+    window -- Trace window string, e.g. TRACE_WINDOW
+    """
+    if(not window):
+        return None
+    start, _, end = window.partition(":")
+    return (float(start or 0), float(end or 0))
+
+def write_trace_window(path, top, scopes=[], bind=False):
+    """ Write a trace_window module, which dumps scopes (or the whole
+    design) to dump.fst between the +trace_start_ns and +trace_end_ns
+    plusargs.
+
+    Icarus elaborates it as a second root module (-s trace_window).
+    Verilator only has one top module, so there it is bound into top.
+
+    Arguments:
+    path -- Path of the generated SystemVerilog file
+    top -- Name of the top module
+    scopes -- List of instance paths below top to dump. Empty dumps top.
+    bind -- Bind the module into top
+    """
+    targets = ", ".join(f"{top}.{s}" for s in scopes) if scopes else top
+    lines = ["// Generated by utilities.write_trace_window. Do not edit.",
+             "module trace_window();",
+             "  timeunit 1ns;",
+             "  timeprecision 1ps;",
+             "  longint start_ns, end_ns;",
+             "  initial begin",
+             "    if(!$value$plusargs(\"trace_start_ns=%d\", start_ns)) start_ns = 0;",
+             "    if(!$value$plusargs(\"trace_end_ns=%d\", end_ns)) end_ns = 0;",
+             "    $dumpfile(\"dump.fst\");",
+             f"    $dumpvars(0, {targets});",
+             "    if(start_ns > 0) begin",
+             "      $dumpoff;",
+             "      #(start_ns) $dumpon;",
+             "    end",
+             "    if(end_ns > start_ns) begin",
+             "      #(end_ns - start_ns) $dumpoff;",
+             "    end",
+             "  end",
+             "endmodule"]
+    if(bind):
+        lines += [f"bind {top} trace_window trace_window_i();"]
+
+    # Only rewrite the file if it changes, so that the build isn't
+    # considered out of date.
+    text = "\n".join(lines) + "\n"
+    if(os.path.exists(path)):
+        with open(path) as fd:
+            if(fd.read() == text):
+                return
+    with open(path, "w") as fd:
+        fd.write(text)
+
+@functools.lru_cache(maxsize=None)
+def get_verilator_run_only():
+    """ Get the VerilatorRunOnly class, a cocotb-test Verilator runner
+    that runs an already-compiled Verilator model without invoking
+    verilator or make. It is defined on first use, so that cocotb-test
+    is only imported when a simulation is launched.
+    """
+    from cocotb_test.simulator import Verilator
+
+    class VerilatorRunOnly(Verilator):
+        def build_command(self):
+            return [[os.path.join(self.sim_dir, self.toplevel_module)] + self.plus_args]
+
+    return VerilatorRunOnly
 
 # Function to build (run) the lint and style checks.
 def lint(simulator, timescale, tbpath, params, defs=[], compile_args=[], pymodule=None, jsonpath=None, jsonname="filelist.json", root=None):
+    from cocotb_test.simulator import run
 
     # if json path is none, assume that it is the same as tbpath
     if(jsonpath is None):
         jsonpath = tbpath
 
     assert (os.path.exists(jsonpath)), "jsonpath directory must exist"
-    top = get_top(jsonpath, jsonname)
-
 
     # Assume all paths in the json file are relative to the repository root.
-    if(root is None):
-        root = git.Repo(search_parent_directories=True).working_tree_dir
+    project = get_project(root)
+    assert (os.path.exists(project.root)), "root directory path must exist"
 
-    assert (os.path.exists(root)), "root directory path must exist"
-    sources = get_sources(root, tbpath)
+    filelist = project.filelist(jsonpath, jsonname)
+    top = filelist.top
+    sources = list(filelist.sources)
 
-    # if pymodule is none, assume that the python module name is test+<name of the top module>.
+    # if pymodule is none, use the cocotb module for the top module (see get_pymodule).
     if(pymodule is None):
-        pymodule = "test_" + top
+        pymodule = get_pymodule(tbpath, top)
 
-    # Create the expected makefile so cocotb-test won't complain.
-    sim_build = "lint"
-    if(not os.path.exists("lint")):
-       os.mkdir("lint")
+    # Create the expected makefile so cocotb-test won't complain. Each
+    # set of arguments gets its own directory so that lint and style
+    # checks can run in parallel.
+    args_hash = hashlib.sha256(json.dumps(compile_args + defs).encode()).hexdigest()[:8]
+    sim_build = os.path.join("lint", get_param_string(params) + "_" + args_hash)
+    os.makedirs(sim_build, exist_ok=True)
 
-    with open("lint/Vtop.mk", 'w') as fd:
+    with open(os.path.join(sim_build, "Vtop.mk"), 'w') as fd:
         fd.write("all:")
 
     make_args = ["-n"]
@@ -129,6 +647,134 @@ def lint(simulator, timescale, tbpath, params, defs=[], compile_args=[], pymodul
         compile_only=True)
 
 
+def get_repo_root():
+    """ Get the absolute path to the root of the repository. It is
+    resolved once per process: from the REPO_ROOT environment variable
+    (which runner passes to the simulator, like make does), or else by
+    searching for the git repository above the working directory.
+    """
+    global _REPO_ROOT
+    if(_REPO_ROOT is None):
+        root = os.environ.get("REPO_ROOT")
+        if(not root):
+            import git
+            root = git.Repo(search_parent_directories=True).working_tree_dir
+        _REPO_ROOT = os.path.realpath(root)
+    return _REPO_ROOT
+
+def get_project(root=None):
+    """ Get the (per-process) Project for a repository root.
+
+    Arguments:
+    root -- Absolute path to the root of the repository (default: get_repo_root())
+    """
+    if(root is None):
+        root = get_repo_root()
+    root = os.path.realpath(root)
+    if(root not in _PROJECTS):
+        _PROJECTS[root] = Project(root)
+    return _PROJECTS[root]
+
+def get_file_hash(path):
+    """ Get the sha256 digest (hex) of the contents of a file. It is
+    cached until the size or modification time of the file changes.
+
+    Arguments:
+    path -- Path to the file
+    """
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _FILE_HASHES.get(key)
+    if(digest is None):
+        with open(path, "rb") as fd:
+            digest = hashlib.sha256(fd.read()).hexdigest()
+        _FILE_HASHES[key] = digest
+    return digest
+
+def get_sources_hash(sources):
+    """ Get a hash of the contents (not the paths) of a list of source
+    files, so that identical trees in different checkouts match.
+
+    Arguments:
+    sources -- List of absolute paths to the source files
+    """
+    h = hashlib.sha256()
+    for f in sources:
+        h.update(os.path.basename(f).encode())
+        h.update(bytes.fromhex(get_file_hash(f)))
+    return h.hexdigest()
+
+class Filelist():
+    """ A parsed and validated json filelist, e.g.
+
+    {
+        "top": "hello",
+        "files": ["part1/sim/hello.sv"]
+    }
+
+    Attributes:
+    path -- Absolute path to the .json file
+    top -- Name of the top level module
+    files -- List of files, relative to the repository root
+    sources -- List of absolute paths to the files
+
+    Arguments:
+    root -- Absolute path to the root of the repository
+    path -- Absolute path to the .json file
+    """
+    def __init__(self, root, path):
+        with open(path) as fd:
+            try:
+                data = json.load(fd)
+            except ValueError as e:
+                raise ValueError(f"{path} is not valid json: {e}")
+
+        if(not isinstance(data, dict) or not isinstance(data.get("top"), str)):
+            raise ValueError(f"{path} must have a \"top\" key with the name of the top level module")
+        files = data.get("files")
+        if(not isinstance(files, list) or not all(isinstance(f, str) for f in files)):
+            raise ValueError(f"{path} must have a \"files\" key with a list of file names")
+
+        self.path = path
+        self.top = data["top"]
+        self.files = files
+        self.sources = [os.path.join(root, f) for f in files]
+
+        missing = [f for f, s in zip(files, self.sources) if not os.path.exists(s)]
+        if(missing):
+            raise ValueError(f"{path} lists files that do not exist (relative to {root}): {' '.join(missing)}")
+
+    def content_hash(self):
+        """ Hash of the contents of the sources (see get_sources_hash). """
+        return get_sources_hash(self.sources)
+
+class Project():
+    """ The repository, as seen from the testbenches: its root and its
+    filelists. Each filelist is parsed once, and again only if it
+    changes. Use get_project() to get the Project of this process.
+
+    Arguments:
+    root -- Absolute path to the root of the repository
+    """
+    def __init__(self, root):
+        self.root = root
+        self._filelists = {}
+
+    def filelist(self, p, n="filelist.json"):
+        """ Get a Filelist.
+
+        Arguments:
+        p -- Path to the directory that contains the .json file
+        n -- Name of the .json file, defaults to filelist.json
+        """
+        path = os.path.realpath(os.path.join(p, n))
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._filelists.get(path)
+        if(cached is None or cached[0] != mtime):
+            cached = (mtime, Filelist(self.root, path))
+            self._filelists[path] = cached
+        return cached[1]
+
 def get_files_from_filelist(p, n):
     """ Get a list of files from a json filelist.
 
@@ -136,21 +782,17 @@ def get_files_from_filelist(p, n):
     p -- Path to the directory that contains the .json file
     n -- name of the .json file to read.
     """
-    n = os.path.join(p, n)
-    with open(n) as filelist:
-        files = json.load(filelist)["files"]
-    return files
+    return list(get_project().filelist(p, n).files)
 
-def get_sources(r, p):
+def get_sources(r, p, n="filelist.json"):
     """ Get a list of source file paths from a json filelist.
 
     Arguments:
     r -- Absolute path to the root of the repository.
     p -- Absolute path to the directory containing filelist.json
+    n -- Name of the json filelist, defaults to filelist.json
     """
-    sources = get_files_from_filelist(p, "filelist.json")
-    sources = [os.path.join(r, f) for f in sources]
-    return sources
+    return list(get_project(r).filelist(p, n).sources)
 
 def get_top(p, n="filelist.json"):
     """ Get the name of the top level module from a filelist.json.
@@ -159,7 +801,7 @@ def get_top(p, n="filelist.json"):
     p -- Absolute path to the directory containing json filelist
     n -- Name of the json filelist, defaults to filelist.json
     """
-    return get_top_from_filelist(p, "filelist.json")
+    return get_project().filelist(p, n).top
 
 def get_top_from_filelist(p, n):
     """ Get the name of the top level module a json filelist.
@@ -168,10 +810,7 @@ def get_top_from_filelist(p, n):
     p -- Absolute path to the directory containing filelist.json
     n -- name of the .json file to read.
     """
-    n = os.path.join(p, n)
-    with open(n) as filelist:
-        top = json.load(filelist)["top"]
-        return top
+    return get_top(p, n)
 
 def get_param_string(parameters):
     """ Get a string of all the parameters concatenated together.
@@ -181,22 +820,406 @@ def get_param_string(parameters):
     """
     return "_".join(("{}={}".format(*i) for i in parameters.items()))
 
+def get_pymodule(tbpath, top):
+    """ Get the name of the cocotb module for a top module: tb_<top> if
+    the testbench directory has one, so that the simulator doesn't
+    import the pytest side in test_<top>, and test_<top> otherwise.
+
+    Arguments:
+    tbpath -- Absolute path to the testbench directory
+    top -- Name of the top module
+    """
+    if(os.path.exists(os.path.join(tbpath, "tb_" + top + ".py"))):
+        return "tb_" + top
+    return "test_" + top
+
+def get_import_time(module, path, preload=(), forbid=(), repeat=3):
+    """ Get the time it takes to import a module, in ms, in a fresh
+    interpreter with path and util/ on sys.path (as in the simulator).
+    The modules in preload are imported first and not counted, e.g.
+    "cocotb", which the simulator has always imported already. The
+    best of repeat runs is returned. Fails if importing the module also
+    imports one of the modules in forbid, e.g. the pytest side of a
+    bench from its simulator side.
+
+    Arguments:
+    module -- Name of the module to import (e.g. tb_fifo_1r1w_cdc)
+    path -- Directory of the module
+    preload -- Names of the modules to import before timing
+    forbid -- Names of the modules that the import must not pull in
+    repeat -- Number of runs
+    """
+    root = get_repo_root()
+    path = os.path.realpath(path)
+    code = ("import sys, time\n"
+            f"sys.path[:0] = {[path, os.path.join(root, 'util')]!r}\n"
+            f"for m in {list(preload)!r}: __import__(m)\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "t = (time.perf_counter() - start) * 1000\n"
+            f"print(' '.join(m for m in {list(forbid)!r} if m in sys.modules) or '-')\n"
+            "print(t)\n")
+    env = dict(os.environ)
+    env["REPO_ROOT"] = root
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=path, env=env,
+                             capture_output=True, text=True, check=True).stdout.split("\n")
+        leaked, t = out[-3], float(out[-2])
+        assert leaked == "-", f"Error! Importing {module} also imported {leaked}."
+        best = t if best is None else min(best, t)
+    return best
+
+
+@functools.lru_cache(maxsize=None)
+def get_simulator_version(simulator):
+    """ Get the version string reported by a simulator executable.
+
+    Arguments:
+    simulator -- Name of the simulator (e.g. verilator, icarus)
+    """
+    if simulator.startswith("icarus"):
+        cmd = ["iverilog", "-V"]
+    else:
+        cmd = [simulator, "--version"]
+
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True).stdout
+    except OSError:
+        return "unknown"
+
+    lines = out.splitlines()
+    return lines[0] if lines else "unknown"
+
+def get_build_hash(simulator, top, sources, params, defines, compile_args, timescale):
+    """ Get a hash that uniquely identifies a simulator build.
+
+    The hash covers the contents (not the paths) of every source file,
+    so identical trees in different checkouts share a build.
+
+    Arguments:
+    simulator -- Name of the simulator
+    top -- Name of the top level module
+    sources -- List of absolute paths to the source files
+    params -- Dictionary of parameters passed to the top level module
+    defines -- List of preprocessor defines
+    compile_args -- List of extra compiler arguments
+    timescale -- Simulation timescale string
+    """
+    import cocotb
+
+    h = hashlib.sha256()
+    h.update(get_simulator_version(simulator).encode())
+    h.update(cocotb.__version__.encode())
+    h.update(json.dumps([top, sorted(params.items()), defines, compile_args, timescale],
+                        default=str).encode())
+    h.update(bytes.fromhex(get_sources_hash(sources)))
+    return h.hexdigest()[:32]
+
+def get_cached_build_dir(key, cache_dir=None):
+    """ Get the build cache directory for a build hash, marking it as
+    most recently used and evicting old entries.
+
+    Arguments:
+    key -- Build hash from get_build_hash
+    cache_dir -- Root of the build cache, defaults to BUILD_CACHE_DIR
+    """
+    if(cache_dir is None):
+        cache_dir = BUILD_CACHE_DIR
+
+    build_dir = os.path.join(cache_dir, key)
+    os.makedirs(build_dir, exist_ok=True)
+
+    # The directory mtime is the LRU timestamp.
+    os.utime(build_dir)
+    evict_build_cache(cache_dir, keep=build_dir)
+    return build_dir
+
+def get_dir_size(p):
+    """ Get the total size in bytes of all files below a directory.
+
+    Arguments:
+    p -- Path to the directory
+    """
+    total = 0
+    for dirpath, _, filenames in os.walk(p):
+        for f in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, f))
+            except OSError:
+                pass
+    return total
+
+def write_build_stamp(build_dir):
+    """ Mark a build as complete. The stamp records the size of the
+    build, so that evict_build_cache doesn't have to walk every build
+    in the cache to add them up.
+
+    Arguments:
+    build_dir -- Path to the build directory
+    """
+    size = get_dir_size(build_dir)
+    with open(os.path.join(build_dir, BUILD_STAMP), "w") as fd:
+        fd.write(str(size))
+
+def get_build_size(build_dir):
+    """ Get the size in bytes of a build, as recorded in its stamp by
+    write_build_stamp. Builds that never finished count as empty.
+
+    Arguments:
+    build_dir -- Path to the build directory
+    """
+    try:
+        with open(os.path.join(build_dir, BUILD_STAMP)) as fd:
+            return int(fd.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def evict_build_cache(cache_dir, max_mb=None, keep=None):
+    """ Remove the least recently used builds until the cache is
+    smaller than max_mb megabytes.
+
+    Arguments:
+    cache_dir -- Root of the build cache
+    max_mb -- Size cap in MB, defaults to BUILD_CACHE_MB
+    keep -- Build directory that must never be evicted
+    """
+    if(max_mb is None):
+        max_mb = BUILD_CACHE_MB
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if(name.startswith(".evict-")):
+            # Left over by a process that died while deleting it
+            shutil.rmtree(path, ignore_errors=True)
+        elif(not name.startswith(".") and os.path.isdir(path)):
+            entries.append((os.path.getmtime(path), get_build_size(path), path))
+
+    total = sum(e[1] for e in entries)
+    for _, size, path in sorted(entries):
+        if total <= (max_mb << 20):
+            break
+        if path == keep:
+            continue
+
+        # Skip builds that another process is compiling or running.
+        # The build is renamed away under the lock, so nobody can find
+        # it (and write into it) while it is being deleted.
+        gone = os.path.join(cache_dir, f".evict-{os.path.basename(path)}-{os.getpid()}")
+        try:
+            with build_lock(path, exclusive=True, blocking=False):
+                os.rename(path, gone)
+        except (BlockingIOError, FileNotFoundError):
+            continue
+        shutil.rmtree(gone, ignore_errors=True)
+        total -= size
+
+@contextlib.contextmanager
+def build_lock(build_dir, exclusive=True, blocking=True):
+    """ Hold a file lock on a build (or run) directory. The lock file is
+    kept next to the directory, in .locks/, and never deleted, so the
+    lock still excludes other processes while the directory itself is
+    removed or recreated.
+
+    Arguments:
+    build_dir -- Path to the build directory
+    exclusive -- Take an exclusive (build) lock instead of a shared (run) lock
+    blocking -- Wait for the lock. If False, raise BlockingIOError if it is held.
+    """
+    lock_dir = os.path.join(os.path.dirname(build_dir), ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    if(not blocking):
+        flags |= fcntl.LOCK_NB
+
+    with open(os.path.join(lock_dir, os.path.basename(build_dir)), "a") as fd:
+        fcntl.flock(fd, flags)
+        try:
+            os.makedirs(build_dir, exist_ok=True)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+def write_profile(work_dir, nhot=10):
+    """ Summarize how fast a simulation ran in work_dir/profile.json.
+
+    Per-test wall time and simulated time come from results.xml. If the
+    run was profiled (COCOTB_ENABLE_PROFILING), the time spent in Python,
+    the number of triggers and the hottest testbench functions are
+    added from test_profile.pstat. Whatever is left of the wall time was
+    spent in the simulator.
+
+    Arguments:
+    work_dir -- Path to the directory that contains results.xml
+    nhot -- Number of hot spots to report
+    """
+    tests = []
+    for tc in ET.parse(os.path.join(work_dir, "results.xml")).iter("testcase"):
+        wall = float(tc.get("time", 0))
+        sim_ns = float(tc.get("sim_time_ns", 0))
+        tests.append({"name": tc.get("name"),
+                      "passed": (tc.find("failure") is None) and (tc.find("error") is None),
+                      "wall_time_s": wall,
+                      "sim_time_ns": sim_ns,
+                      "sim_ns_per_s": sim_ns / wall if wall else 0})
+
+    wall = sum(t["wall_time_s"] for t in tests)
+    summary = {"work_dir": work_dir,
+               "tests": tests,
+               "wall_time_s": wall,
+               "sim_time_ns": sum(t["sim_time_ns"] for t in tests)}
+
+    pstat = os.path.join(work_dir, "test_profile.pstat")
+    if(os.path.exists(pstat)):
+        import pstats
+        stats = pstats.Stats(pstat).stats
+        python = sum(tt for (_, _, tt, _, _) in stats.values())
+        ncalls = {}
+        hot = []
+        for (filename, line, func), (_, nc, tt, ct, _) in stats.items():
+            ncalls[func] = ncalls.get(func, 0) + nc
+            # Hot spots are only reported for the testbench, not cocotb.
+            if(os.path.basename(filename).startswith(("test_", "tb_")) or filename.startswith(os.path.dirname(__file__))):
+                hot.append({"function": f"{os.path.basename(filename)}:{line}({func})",
+                            "calls": nc, "self_s": tt, "cumulative_s": ct})
+        hot.sort(key=lambda h: h["cumulative_s"], reverse=True)
+
+        summary["python_time_s"] = python
+        summary["simulator_time_s"] = max(wall - python, 0)
+        summary["triggers_awaited"] = ncalls.get("_resume_coro_upon", 0)
+        summary["trigger_callbacks"] = ncalls.get("_react", 0)
+        summary["hot_spots"] = hot[:nhot]
+
+    with open(os.path.join(work_dir, "profile.json"), "w") as fd:
+        json.dump(summary, fd, indent=2)
+    return summary
+
+def aggregate_profiles(tbpath):
+    """ Collect every run/<test>/<params>/<sim>/profile.json under tbpath
+    into run/profile.json, slowest (in simulated ns per second) first.
+
+    Arguments:
+    tbpath -- Path to the testbench directory
+    """
+    rows = []
+    for dirpath, _, filenames in os.walk(os.path.join(tbpath, "run")):
+        if("profile.json" in filenames and dirpath != os.path.join(tbpath, "run")):
+            with open(os.path.join(dirpath, "profile.json")) as fd:
+                p = json.load(fd)
+            rel = os.path.relpath(dirpath, os.path.join(tbpath, "run"))
+            wall = p["wall_time_s"]
+            rows.append({"run": rel,
+                         "wall_time_s": wall,
+                         "sim_time_ns": p["sim_time_ns"],
+                         "sim_ns_per_s": p["sim_time_ns"] / wall if wall else 0,
+                         "python_fraction": p["python_time_s"] / wall if ("python_time_s" in p and wall) else None})
+    if(not rows):
+        return rows
+
+    rows.sort(key=lambda r: r["sim_ns_per_s"])
+
+    # Several pytest processes may aggregate at once, so replace the
+    # file atomically.
+    path = os.path.join(tbpath, "run", "profile.json")
+    with open(path + f".{os.getpid()}", "w") as fd:
+        json.dump(rows, fd, indent=2)
+    os.replace(path + f".{os.getpid()}", path)
+    return rows
+
+def aggregate_csv(tbpath, prefix):
+    """ Collect the rows of every <prefix>*.csv below tbpath/run into
+    run/<prefix>.csv, tagged with the run directory and the current
+    commit so that results can be tracked across commits. Returns the
+    rows.
+
+    Arguments:
+    tbpath -- Path to the testbench directory
+    prefix -- File name prefix of the CSV files to collect
+    """
+    rundir = os.path.join(tbpath, "run")
+    out = os.path.join(rundir, prefix + ".csv")
+    import git
+    try:
+        repo = git.Repo(tbpath, search_parent_directories=True)
+        commit = repo.head.commit.hexsha[:10] + ("-dirty" if repo.is_dirty() else "")
+    except (git.exc.InvalidGitRepositoryError, ValueError):
+        commit = "unknown"
+
+    header = None
+    rows = []
+    for dirpath, _, filenames in sorted(os.walk(rundir)):
+        for f in sorted(filenames):
+            path = os.path.join(dirpath, f)
+            if(not (f.startswith(prefix) and f.endswith(".csv")) or path == out):
+                continue
+            with open(path) as fd:
+                lines = fd.read().splitlines()
+            if(not lines):
+                continue
+            header = ["commit", "run"] + lines[0].split(",")
+            rel = os.path.relpath(dirpath, rundir)
+            rows += [[commit, rel] + l.split(",") for l in lines[1:]]
+    if(not rows):
+        return rows
+
+    with open(out + f".{os.getpid()}", "w") as fd:
+        fd.write(",".join(header) + "\n")
+        for r in rows:
+            fd.write(",".join(r) + "\n")
+    os.replace(out + f".{os.getpid()}", out)
+    return [header] + rows
+
+def format_table(rows):
+    """ Format a list of rows (the first being the header) as a text
+    table with aligned columns.
+
+    Arguments:
+    rows -- List of lists of strings
+    """
+    widths = [max(len(str(r[i])) for r in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(str(c).rjust(w) for c, w in zip(r, widths)) for r in rows)
 
 def assert_resolvable(s):
-    assert s.value.is_resolvable, f"Unresolvable value in {s._path} (x or z in some or all bits) at Time {get_sim_time(units='ns')}ns."
+    if(not s.value.is_resolvable):
+        from cocotb.utils import get_sim_time
+        assert 0, f"Unresolvable value in {s._path} (x or z in some or all bits) at Time {get_sim_time(units='ns')}ns."
 
-async def clock_start_sequence(clk_i, period=1, unit='ns'):
-    # Set the clock to Z for 10 ns. This helps separate tests.
-    clk_i.value = LogicArray(['z'])
-    await Timer(10, 'ns')
+def get_clock_steps(period, unit='ns'):
+    """ Get a clock period as an even number of simulator steps, so that
+    both halves of the period are whole steps. cocotb's Clock raises a
+    ValueError for a period that isn't, e.g. 1000/12 ns (12 MHz) at 1ps
+    precision, so the period is rounded to the nearest one that is.
+
+    Arguments:
+    period -- Clock period
+    unit -- Unit of period (default: ns)
+    """
+    from cocotb.utils import get_sim_steps
+    return 2 * max(1, get_sim_steps(period / 2, unit, round_mode="round"))
+
+async def clock_start_sequence(clk_i, period=1, unit='ns', z_cycles=1):
+    import cocotb
+    from cocotb.clock import Clock
+    from cocotb.triggers import Timer
+    from cocotb.types import LogicArray
+
+    # Set the clock to Z for z_cycles clock periods. This helps separate
+    # tests in the waveforms, and is kept short since a batch (see
+    # batch_runner) pays it once per test.
+    if(z_cycles):
+        clk_i.value = LogicArray(['z'])
+        await Timer(z_cycles * period, unit, round_mode="round")
 
     # Unrealistically fast clock, but nice for mental math (1 GHz)
-    c = Clock(clk_i, period, unit)
+    c = Clock(clk_i, get_clock_steps(period, unit), "step")
 
     # Start the clock (soon). Start it low to avoid issues on the first RisingEdge
     cocotb.start_soon(c.start(start_high=False))
 
 async def reset_sequence(clk_i, reset_i, cycles, FinishClkFalling=True, active_level=True):
+    from cocotb.triggers import ClockCycles, RisingEdge, FallingEdge
+
     reset_i.setimmediatevalue(not active_level)
 
     # Always assign inputs on the falling edge
@@ -216,6 +1239,8 @@ async def reset_sequence(clk_i, reset_i, cycles, FinishClkFalling=True, active_l
         await RisingEdge(clk_i)
 
 async def delay_cycles(dut, ncyc, polarity):
+    from cocotb.triggers import RisingEdge, FallingEdge
+
     for _ in range(ncyc):
         if(polarity):
             await RisingEdge(dut.clk_i)